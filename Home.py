@@ -1,12 +1,11 @@
 import streamlit as st
-from PIL import Image
+from cury.assets import sidebar_logo
 
 st.set_page_config(
     page_title='Home')
 
-image_path = 'logo.png'
-image = Image.open(image_path)
-st.sidebar.image(image, width=200)
+# Logo decodificado e reduzido uma vez por processo (cury/assets.py)
+sidebar_logo()
 
 st.sidebar.markdown('# Cury Company')
 st.sidebar.markdown('## Fastest Delivery in Town')
@@ -0,0 +1,69 @@
+# Latência da API local (cury/api.py): primeira consulta, cache e ETag
+#
+# Uso:
+#     python -m benchmarks.bench_api [caminho do CSV] [repetições]
+#
+# Sobe a API numa porta livre de 127.0.0.1 (sem a atualização em segundo
+# plano) e mede, para algumas rotas com os filtros padrão e com um filtro de
+# trânsito:
+#
+#   - fria: primeira consulta (calcula a visão);
+#   - cache: a mesma consulta de novo, sem If-None-Match (200 do cache);
+#   - 304: o polling com o ETag recebido (sem corpo e sem cálculo).
+import sys
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from cury.api import cache_info, serve
+from cury.loader import DATASET_PATH
+
+ROUTES = [
+    '/api/empresa/orders_by_day',
+    '/api/empresa/orders_by_traffic',
+    '/api/restaurante/time_by_festival',
+    '/api/entregadores/top_fastest',
+    '/api/entregadores?date=2022-03-15&traffic=Low,Jam',
+]
+
+
+def get(url, tag=None):
+    """
+        Esta função faz um GET e mede o tempo.
+        Input: URL, ETag para o If-None-Match (opcional)
+        Output: tupla (status, ETag, tamanho do corpo, segundos)
+    """
+    request = Request(url, headers={'If-None-Match': tag} if tag else {})
+    start = time.perf_counter()
+    try:
+        with urlopen(request) as response:
+            body = response.read()
+            return response.status, response.headers.get('ETag'), len(body), time.perf_counter() - start
+    except HTTPError as error:
+        if error.code != 304:
+            raise
+        return 304, error.headers.get('ETag'), 0, time.perf_counter() - start
+
+
+def main(path=DATASET_PATH, repeat=50):
+    server = serve(port=0, path=path, refresh=False)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = 'http://{}:{}'.format(*server.server_address[:2])
+    print('| rota | fria (ms) | cache (ms) | 304 (ms) | corpo (bytes) |')
+    print('|---|---|---|---|---|')
+    for route in ROUTES:
+        status, tag, size, cold = get(base + route)
+        cached = min(get(base + route)[3] for _ in range(repeat))
+        revalidated = [get(base + route, tag) for _ in range(repeat)]
+        assert all(result[0] == 304 for result in revalidated)
+        print('| {} | {:.1f} | {:.2f} | {:.2f} | {} |'.format(
+            route, cold * 1000, cached * 1000, min(result[3] for result in revalidated) * 1000, size))
+    print(cache_info())
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else DATASET_PATH,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 50)
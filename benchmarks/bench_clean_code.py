@@ -0,0 +1,86 @@
+# Comparação da limpeza antiga (seis máscaras + apply) com a vetorizada
+#
+# Uso:
+#     python -m benchmarks.bench_clean_code 45000 1000000 10000000
+#
+# Para cada tamanho gera (uma vez) um train.csv sintético em /tmp e mede
+# tempo e pico de memória de leitura + limpeza nas duas versões.
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+import pandas as pd
+
+from benchmarks.synthetic import write_csv
+from cury.loader import clean_code, read_dataset
+
+DEFAULT_SIZES = [45000, 1000000, 10000000]
+
+
+def clean_code_baseline(df1):
+    # Cópia fiel da versão anterior de clean_code, usada só como referência
+    linhasSelecionadas = (df1['Delivery_person_Age'] != 'NaN ')
+    df1 = df1.loc[linhasSelecionadas, :].copy()
+    linhasSelecionadas = (df1['Road_traffic_density'] != 'NaN ')
+    df1 = df1.loc[linhasSelecionadas, :].copy()
+    linhasSelecionadas = (df1['Time_taken(min)'] != 'NaN ')
+    df1 = df1.loc[linhasSelecionadas, :].copy()
+    linhasSelecionadas = (df1['City'] != 'NaN ')
+    df1 = df1.loc[linhasSelecionadas, :].copy()
+    linhasSelecionadas = (df1['Festival'] != 'NaN ')
+    df1 = df1.loc[linhasSelecionadas, :].copy()
+    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype(int)
+    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype(float)
+    df1['Order_Date'] = pd.to_datetime(df1['Order_Date'], format='%d-%m-%Y')
+    linhasSelecionadas = (df1['multiple_deliveries'] != 'NaN ')
+    df1 = df1.loc[linhasSelecionadas, :].copy()
+    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype(int)
+    for col in ['ID', 'Delivery_person_ID', 'Road_traffic_density', 'Type_of_order',
+                'Type_of_vehicle', 'City', 'Festival']:
+        df1.loc[:, col] = df1.loc[:, col].str.strip()
+    df1.loc[:, 'Time_taken(min)'] = df1.loc[:, 'Time_taken(min)'].apply(lambda x: x.split(' ')[1])
+    df1.loc[:, 'Time_taken(min)'] = df1.loc[:, 'Time_taken(min)'].astype(int)
+    df1 = df1.reset_index(drop=True)
+    return df1
+
+
+def before(path):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return clean_code_baseline(pd.read_csv(path))
+
+
+def after(path):
+    return clean_code(read_dataset(path))
+
+
+def measure(func, path):
+    # Tempo e memória em execuções separadas: o tracemalloc deixa tudo mais lento
+    start = time.perf_counter()
+    df1 = func(path)
+    seconds = time.perf_counter() - start
+    del df1
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 2 ** 20
+
+
+def main(sizes):
+    print('| linhas | antes (s) | depois (s) | speedup | pico antes (MiB) | pico depois (MiB) |')
+    print('|---|---|---|---|---|---|')
+    for n in sizes:
+        path = '/tmp/cury_train_{}.csv'.format(n)
+        if not os.path.exists(path):
+            write_csv(n, path)
+        pd.testing.assert_frame_equal(before(path), after(path))
+        t0, m0 = measure(before, path)
+        t1, m1 = measure(after, path)
+        print('| {} | {:.2f} | {:.2f} | {:.1f}x | {:.0f} | {:.0f} |'.format(n, t0, t1, t0 / t1, m0, m1))
+
+
+if __name__ == '__main__':
+    main([int(x) for x in sys.argv[1:]] or DEFAULT_SIZES)
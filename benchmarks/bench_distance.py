@@ -0,0 +1,37 @@
+# Haversine vetorizado (cury.geo) contra o apply linha a linha do pacote haversine
+#
+# Uso:
+#     python -m benchmarks.bench_distance 45000 1000000
+import sys
+import time
+
+import numpy as np
+from haversine import haversine
+
+from benchmarks.synthetic import generate
+from cury.geo import COORDINATE_COLUMNS, delivery_distance
+
+
+def distance_apply(df1):
+    # Versão anterior da página de restaurantes
+    return df1.loc[:, COORDINATE_COLUMNS].apply(lambda x: haversine((x['Restaurant_latitude'], x['Restaurant_longitude']), (x['Delivery_location_latitude'], x['Delivery_location_longitude'])), axis=1).to_numpy()
+
+
+def main(sizes):
+    print('| linhas | apply (linhas/s) | vetorizado (linhas/s) | speedup | maior diferença (km) |')
+    print('|---|---|---|---|---|')
+    for n in sizes:
+        df1 = generate(n).loc[:, COORDINATE_COLUMNS]
+        start = time.perf_counter()
+        expected = distance_apply(df1)
+        t0 = time.perf_counter() - start
+        start = time.perf_counter()
+        result = delivery_distance(df1)
+        t1 = time.perf_counter() - start
+        np.testing.assert_allclose(result, expected, rtol=1e-12, atol=1e-9)
+        print('| {} | {:,.0f} | {:,.0f} | {:.0f}x | {:.1e} |'.format(
+            n, n / t0, n / t1, t0 / t1, np.abs(result - expected).max()))
+
+
+if __name__ == '__main__':
+    main([int(x) for x in sys.argv[1:]] or [45000, 1000000])
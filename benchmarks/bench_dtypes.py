@@ -0,0 +1,48 @@
+# Relatório de memória do dataframe limpo antes e depois de optimize_dtypes
+#
+# Uso:
+#     python -m benchmarks.bench_dtypes 45000 1000000
+import os
+import sys
+
+from benchmarks.synthetic import write_csv
+from cury.loader import clean_code, optimize_dtypes, read_dataset
+
+
+def memory_report(path):
+    """
+        Esta função mede a memória (deep) de cada coluna do dataframe limpo
+        com os tipos antigos e com os tipos otimizados.
+        Input: caminho do CSV
+        Output: lista de tuplas (coluna, tipo antes, MiB antes, tipo depois, MiB depois)
+    """
+    before = clean_code(read_dataset(path))
+    before_bytes = before.memory_usage(deep=True, index=False)
+    before_dtypes = before.dtypes.astype(str)
+    after = optimize_dtypes(before)
+    after_bytes = after.memory_usage(deep=True, index=False)
+    rows = []
+    for col in after.columns:
+        rows.append((col, before_dtypes[col], before_bytes[col] / 2 ** 20,
+                     str(after[col].dtype), after_bytes[col] / 2 ** 20))
+    return rows
+
+
+def main(sizes):
+    for n in sizes:
+        path = '/tmp/cury_train_{}.csv'.format(n)
+        if not os.path.exists(path):
+            write_csv(n, path)
+        rows = memory_report(path)
+        print('\n{} linhas'.format(n))
+        print('| coluna | antes | MiB | depois | MiB |')
+        print('|---|---|---|---|---|')
+        for col, dtype0, mib0, dtype1, mib1 in rows:
+            print('| {} | {} | {:.1f} | {} | {:.1f} |'.format(col, dtype0, mib0, dtype1, mib1))
+        total0 = sum(r[2] for r in rows)
+        total1 = sum(r[4] for r in rows)
+        print('| **total** | | {:.1f} | | {:.1f} |'.format(total0, total1))
+
+
+if __name__ == '__main__':
+    main([int(x) for x in sys.argv[1:]] or [45000, 1000000])
@@ -0,0 +1,48 @@
+# Escalonamento da agregação dos KPIs com o número de processos
+#
+# Uso:
+#     python -m benchmarks.bench_parallel 1000000
+#
+# Mede aggregate_kpis (cubo, extremos e tabela por entregador) com 1, 2, 4 e 8
+# processos sobre o mesmo dataset limpo. O pool é aquecido antes da medida,
+# então o tempo inclui enviar as faixas aos processos e juntar os parciais,
+# mas não a criação dos processos.
+import os
+import sys
+import time
+
+from benchmarks.synthetic import write_csv
+from cury import parallel
+from cury.loader import build_dataset
+
+WORKERS = [1, 2, 4, 8]
+REPEAT = 3
+
+
+def main(n_rows):
+    path = '/tmp/cury_train_{}.csv'.format(n_rows)
+    if not os.path.exists(path):
+        write_csv(n_rows, path)
+    df1 = build_dataset(path)
+    # Mede todas as contagens de processos, mesmo abaixo do limite do caminho serial
+    parallel.MIN_ROWS_PER_WORKER = 1
+    print('{} linhas, {} CPUs'.format(len(df1), os.cpu_count()))
+    print('| processos | tempo (s) | speedup |')
+    print('|---|---|---|')
+    base = None
+    for workers in WORKERS:
+        parallel.aggregate_kpis(df1, workers)
+        times = []
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            parallel.aggregate_kpis(df1, workers)
+            times.append(time.perf_counter() - start)
+        best = min(times)
+        base = base or best
+        print('| {} | {:.2f} | {:.2f}x |'.format(workers, best, base / best))
+        # Um pool por contagem: encerra este antes de medir o próximo
+        parallel.shutdown()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,59 @@
+# Memória residente com várias sessões simultâneas
+#
+# Uso:
+#     python -m benchmarks.bench_sessions 1000000 1 5 10 20
+#
+# Simula N sessões abertas ao mesmo tempo na visão entregadores: cada sessão
+# guarda o resultado do seu filtro (sem 'Jam', o pior caso, em que a seleção
+# não é contínua) e as tabelas que a página monta a partir dele. Compara o
+# filtro que copia o dataframe (filter_dataset) com a seleção de linhas
+# (filter_view + view_frame só nas colunas usadas). A memória é a que as
+# sessões mantêm alocada (tracemalloc), sem o ruído do reaproveitamento de
+# memória liberada que aparece na RSS.
+import sys
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.synthetic import csv_path
+from cury.filters import build_filter_index, filter_dataset, filter_view, view_frame
+from cury.loader import build_dataset, share_frame
+from cury.topk import top_k
+
+DATE_LIMIT = datetime(2022, 4, 1)
+TRAFFIC = ['Low', 'Medium', 'High']
+KPI_COLUMNS = ['Delivery_person_Age', 'Vehicle_condition']
+TOP_COLUMNS = ['City', 'Delivery_person_ID', 'Time_taken(min)']
+
+
+def copied_session(df1, index):
+    df_sel = filter_dataset(df1, index, DATE_LIMIT, TRAFFIC)
+    return [df_sel, top_k(df_sel, *TOP_COLUMNS)]
+
+
+def view_session(df1, index):
+    view = filter_view(df1, index, DATE_LIMIT, TRAFFIC)
+    # As colunas materializadas só vivem durante o cálculo
+    extremes = view_frame(view, KPI_COLUMNS).agg(['min', 'max'])
+    return [view, extremes, top_k(view_frame(view, TOP_COLUMNS), *TOP_COLUMNS)]
+
+
+def main(n_rows, counts):
+    df1 = share_frame(build_dataset(csv_path(n_rows)))
+    index = build_filter_index(df1)
+    print('{} linhas; memória mantida pelas N sessões abertas'.format(len(df1)))
+    print('| sessões | cópia (MiB) | seleção (MiB) |')
+    print('|---|---|---|')
+    for n in counts:
+        growth = []
+        for session in [copied_session, view_session]:
+            tracemalloc.start()
+            sessions = [session(df1, index) for _ in range(n)]
+            growth.append(tracemalloc.get_traced_memory()[0] / 2 ** 20)
+            tracemalloc.stop()
+            del sessions
+        print('| {} | {:.0f} | {:.0f} |'.format(n, growth[0], growth[1]))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+         [int(x) for x in sys.argv[2:]] or [1, 5, 10, 20])
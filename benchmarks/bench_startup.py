@@ -0,0 +1,108 @@
+# Partida a frio de cada página: tempo de import e da primeira execução
+#
+# Uso:
+#     python -m benchmarks.bench_startup
+#     python -m benchmarks.bench_startup --repeat 5 --budget 6
+#
+# Cada medida roda num interpretador novo (como uma instância recém-criada
+# pelo autoscaling), a partir da raiz do projeto e com o dataset/train.csv
+# atual:
+#
+#   - imports: só os import do topo do arquivo da página;
+#   - primeira execução: o script inteiro logo depois (caches vazios:
+#     leitura do snapshot ou do CSV, estruturas derivadas, figuras);
+#   - módulos mais lentos: os imports de nível mais alto que mais pesaram,
+#     segundo o python -X importtime.
+#
+# Fica o melhor tempo de --repeat partidas. Com --budget, o código de saída é
+# 1 quando alguma página passa do orçamento (imports + primeira execução), para
+# usar como verificação no CI.
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ['Home.py', 'pages/1_visao_empresa.py', 'pages/2_visao_entregadores.py',
+         'pages/3_visao_restaurante.py']
+REPEAT = 3
+TOP_MODULES = 3
+
+# Roda no interpretador novo: nada além do necessário é importado antes da
+# página, para não mascarar o tempo de import dela
+CHILD = '''
+import ast, json, sys, time, warnings
+warnings.simplefilter('ignore')
+path = sys.argv[1]
+with open(path, encoding='utf-8') as f:
+    source = f.read()
+tree = ast.parse(source, path)
+imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+start = time.perf_counter()
+exec(compile(ast.Module(body=imports, type_ignores=[]), path, 'exec'), {'__name__': '__main__'})
+middle = time.perf_counter()
+exec(compile(tree, path, 'exec'), {'__name__': '__main__'})
+end = time.perf_counter()
+print('CURY_STARTUP ' + json.dumps({'imports': middle - start, 'run': end - middle}))
+'''
+
+
+def top_modules(stderr, n=TOP_MODULES):
+    """
+        Esta função lê a saída do python -X importtime.
+        Input: stderr do processo, quantidade de módulos
+        Output: lista de (módulo, segundos acumulados) dos imports de nível
+                mais alto, do mais lento para o mais rápido
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nomes sem recuo são os imports feitos diretamente pelo script
+        if not name[1:].startswith(' '):
+            modules.append((name.strip(), int(cumulative) / 1e6))
+    return sorted(modules, key=lambda item: -item[1])[:n]
+
+
+def cold_start(page):
+    """
+        Esta função mede a partida a frio de uma página num interpretador novo.
+        Input: caminho da página (relativo à raiz do projeto)
+        Output: dicionário com 'imports', 'run' (segundos) e 'modules'
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD, page], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    line = [line for line in proc.stdout.splitlines() if line.startswith('CURY_STARTUP ')][-1]
+    result = json.loads(line[len('CURY_STARTUP '):])
+    result['modules'] = top_modules(proc.stderr)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_startup')
+    parser.add_argument('pages', nargs='*', default=PAGES)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--budget', type=float, help='limite em segundos (imports + primeira execução)')
+    args = parser.parse_args(argv)
+
+    print('| página | imports (s) | primeira execução (s) | total (s) | módulos mais lentos |')
+    print('|---|---|---|---|---|')
+    over = []
+    for page in args.pages:
+        runs = [cold_start(page) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r['imports'] + r['run'])
+        total = best['imports'] + best['run']
+        modules = ', '.join('{} {:.2f}'.format(name, seconds) for name, seconds in best['modules'])
+        flag = ''
+        if args.budget is not None and total > args.budget:
+            over.append(page)
+            flag = ' (acima do orçamento)'
+        print('| {} | {:.3f} | {:.3f} | {:.3f}{} | {} |'.format(page, best['imports'], best['run'], total, flag, modules))
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,39 @@
+# Pico de memória do dataset inteiro na memória x processamento em blocos
+#
+# Uso:
+#     python -m benchmarks.bench_stream 45000 1000000 3000000
+#
+# Para cada tamanho gera (uma vez) um train.csv sintético em /tmp e mede tempo
+# e pico de memória para chegar aos KPIs do dashboard: lendo e limpando o CSV
+# inteiro (loader.build_dataset + cubo) e lendo em blocos (cury/stream.py).
+import os
+import sys
+
+from benchmarks.bench_clean_code import measure
+from benchmarks.synthetic import write_csv
+from cury.cube import build_cube
+from cury.loader import build_dataset
+from cury.stream import stream_aggregates
+
+DEFAULT_SIZES = [45000, 1000000, 3000000]
+
+
+def in_memory(path):
+    df1 = build_dataset(path)
+    return build_cube(df1)
+
+
+def main(sizes):
+    print('| linhas | inteiro (s) | blocos (s) | pico inteiro (MiB) | pico blocos (MiB) |')
+    print('|---|---|---|---|---|')
+    for n in sizes:
+        path = '/tmp/cury_train_{}.csv'.format(n)
+        if not os.path.exists(path):
+            write_csv(n, path)
+        t0, m0 = measure(in_memory, path)
+        t1, m1 = measure(stream_aggregates, path)
+        print('| {} | {:.2f} | {:.2f} | {:.0f} | {:.0f} |'.format(n, t0, t1, m0, m1))
+
+
+if __name__ == '__main__':
+    main([int(x) for x in sys.argv[1:]] or DEFAULT_SIZES)
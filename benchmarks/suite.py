@@ -0,0 +1,226 @@
+# Suíte de benchmarks do dashboard, com resultado em JSON
+#
+# Uso:
+#     python -m benchmarks.suite 100000 1000000 10000000 --output bench.json
+#     python -m benchmarks.suite --compare antes.json depois.json
+#
+# Para cada tamanho gera (uma vez) um train.csv sintético em /tmp
+# (benchmarks/synthetic.py) e mede, sem nenhum cache do dashboard:
+#
+#   - loader: leitura do CSV, clean_code e a preparação completa;
+#   - build: as estruturas derivadas (cubo, índice dos filtros, sketches, grade);
+#   - filtro: o passo dos filtros da barra lateral em cada estrutura;
+#   - empresa / entregadores / restaurante: cada função de gráfico e KPI das
+#     três páginas.
+#
+# As funções das páginas vêm de cury/views.py, o mesmo módulo que as páginas
+# chamam, então a suíte mede sempre o código atual. Cada medida é repetida e o JSON guarda todos os
+# tempos, com o commit e as versões das bibliotecas, para comparar execuções
+# entre commits com --compare.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import csv_path
+from cury import views
+from cury.cube import build_cube, filter_cube
+from cury.filters import build_filter_index, filter_dataset, filter_view
+from cury.geomap import build_geo_bins, grid_points, render_map
+from cury.hll import build_sketches, count_distinct, filter_sketches
+from cury.loader import clean_code, prepare_dataset, read_dataset
+from cury.planner import plan_queries
+from cury.rollups import build_rollups, period_counts
+
+DEFAULT_SIZES = [100000, 1000000, 10000000]
+REPEAT = 3
+# Filtros padrão da barra lateral (todas as datas, todo o trânsito)
+DATE_LIMIT = datetime(2022, 4, 13)
+TRAFFIC_OPTIONS = ['Low', 'Medium', 'High', 'Jam']
+# Variação acima da qual --compare aponta uma regressão
+THRESHOLD = 0.10
+
+def _plan(cube):
+    # Plano vazio a cada chamada: a função paga a própria agregação
+    return plan_queries(cube, [])
+
+
+def cases(data):
+    """
+        Esta função lista os casos medidos sobre os dados de um tamanho.
+        Input: dicionário com 'raw', 'df1', 'cube', 'index', 'sketches', 'bins' e 'rollups'
+        Output: lista de (nome, função sem argumentos)
+    """
+    raw, df1 = data['raw'], data['df1']
+    df_f = filter_dataset(df1, data['index'], DATE_LIMIT, TRAFFIC_OPTIONS)
+    view = filter_view(df1, data['index'], DATE_LIMIT, TRAFFIC_OPTIONS)
+    cube = filter_cube(data['cube'], DATE_LIMIT, TRAFFIC_OPTIONS)
+    sketches = filter_sketches(data['sketches'], DATE_LIMIT, TRAFFIC_OPTIONS)
+    bins = filter_cube(data['bins'], DATE_LIMIT, TRAFFIC_OPTIONS)
+    return [
+        ('loader/clean_code', lambda: clean_code(raw)),
+        ('loader/prepare_dataset', lambda: prepare_dataset(raw)),
+        ('build/cube', lambda: build_cube(df1)),
+        ('build/filter_index', lambda: build_filter_index(df1)),
+        ('build/sketches', lambda: build_sketches(df1)),
+        ('build/geo_bins', lambda: build_geo_bins(df1)),
+        ('build/rollups', lambda: build_rollups(data['cube'], data['sketches'])),
+        ('filtro/dataset', lambda: filter_dataset(df1, data['index'], DATE_LIMIT, TRAFFIC_OPTIONS)),
+        ('filtro/cube', lambda: filter_cube(data['cube'], DATE_LIMIT, TRAFFIC_OPTIONS)),
+        ('filtro/sketches', lambda: filter_sketches(data['sketches'], DATE_LIMIT, TRAFFIC_OPTIONS)),
+        ('empresa/order_metric', lambda: views.order_metric(_plan(cube))),
+        ('empresa/order_by_period/day', lambda: views.order_by_period(period_counts(data['rollups'], 'day', DATE_LIMIT, TRAFFIC_OPTIONS))),
+        ('empresa/order_by_period/week', lambda: views.order_by_period(period_counts(data['rollups'], 'week', DATE_LIMIT, TRAFFIC_OPTIONS))),
+        ('empresa/order_share_by_period/week', lambda: views.order_share_by_period(period_counts(data['rollups'], 'week', DATE_LIMIT, TRAFFIC_OPTIONS))),
+        ('empresa/order_by_period/month', lambda: views.order_by_period(period_counts(data['rollups'], 'month', DATE_LIMIT, TRAFFIC_OPTIONS))),
+        ('empresa/traffic_order_share', lambda: views.traffic_order_share(_plan(cube))),
+        ('empresa/traffic_order_city', lambda: views.traffic_order_city(_plan(cube))),
+        ('empresa/country_maps', lambda: views.country_maps(df_f)),
+        ('empresa/map_heat', lambda: render_map(grid_points(bins, 'delivery'), 'heat')),
+        ('empresa/map_cluster', lambda: render_map(grid_points(bins, 'delivery'), 'cluster')),
+        ('entregadores/top_delivers', lambda: views.top_delivers(df_f)),
+        ('entregadores/age_vehicle_extremes', lambda: views.courier_kpis(view)),
+        ('entregadores/ratings_per_deliver', lambda: views.ratings_by_deliver(view)),
+        ('entregadores/rating_by_traffic', lambda: views.rating_by(_plan(cube), 'Road_traffic_density')),
+        ('entregadores/rating_by_weather', lambda: views.rating_by(_plan(cube), 'Weatherconditions')),
+        ('restaurante/unique_delivers', lambda: count_distinct(sketches)),
+        ('restaurante/distance', lambda: views.distance(_plan(cube), fig=False)),
+        ('restaurante/distance_graph', lambda: views.distance(_plan(cube), fig=True)),
+        ('restaurante/avg_std_time_delivery', lambda: views.avg_std_time_delivery(_plan(cube), 'Yes', 'avg_time')),
+        ('restaurante/avg_std_time_graph', lambda: views.avg_std_time_graph(_plan(cube))),
+        ('restaurante/avg_std_time_on_traffic', lambda: views.avg_std_time_on_traffic(_plan(cube))),
+        ('restaurante/time_by_city_order', lambda: views.time_by(_plan(cube), ['City', 'Type_of_order'])),
+    ]
+
+
+def timed(func, repeat=REPEAT):
+    """
+        Esta função mede uma função sem argumentos.
+        Input: função, quantidade de repetições
+        Output: lista com os tempos em segundos
+    """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def _result(n_rows, name, seconds):
+    return {'rows': n_rows, 'name': name, 'best': min(seconds),
+            'median': float(np.median(seconds)), 'seconds': seconds}
+
+
+def run_size(n_rows, repeat=REPEAT, seed=42):
+    """
+        Esta função mede a suíte inteira para um tamanho de dataset.
+        Input: quantidade de linhas, repetições, semente do gerador
+        Output: lista de resultados (dicionários)
+    """
+    path = csv_path(n_rows, seed)
+    results = []
+    # A leitura do CSV é medida uma vez só: é a mais lenta e domina o tempo total
+    start = time.perf_counter()
+    raw = read_dataset(path)
+    results.append(_result(n_rows, 'loader/read_csv', [time.perf_counter() - start]))
+    df1 = prepare_dataset(raw)
+    data = {'raw': raw, 'df1': df1, 'cube': build_cube(df1), 'index': build_filter_index(df1),
+            'sketches': build_sketches(df1), 'bins': build_geo_bins(df1)}
+    data['rollups'] = build_rollups(data['cube'], data['sketches'])
+    for name, func in cases(data):
+        results.append(_result(n_rows, name, timed(func, repeat)))
+        print('{:>10} {:<40} {:.4f} s'.format(n_rows, name, results[-1]['best']), file=sys.stderr)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, repeat=REPEAT, seed=42):
+    """
+        Esta função mede todos os tamanhos e devolve o relatório.
+        Input: lista de tamanhos, repetições, semente do gerador
+        Output: dicionário com 'meta' (commit, versões, máquina) e 'results'
+    """
+    meta = {
+        'commit': _git_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'repeat': repeat,
+        'seed': seed,
+        'sizes': list(sizes),
+    }
+    results = []
+    for n_rows in sizes:
+        results += run_size(n_rows, repeat, seed)
+    return {'meta': meta, 'results': results}
+
+
+def compare(before, after, threshold=THRESHOLD):
+    """
+        Esta função compara dois relatórios pelo melhor tempo de cada medida.
+        Input: relatório antigo, relatório novo, variação tolerada (0.10 = 10%)
+        Output: lista de (linhas, nome, antes, depois, razão depois/antes, regressão?)
+    """
+    old = {(r['rows'], r['name']): r['best'] for r in before['results']}
+    rows = []
+    for r in after['results']:
+        key = (r['rows'], r['name'])
+        if key in old:
+            ratio = r['best'] / old[key] if old[key] > 0 else float('inf')
+            rows.append((r['rows'], r['name'], old[key], r['best'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite')
+    parser.add_argument('sizes', nargs='*', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--output', help='arquivo JSON do resultado (padrão: saída padrão)')
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--compare', nargs=2, metavar=('ANTES', 'DEPOIS'))
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path, encoding='utf-8') as f:
+                reports.append(json.load(f))
+        rows = compare(reports[0], reports[1], args.threshold)
+        print('| linhas | medida | antes (s) | depois (s) | depois/antes |')
+        print('|---|---|---|---|---|')
+        for n_rows, name, t0, t1, ratio, worse in rows:
+            print('| {} | {} | {:.4f} | {:.4f} | {:.2f}x{} |'.format(n_rows, name, t0, t1, ratio, ' (regressão)' if worse else ''))
+        # Código de saída 1 quando alguma medida piorou além do limite
+        return 1 if any(row[-1] for row in rows) else 0
+
+    report = run(args.sizes, args.repeat, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+# Gerador determinístico de dados no formato do train.csv (Kaggle)
+#
+# Uso:
+#     python -m benchmarks.synthetic 100000 /tmp/train_100k.csv
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['ID', 'Delivery_person_ID', 'Delivery_person_Age', 'Delivery_person_Ratings',
+           'Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude',
+           'Delivery_location_longitude', 'Order_Date', 'Time_Orderd', 'Time_Order_picked',
+           'Weatherconditions', 'Road_traffic_density', 'Vehicle_condition', 'Type_of_order',
+           'Type_of_vehicle', 'multiple_deliveries', 'Festival', 'City', 'Time_taken(min)']
+
+# Valores no mesmo formato do arquivo original (com os espaços no final)
+CITY_CODES = ['INDO', 'BANG', 'COIMB', 'CHEN', 'HYD', 'RANCHI', 'MYS', 'DEH', 'KOC', 'PUNE',
+              'LUDH', 'KNP', 'MUM', 'KOL', 'JAP', 'SUR', 'GOA', 'AURG', 'AGR', 'VAD', 'ALH', 'BHP']
+WEATHER = ['conditions Sunny', 'conditions Stormy', 'conditions Sandstorms',
+           'conditions Cloudy', 'conditions Fog', 'conditions Windy']
+TRAFFIC = ['Low ', 'Jam ', 'Medium ', 'High ']
+ORDER = ['Snack ', 'Drinks ', 'Buffet ', 'Meal ']
+VEHICLE = ['motorcycle ', 'scooter ', 'electric_scooter ', 'bicycle ']
+FESTIVAL = ['No ', 'Yes ']
+CITY = ['Urban ', 'Metropolitian ', 'Semi-Urban ']
+
+# Frequência aproximada dos 'NaN ' em cada coluna no dataset original
+NAN_RATES = {
+    'Delivery_person_Age': 0.041,
+    'Delivery_person_Ratings': 0.042,
+    'Time_Orderd': 0.038,
+    'Weatherconditions': 0.013,
+    'Road_traffic_density': 0.013,
+    'multiple_deliveries': 0.022,
+    'Festival': 0.005,
+    'City': 0.026,
+}
+
+FIRST_DAY = np.datetime64('2022-02-11')
+N_DAYS = 55
+
+
+def _pick(rng, values, n, p=None):
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=n, p=p)]
+
+
+def generate(n_rows, seed=42, offset=0):
+    """
+        Esta função gera um dataframe sintético com o mesmo esquema, os mesmos
+        formatos de texto e os mesmos sentinelas 'NaN ' do train.csv.
+        Parâmetros:
+            Input:
+                - n_rows: quantidade de linhas
+                - seed: semente do gerador (mesma semente => mesmos dados)
+                - offset: deslocamento dos IDs, para gerar blocos sem repetição
+            Output:
+                - df: DataFrame com as colunas de COLUMNS, todas como no CSV bruto
+    """
+    rng = np.random.default_rng(seed + offset)
+    n = n_rows
+
+    ids = pd.Series(np.arange(offset, offset + n) + 0x1000).map(lambda x: '{:#x} '.format(x))
+    n_people = max(1, n // 30)
+    person = rng.integers(0, n_people, size=n)
+    city_code = np.asarray(CITY_CODES, dtype=object)[person % len(CITY_CODES)]
+    person_id = (city_code + 'RES' + pd.Series((person // len(CITY_CODES)) % 20 + 1).map('{:02d}'.format).to_numpy(dtype=object)
+                 + 'DEL' + pd.Series(person % 3 + 1).map('{:02d}'.format).to_numpy(dtype=object) + ' ')
+
+    age = rng.integers(15, 51, size=n).astype(str).astype(object)
+    ratings = np.round(rng.uniform(2.5, 5.0, size=n), 1).astype(str).astype(object)
+
+    rest_lat = np.round(rng.uniform(9.0, 31.0, size=n), 6)
+    rest_lon = np.round(rng.uniform(72.0, 88.0, size=n), 6)
+    # ~1% das coordenadas do restaurante vêm negativas no dataset original
+    flip = rng.random(n) < 0.01
+    rest_lat[flip] = -rest_lat[flip]
+    rest_lon[flip] = -rest_lon[flip]
+    offsets = rng.choice([0.01, 0.02, 0.03, 0.04, 0.05, 0.06, 0.07, 0.08, 0.09, 0.1, 0.11, 0.12, 0.13], size=(n, 2))
+    del_lat = np.round(np.abs(rest_lat) + offsets[:, 0], 6)
+    del_lon = np.round(np.abs(rest_lon) + offsets[:, 1], 6)
+
+    day = FIRST_DAY + rng.integers(0, N_DAYS, size=n).astype('timedelta64[D]')
+    order_date = pd.Series(day).dt.strftime('%d-%m-%Y').to_numpy(dtype=object)
+    minutes = rng.integers(0, 96, size=n) * 15
+    time_ordered = pd.Series(minutes).map(lambda m: '{:02d}:{:02d}:00'.format((m // 60) % 24, m % 60)).to_numpy(dtype=object)
+    picked = minutes + rng.choice([5, 10, 15], size=n)
+    time_picked = pd.Series(picked).map(lambda m: '{:02d}:{:02d}:00'.format((m // 60) % 24, m % 60)).to_numpy(dtype=object)
+
+    df = pd.DataFrame({
+        'ID': ids.to_numpy(dtype=object),
+        'Delivery_person_ID': person_id,
+        'Delivery_person_Age': age,
+        'Delivery_person_Ratings': ratings,
+        'Restaurant_latitude': rest_lat,
+        'Restaurant_longitude': rest_lon,
+        'Delivery_location_latitude': del_lat,
+        'Delivery_location_longitude': del_lon,
+        'Order_Date': order_date,
+        'Time_Orderd': time_ordered,
+        'Time_Order_picked': time_picked,
+        'Weatherconditions': _pick(rng, WEATHER, n),
+        'Road_traffic_density': _pick(rng, TRAFFIC, n, p=[0.34, 0.31, 0.24, 0.11]),
+        'Vehicle_condition': rng.integers(0, 4, size=n),
+        'Type_of_order': _pick(rng, ORDER, n),
+        'Type_of_vehicle': _pick(rng, VEHICLE, n, p=[0.58, 0.33, 0.08, 0.01]),
+        'multiple_deliveries': rng.choice(['0', '1', '2', '3'], size=n, p=[0.31, 0.62, 0.04, 0.03]).astype(object),
+        'Festival': _pick(rng, FESTIVAL, n, p=[0.98, 0.02]),
+        'City': _pick(rng, CITY, n, p=[0.22, 0.75, 0.03]),
+        'Time_taken(min)': '(min) ' + rng.integers(10, 55, size=n).astype(str).astype(object),
+    }, columns=COLUMNS)
+
+    # Sentinelas de valor ausente no mesmo formato do arquivo original
+    for col, rate in NAN_RATES.items():
+        mask = rng.random(n) < rate
+        if col == 'Weatherconditions':
+            df.loc[mask, col] = 'conditions NaN'
+        else:
+            df.loc[mask, col] = 'NaN '
+    return df
+
+
+def write_csv(n_rows, path, seed=42, chunk_size=500000):
+    """
+        Esta função grava um train.csv sintético em blocos, para que o
+        gerador não precise manter milhões de linhas em memória de uma vez.
+        Input: quantidade de linhas, caminho de saída
+        Output: caminho de saída
+    """
+    header = True
+    for start in range(0, n_rows, chunk_size):
+        df = generate(min(chunk_size, n_rows - start), seed=seed, offset=start)
+        df.to_csv(path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+    return path
+
+
+def csv_path(n_rows, seed=42):
+    """
+        Esta função devolve o train.csv sintético de n_rows linhas em /tmp,
+        gerando o arquivo só na primeira vez (os benchmarks reaproveitam).
+        Input: quantidade de linhas, semente
+        Output: caminho do CSV
+    """
+    name = 'cury_train_{}.csv' if seed == 42 else 'cury_train_{}_seed{}.csv'
+    path = os.path.join('/tmp', name.format(n_rows, seed))
+    if not os.path.exists(path):
+        # Grava num temporário: uma geração interrompida não deixa CSV pela metade
+        write_csv(n_rows, path + '.tmp', seed=seed)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+if __name__ == '__main__':
+    write_csv(int(sys.argv[1]), sys.argv[2])
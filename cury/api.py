@@ -0,0 +1,299 @@
+# API HTTP local, somente leitura, com os KPIs e tabelas do dashboard
+#
+# Uso:
+#     python -m cury.api --port 8502
+#     curl 'http://127.0.0.1:8502/api/empresa/orders_by_day?date=2022-04-06&traffic=Low,Jam'
+#
+# Rotas (GET):
+#     /api                     visões e condições de trânsito disponíveis
+#     /api/version             versão dos dados que a API está servindo
+#     /api/<visão>             KPIs e todas as tabelas da visão
+#     /api/<visão>/<tabela>    uma tabela (ex.: restaurante/time_by_festival,
+#                              entregadores/top_fastest)
+#
+# Parâmetros: date (AAAA-MM-DD, data limite como no slider das páginas) e
+# traffic (lista separada por vírgulas, ou repetida); sem eles valem os
+# filtros padrão das páginas. Os números saem das mesmas funções das páginas
+# e do export em lote (cury/views.py), então são os mesmos do dashboard.
+#
+# Cache: cada resposta fica em memória (LRU de MAX_RESPONSES) com chave na
+# rota, nos filtros e na versão dos dados que as sessões leem
+# (loader.loaded_version). O ETag é derivado dessa chave: um cliente que
+# repete a consulta com If-None-Match recebe 304 sem corpo e sem nenhum
+# cálculo enquanto os dados não mudarem. A rota (visão, tabela) e os filtros
+# são validados antes do ETag: uma rota inexistente é sempre 404. A API escuta só em 127.0.0.1 por
+# padrão e atualiza os dados em segundo plano (cury/refresh.py), como as
+# páginas.
+import argparse
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from cury.loader import DATASET_PATH, begin_rerun, end_rerun, loaded_version
+from cury.timing import finish_run, start_run
+from cury.views import DATE_LIMIT, TABLES, TRAFFIC_OPTIONS, VIEWS, json_kpis
+
+HOST = '127.0.0.1'
+PORT = 8502
+MAX_RESPONSES = 256
+
+_responses = OrderedDict()
+_stats = {'hits': 0, 'misses': 0, 'not_modified': 0}
+_lock = threading.Lock()
+
+
+class ApiError(Exception):
+    """ Erro de requisição: vira uma resposta JSON com o status HTTP. """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_filters(query):
+    """
+        Esta função lê os filtros da query string.
+        Input: query string (texto)
+        Output: tupla (data limite como pd.Timestamp, condições de trânsito em ordem)
+    """
+    params = parse_qs(query)
+    try:
+        date_limit = pd.Timestamp(datetime.strptime(params.get('date', [DATE_LIMIT.strftime('%Y-%m-%d')])[-1], '%Y-%m-%d'))
+    except ValueError:
+        raise ApiError(400, 'date deve estar no formato AAAA-MM-DD')
+    traffic = [item for value in params.get('traffic', []) for item in value.split(',') if item]
+    traffic = traffic or TRAFFIC_OPTIONS
+    unknown = sorted(set(traffic) - set(TRAFFIC_OPTIONS))
+    if unknown:
+        raise ApiError(400, 'trânsito desconhecido: ' + ', '.join(unknown))
+    return date_limit, tuple(sorted(set(traffic)))
+
+
+def _records(df_aux):
+    # to_json trata datas (ISO) e NaN (null) como o export em lote
+    return json.loads(df_aux.to_json(orient='records', date_format='iso', force_ascii=False))
+
+
+def view_payload(view, date_limit, traffic_options, path=DATASET_PATH):
+    """
+        Esta função calcula os KPIs e tabelas de uma visão (sem as figuras).
+        Input: nome da visão, data limite, condições de trânsito, caminho do CSV
+        Output: dicionário serializável com 'kpis' e 'tables'
+    """
+    # Uma execução por requisição: os tempos vão para o log das etapas e os
+    # dados lidos são todos da mesma geração (cury/loader.py)
+    run = start_run('api/' + view)
+    begin_rerun()
+    try:
+        result = VIEWS[view](path, date_limit, list(traffic_options))
+    finally:
+        end_rerun()
+        finish_run(run)
+    return {
+        'view': view,
+        'date_limit': date_limit.isoformat(),
+        'traffic_options': list(traffic_options),
+        'kpis': json_kpis(result['kpis']),
+        'tables': {name: _records(df_aux) for name, df_aux in result['tables'].items()},
+    }
+
+
+def etag(key):
+    """
+        Esta função monta o ETag de uma resposta a partir da chave do cache
+        (rota, filtros e versão dos dados).
+        Input: chave (tupla)
+        Output: ETag entre aspas
+    """
+    return '"' + hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:20] + '"'
+
+
+def _cached(key, compute):
+    with _lock:
+        if key in _responses:
+            _stats['hits'] += 1
+            _responses.move_to_end(key)
+            return _responses[key]
+        _stats['misses'] += 1
+    # allow_nan=False: um NaN que escape vira erro aqui, não JSON inválido
+    body = json.dumps(compute(), ensure_ascii=False, allow_nan=False).encode('utf-8')
+    with _lock:
+        _responses[key] = body
+        _responses.move_to_end(key)
+        while len(_responses) > MAX_RESPONSES:
+            _responses.popitem(last=False)
+    return body
+
+
+def parse_route(route):
+    """
+        Esta função valida a rota sem calcular nada.
+        Input: caminho da URL (ex.: '/api/empresa/orders_by_day')
+        Output: tupla (visão, tabela): (None, None) para /api, ('version',
+                None) para /api/version e tabela None para a visão inteira
+    """
+    parts = [part for part in route.split('/') if part]
+    if not parts or parts[0] != 'api' or len(parts) > 3:
+        raise ApiError(404, 'rota desconhecida: ' + route)
+    if len(parts) == 1:
+        return None, None
+    if parts[1] == 'version' and len(parts) == 2:
+        return 'version', None
+    view = parts[1]
+    if view not in VIEWS:
+        raise ApiError(404, 'visão desconhecida: ' + view)
+    table = parts[2] if len(parts) == 3 else None
+    if table is not None and table not in TABLES[view]:
+        raise ApiError(404, 'tabela desconhecida: ' + table)
+    return view, table
+
+
+def respond(route, query, path=DATASET_PATH, if_none_match=None):
+    """
+        Esta função resolve uma requisição GET. A rota e os filtros são
+        validados primeiro; o ETag é comparado com If-None-Match antes de
+        qualquer cálculo.
+        Parâmetros:
+            Input:
+                - route: caminho da URL (ex.: '/api/empresa/orders_by_day')
+                - query: query string
+                - path: caminho do CSV
+                - if_none_match: cabeçalho If-None-Match do cliente (ou None)
+            Output:
+                - tupla (status 200 ou 304, ETag ou None, corpo em bytes)
+    """
+    view, table = parse_route(route)
+    if view is None:
+        return 200, None, json.dumps({'views': sorted(VIEWS), 'traffic_options': TRAFFIC_OPTIONS}).encode('utf-8')
+    if view == 'version':
+        return 200, None, json.dumps({'version': loaded_version(path), 'cache': cache_info()}).encode('utf-8')
+    date_limit, traffic_options = parse_filters(query)
+    version = loaded_version(path)
+    view_key = ('/api/' + view, date_limit, traffic_options, version)
+    key = view_key if table is None else ('/api/{}/{}'.format(view, table), date_limit, traffic_options, version)
+    tag = etag(key)
+    if not_modified(tag, if_none_match):
+        with _lock:
+            _stats['not_modified'] += 1
+        return 304, tag, b''
+    if table is None:
+        return 200, tag, _cached(view_key, lambda: view_payload(view, date_limit, traffic_options, path))
+
+    def compute():
+        payload = json.loads(_cached(view_key, lambda: view_payload(view, date_limit, traffic_options, path)))
+        return {'view': view, 'table': table, 'date_limit': payload['date_limit'],
+                'traffic_options': payload['traffic_options'], 'rows': payload['tables'][table]}
+
+    return 200, tag, _cached(key, compute)
+
+
+def not_modified(tag, if_none_match):
+    """
+        Esta função compara o ETag com o cabeçalho If-None-Match do cliente.
+        Input: ETag da resposta, valor do cabeçalho (ou None)
+        Output: True se o cliente já tem a resposta atual
+    """
+    if tag is None or not if_none_match:
+        return False
+    tags = [item.strip() for item in if_none_match.split(',')]
+    return '*' in tags or tag in tags or 'W/' + tag in tags
+
+
+class Handler(BaseHTTPRequestHandler):
+    """ Atende as requisições GET da API (uma thread por conexão). """
+
+    server_version = 'cury-api'
+    # Caminho do CSV servido (definido por serve)
+    dataset_path = DATASET_PATH
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            status, tag, body = respond(url.path, url.query, self.dataset_path, self.headers.get('If-None-Match'))
+            self._send(status, body, tag)
+        except ApiError as error:
+            self._send(error.status, json.dumps({'error': str(error)}, ensure_ascii=False).encode('utf-8'))
+        except Exception as error:
+            self._send(500, json.dumps({'error': repr(error)}, ensure_ascii=False).encode('utf-8'))
+
+    def _send(self, status, body, tag=None):
+        self.send_response(status)
+        if tag is not None:
+            self.send_header('ETag', tag)
+            # O cliente sempre revalida; com o ETag igual a resposta é um 304
+            self.send_header('Cache-Control', 'no-cache')
+        if status != 304:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Sem uma linha no stderr por requisição (o polling seria ruidoso)
+        pass
+
+
+def serve(host=HOST, port=PORT, path=DATASET_PATH, refresh=True):
+    """
+        Esta função cria o servidor da API (sem começar a atender).
+        Parâmetros:
+            Input:
+                - host, port: endereço (port=0 escolhe uma porta livre)
+                - path: caminho do CSV
+                - refresh: liga a atualização dos dados em segundo plano
+            Output:
+                - servidor (ThreadingHTTPServer); use serve_forever() ou
+                  rode numa thread e chame shutdown() no fim
+    """
+    if refresh:
+        from cury.refresh import start_refresher
+
+        start_refresher(path)
+    handler = type('Handler', (Handler,), {'dataset_path': path})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def cache_info():
+    """
+        Esta função devolve os contadores do cache de respostas.
+        Output: dicionário com 'hits', 'misses', 'not_modified', 'size' e 'max_size'
+    """
+    with _lock:
+        return dict(_stats, size=len(_responses), max_size=MAX_RESPONSES)
+
+
+def clear_responses():
+    """ Esta função esvazia o cache de respostas e zera os contadores. """
+    with _lock:
+        _responses.clear()
+        for name in _stats:
+            _stats[name] = 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m cury.api')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--path', default=DATASET_PATH)
+    args = parser.parse_args(argv)
+    server = serve(args.host, args.port, args.path)
+    print('http://{}:{}/api'.format(*server.server_address[:2]), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
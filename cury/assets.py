@@ -0,0 +1,65 @@
+# Arquivos estáticos (logo) carregados uma vez por processo
+#
+# A cada reexecução as páginas abriam o logo.png (1601 x 700) com
+# Image.open, e o st.image decodificava, reduzia para a largura da barra
+# lateral e recodificava a imagem. Aqui a imagem é decodificada e reduzida
+# uma única vez por processo e por largura; o st.image recebe os bytes PNG
+# já no tamanho final e os envia sem reprocessar.
+#
+# A chave do cache inclui a assinatura do arquivo (tamanho e mtime): trocar o
+# logo no disco gera uma nova versão sem reiniciar o servidor.
+import io
+import os
+import threading
+
+from PIL import Image
+
+from cury.loader import file_signature
+from cury.timing import stage
+
+# Logo na raiz do projeto, independente do diretório de trabalho
+LOGO_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logo.png')
+LOGO_WIDTH = 200
+
+_images = {}
+_lock = threading.Lock()
+
+
+def image_bytes(path, width=None):
+    """
+        Esta função devolve a imagem em PNG, reduzida para a largura pedida.
+        Parâmetros:
+            Input:
+                - path: caminho da imagem
+                - width: largura final em pixels (None mantém o tamanho)
+            Output:
+                - bytes do PNG (em cache no processo)
+    """
+    key = (file_signature(path), width)
+    with _lock:
+        if key in _images:
+            return _images[key]
+    with stage('asset/' + os.path.basename(path)):
+        image = Image.open(path)
+        image.load()
+        if width is not None and image.width > width:
+            # Mesmo redimensionamento que o st.image faria
+            height = int(1.0 * image.height * width / image.width)
+            image = image.resize((width, height), resample=Image.BILINEAR)
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        data = buffer.getvalue()
+    with _lock:
+        _images[key] = data
+    return data
+
+
+def sidebar_logo(path=LOGO_PATH, width=LOGO_WIDTH):
+    """
+        Esta função mostra o logo na barra lateral.
+        Input: caminho da imagem, largura em pixels
+        Output: None (desenha no Streamlit)
+    """
+    import streamlit as st
+
+    st.sidebar.image(image_bytes(path, width), width=width)
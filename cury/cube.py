@@ -0,0 +1,167 @@
+# Cubo pré-agregado que alimenta os gráficos do dashboard
+#
+# Cada célula do cubo é uma combinação de Order_Date x Road_traffic_density x
+# City x Festival x Type_of_order x Weatherconditions e guarda a quantidade de
+# pedidos e, para cada medida, contagem, soma e soma dos quadrados. Com isso
+# contagens, médias e desvios padrão por qualquer subconjunto das dimensões
+# saem do cubo por roll-up, sem voltar às linhas dos pedidos.
+import numpy as np
+import pandas as pd
+
+from cury import snapshot
+from cury.loader import DATASET_PATH, generation_manifest, load_derived
+from cury.timing import stage
+
+DIMENSIONS = ['Order_Date', 'Road_traffic_density', 'City', 'Festival', 'Type_of_order', 'Weatherconditions']
+
+# Nome curto da medida -> coluna do dataset
+MEASURES = {
+    'time': 'Time_taken(min)',
+    'rating': 'Delivery_person_Ratings',
+    'distance': 'distance_km',
+}
+
+
+def build_cube(df1):
+    """
+        Esta função agrega o dataframe limpo no nível das DIMENSIONS.
+        Input: DataFrame limpo (com as colunas de DIMENSIONS e MEASURES)
+        Output: DataFrame com uma linha por célula não vazia e as colunas
+                'orders', '<medida>_count', '<medida>_sum' e '<medida>_sumsq'
+    """
+    values = {'orders': np.ones(len(df1), dtype=np.int64)}
+    for name, col in MEASURES.items():
+        x = df1[col].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(x)
+        x = np.where(valid, x, 0.0)
+        values[name + '_count'] = valid.astype(np.int64)
+        values[name + '_sum'] = x
+        values[name + '_sumsq'] = x * x
+    values = pd.DataFrame(values, index=df1.index)
+    keys = [df1[dim] for dim in DIMENSIONS]
+    cube = values.groupby(keys, observed=True).sum()
+    return cube.reset_index()
+
+
+def merge_frames(frames, keys, how='sum'):
+    """
+        Esta função junta agregados parciais (de blocos diferentes de
+        pedidos) combinando as linhas com as mesmas chaves.
+        Parâmetros:
+            Input:
+                - frames: lista de DataFrames com as colunas de keys
+                - keys: colunas que identificam cada linha
+                - how: agregação das demais colunas ('sum', 'min', 'max' ou
+                  dicionário coluna -> agregação)
+            Output:
+                - DataFrame com uma linha por combinação de keys
+    """
+    df_aux = pd.concat(frames, ignore_index=True)
+    for key in keys:
+        if df_aux[key].dtype.name == 'object' and any(f[key].dtype.name == 'category' for f in frames):
+            # Blocos com categorias diferentes: une as categorias, em ordem
+            categories = sorted(set().union(*(f[key].astype(object).dropna().unique() for f in frames)))
+            df_aux[key] = pd.Categorical(df_aux[key], categories=categories)
+    groups = df_aux.drop(columns=keys).groupby([df_aux[key] for key in keys], observed=True)
+    return groups.agg(how).reset_index()
+
+
+def merge_cubes(cubes):
+    """
+        Esta função junta cubos parciais somando as células com as mesmas
+        dimensões.
+        Input: lista de cubos
+        Output: cubo com a soma de todos
+    """
+    return merge_frames(cubes, DIMENSIONS)
+
+
+def load_cube(path=DATASET_PATH):
+    """
+        Esta função devolve o cubo do dataset atual, construído uma única
+        vez por versão dos dados (mesmo cache de load_dataset). Se o snapshot
+        já traz o cubo gravado (mantido pela ingestão incremental), ele é
+        lido do disco em vez de recalculado; senão é calculado em paralelo
+        (cury/parallel.py) quando o dataset é grande.
+        Input: caminho do CSV
+        Output: DataFrame do cubo (compartilhado; não alterar no lugar)
+    """
+    def builder(df1):
+        # Manifesto da geração dos dados (não o do disco, que pode ser mais novo)
+        manifest = generation_manifest(path)
+        if manifest is not None and manifest.get('cube'):
+            return snapshot.read_tables([snapshot.resolve(path, manifest['cube'])])
+        # Datasets grandes: cubos parciais por faixa de datas, em paralelo
+        from cury.parallel import aggregate
+
+        return aggregate(df1, build_cube, merge_cubes)
+
+    return load_derived('cube', builder, path, columns=DIMENSIONS + list(MEASURES.values()))
+
+
+def filter_cube(cube, date_limit, traffic_options):
+    """
+        Esta função aplica os filtros da barra lateral às células do cubo.
+        Input: cubo, data limite (exclusiva), lista de condições de trânsito
+        Output: cubo filtrado
+    """
+    with stage('filtro/cubo', rows_in=len(cube)) as record:
+        linhas_selecionadas = (cube['Order_Date'] < date_limit) & cube['Road_traffic_density'].isin(traffic_options)
+        cube = cube.loc[linhas_selecionadas, :]
+        record['rows_out'] = len(cube)
+    return cube
+
+
+def count_by(cube, by, name='orders'):
+    """
+        Esta função conta os pedidos agrupados por uma ou mais dimensões.
+        Input: cubo, dimensão (ou lista), nome da coluna de contagem
+        Output: DataFrame com as dimensões e a contagem, ordenado pelas dimensões
+    """
+    df_aux = cube.groupby(by, observed=True)['orders'].sum().sort_index()
+    return df_aux.rename(name).reset_index()
+
+
+def mean_std_from_sums(n, total, total_sq):
+    """
+        Esta função calcula média e desvio padrão amostral a partir da
+        contagem, da soma e da soma dos quadrados.
+        Input: arrays (ou números) n, soma, soma dos quadrados
+        Output: tupla (média, desvio padrão)
+    """
+    n = np.asarray(n, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / n
+        # Variância amostral (ddof=1), como o .std() do pandas
+        var = np.where(n > 1, (total_sq - total * mean) / (n - 1), np.nan)
+    return mean, np.sqrt(np.clip(var, 0, None))
+
+
+def mean_std_by(cube, by, measure):
+    """
+        Esta função calcula média e desvio padrão de uma medida agrupada por
+        uma ou mais dimensões, a partir das somas do cubo.
+        Parâmetros:
+            Input:
+                - cube: cubo (filtrado ou não)
+                - by: dimensão ou lista de dimensões
+                - measure: 'time', 'rating' ou 'distance'
+            Output:
+                - DataFrame com as dimensões e as colunas 'mean' e 'std'
+    """
+    cols = [measure + '_count', measure + '_sum', measure + '_sumsq']
+    df_aux = cube.groupby(by, observed=True)[cols].sum().sort_index()
+    mean, std = mean_std_from_sums(df_aux[cols[0]], df_aux[cols[1]].to_numpy(), df_aux[cols[2]].to_numpy())
+    df_aux = pd.DataFrame({'mean': mean, 'std': std}, index=df_aux.index)
+    return df_aux.reset_index()
+
+
+def mean_std(cube, measure):
+    """
+        Esta função calcula média e desvio padrão de uma medida no cubo todo.
+        Input: cubo, medida ('time', 'rating' ou 'distance')
+        Output: tupla (média, desvio padrão)
+    """
+    mean, std = mean_std_from_sums(cube[measure + '_count'].sum(), cube[measure + '_sum'].sum(),
+                                   cube[measure + '_sumsq'].sum())
+    return float(mean), float(std)
@@ -0,0 +1,251 @@
+# Export em lote dos KPIs e gráficos das três visões, sem o Streamlit
+#
+# Uso:
+#     python -m cury.export --output export/
+#     python -m cury.export --date 2022-04-06 --traffic Low Medium --format json parquet
+#
+# Calcula, para uma data limite e uma seleção de trânsito, tudo o que as três
+# páginas mostram e grava em --output:
+#
+#     manifest.json                filtros, versão dos dados, KPIs e arquivos
+#     <visão>/kpis.json            métricas (idades, distância média...)
+#     <visão>/<tabela>.json        tabelas e dados dos gráficos (e .parquet)
+#     <visão>/<gráfico>.html       figura estática pronta (plotly.js da CDN)
+#     <visão>/<gráfico>.plotly.json
+#
+# Os KPIs, tabelas e gráficos saem das mesmas funções que as páginas chamam
+# (cury/views.py), então o export mostra sempre os números do dashboard.
+# Cada visão roda num processo do pool (spawn, como em cury/parallel.py) e
+# grava os próprios arquivos; o manifesto é gravado por último e trocado de
+# uma vez.
+#
+# Rodando o export toda noite com os filtros padrão das páginas, o dashboard
+# carrega as figuras prontas no cache (preload_export, com CURY_EXPORT_DIR
+# apontando para a pasta) enquanto a versão dos dados for a mesma do export:
+# o pico da manhã não recalcula nada. As páginas pedem o preload uma vez por
+# processo; um export novo é carregado pela thread de atualização
+# (cury/refresh.py), fora das reexecuções.
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from cury.loader import DATASET_PATH, dataset_version, loaded_version
+from cury.timing import stage
+from cury.views import DATE_LIMIT, TRAFFIC_OPTIONS, VIEWS, json_kpis
+
+EXPORT_ENV = 'CURY_EXPORT_DIR'
+MANIFEST = 'manifest.json'
+
+FORMATS = ['json', 'parquet']
+
+_preloaded = set()
+_started = set()
+_lock = threading.Lock()
+
+
+def write_table(df_aux, base, formats):
+    """
+        Esta função grava uma tabela em JSON (registros) e/ou Parquet.
+        Input: DataFrame, caminho sem extensão, lista de formatos
+        Output: lista dos arquivos gravados
+    """
+    files = []
+    if 'json' in formats:
+        df_aux.to_json(base + '.json', orient='records', date_format='iso', force_ascii=False)
+        files.append(base + '.json')
+    if 'parquet' in formats:
+        df_aux.to_parquet(base + '.parquet', index=False)
+        files.append(base + '.parquet')
+    return files
+
+
+def write_figure(fig, base):
+    """
+        Esta função grava uma figura como HTML estático (e a especificação
+        Plotly em JSON, usada por preload_export). Mapas do folium já chegam
+        como HTML pronto.
+        Input: figura Plotly ou HTML (texto), caminho sem extensão
+        Output: lista dos arquivos gravados
+    """
+    if isinstance(fig, str):
+        with open(base + '.html', 'w', encoding='utf-8') as f:
+            f.write(fig)
+        return [base + '.html']
+    fig.write_html(base + '.html', include_plotlyjs='cdn')
+    with open(base + '.plotly.json', 'w', encoding='utf-8') as f:
+        f.write(fig.to_json())
+    return [base + '.html', base + '.plotly.json']
+
+
+def export_view(name, path, date_limit, traffic_options, output, formats=FORMATS):
+    """
+        Esta função calcula uma visão e grava os arquivos dela (roda num
+        processo do pool).
+        Parâmetros:
+            Input:
+                - name: 'empresa', 'entregadores' ou 'restaurante'
+                - path: caminho do CSV
+                - date_limit, traffic_options: filtros da barra lateral
+                - output: pasta de saída
+                - formats: formatos das tabelas ('json', 'parquet')
+            Output:
+                - dicionário com 'kpis', 'files' (relativos a output),
+                  'figures' (id do gráfico -> arquivo) e 'seconds'
+    """
+    start = time.perf_counter()
+    result = VIEWS[name](path, date_limit, traffic_options)
+    folder = os.path.join(output, name)
+    os.makedirs(folder, exist_ok=True)
+    # Os mesmos valores da API: KPI sem pedidos na seleção vira null
+    kpis = json_kpis(result['kpis'])
+    with open(os.path.join(folder, 'kpis.json'), 'w', encoding='utf-8') as f:
+        json.dump(kpis, f, indent=2, ensure_ascii=False, allow_nan=False)
+    files = [os.path.join(folder, 'kpis.json')]
+    for table, df_aux in result['tables'].items():
+        files += write_table(df_aux, os.path.join(folder, table), formats)
+    figures = {}
+    for chart_id, builder in result['figures'].items():
+        # 'empresa/order_by_period/week' -> empresa/order_by_period_week.*
+        written = write_figure(builder(), os.path.join(folder, chart_id.split('/', 1)[1].replace('/', '_')))
+        files += written
+        # O que o preload coloca no cache: a especificação Plotly ou o HTML do mapa
+        figures[chart_id] = os.path.relpath(written[-1], output)
+    return {'kpis': kpis, 'files': [os.path.relpath(file, output) for file in files],
+            'figures': figures, 'seconds': time.perf_counter() - start}
+
+
+def export_all(path=DATASET_PATH, date_limit=DATE_LIMIT, traffic_options=TRAFFIC_OPTIONS,
+               output='export', formats=FORMATS, workers=None):
+    """
+        Esta função exporta as três visões em paralelo e grava o manifesto.
+        Parâmetros:
+            Input:
+                - path: caminho do CSV
+                - date_limit, traffic_options: filtros da barra lateral
+                - output: pasta de saída
+                - formats: formatos das tabelas
+                - workers: processos (None = CURY_WORKERS ou CPUs, no máximo 3;
+                  1 roda tudo neste processo)
+            Output:
+                - manifesto (dicionário)
+    """
+    from cury.parallel import default_workers
+
+    start = time.perf_counter()
+    # A versão é lida antes: se os dados mudarem durante o export, o
+    # manifesto não bate com os arquivos novos e o preload não usa o export
+    version = dataset_version(path)
+    workers = min(len(VIEWS), workers or default_workers())
+    os.makedirs(output, exist_ok=True)
+    args = (path, pd.Timestamp(date_limit).to_pydatetime(), list(traffic_options), output, list(formats))
+    if workers > 1:
+        # spawn: cada processo carrega o dataset do snapshot (memory map)
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = {name: pool.submit(export_view, name, *args) for name in VIEWS}
+            views = {name: future.result() for name, future in futures.items()}
+    else:
+        views = {name: export_view(name, *args) for name in VIEWS}
+    manifest = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'dataset_version': version,
+        'date_limit': pd.Timestamp(date_limit).isoformat(),
+        'traffic_options': sorted(traffic_options),
+        'views': views,
+        'seconds': time.perf_counter() - start,
+    }
+    tmp_path = os.path.join(output, MANIFEST + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False, allow_nan=False)
+    os.replace(tmp_path, os.path.join(output, MANIFEST))
+    return manifest
+
+
+def _version(value):
+    # JSON devolve listas; a versão do loader é feita de tuplas
+    return tuple(None if item is None else tuple(item) for item in value)
+
+
+def load_export(output, path=DATASET_PATH):
+    """
+        Esta função coloca no cache de figuras as figuras de um export, se
+        ele foi feito sobre a mesma versão dos dados que as sessões leem.
+        Cada manifesto é carregado uma vez por versão dos dados.
+        Input: pasta do export, caminho do CSV
+        Output: quantidade de figuras carregadas
+    """
+    manifest_file = os.path.join(output, MANIFEST)
+    if not os.path.exists(manifest_file):
+        return 0
+    version = loaded_version(path)
+    key = (os.path.abspath(manifest_file), os.stat(manifest_file).st_mtime_ns, version)
+    with _lock:
+        if key in _preloaded:
+            return 0
+        _preloaded.add(key)
+    with open(manifest_file, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if _version(manifest['dataset_version']) != version:
+        return 0
+    import plotly.io as pio
+
+    from cury.figures import store_figure
+
+    count = 0
+    with stage('export/preload') as record:
+        for view in manifest['views'].values():
+            for chart_id, name in view['figures'].items():
+                with open(os.path.join(output, name), encoding='utf-8') as f:
+                    text = f.read()
+                fig = pio.from_json(text) if name.endswith('.plotly.json') else text
+                store_figure(chart_id, manifest['date_limit'], manifest['traffic_options'], fig, path)
+                count += 1
+        record['rows_out'] = count
+    return count
+
+
+def preload_export(output=None, path=DATASET_PATH):
+    """
+        Esta função carrega as figuras do export (load_export) na primeira
+        chamada do processo; as reexecuções seguintes só consultam um
+        conjunto, sem tocar no disco. Exports novos são carregados pela
+        thread de atualização (cury/refresh.py).
+        Input: pasta do export (None = CURY_EXPORT_DIR; sem ela não faz nada), caminho do CSV
+        Output: quantidade de figuras carregadas
+    """
+    output = output or os.environ.get(EXPORT_ENV)
+    if not output or output in _started:
+        return 0
+    with _lock:
+        if output in _started:
+            return 0
+        _started.add(output)
+    return load_export(output, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m cury.export')
+    parser.add_argument('--path', default=DATASET_PATH)
+    parser.add_argument('--date', default=DATE_LIMIT.strftime('%Y-%m-%d'), help='data limite (AAAA-MM-DD)')
+    parser.add_argument('--traffic', nargs='+', default=TRAFFIC_OPTIONS, choices=TRAFFIC_OPTIONS)
+    parser.add_argument('--output', default='export')
+    parser.add_argument('--format', nargs='+', default=FORMATS, choices=FORMATS, dest='formats')
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args(argv)
+    manifest = export_all(args.path, datetime.strptime(args.date, '%Y-%m-%d'), args.traffic,
+                          args.output, args.formats, args.workers)
+    print(json.dumps({name: view['kpis'] for name, view in manifest['views'].items()},
+                     indent=2, ensure_ascii=False))
+    print('{:.2f} s -> {}'.format(manifest['seconds'], os.path.join(args.output, MANIFEST)), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# Cache LRU das figuras Plotly prontas
+#
+# O Streamlit reexecuta a página inteira a cada interação (até quando só o
+# checkbox da tabela muda). As figuras dependem apenas do gráfico, dos
+# filtros da barra lateral e da versão dos dados, então são guardadas com
+# essa chave e reaproveitadas: numa interação repetida não há nem agregação
+# nem montagem da figura.
+#
+# O cache guarda no máximo MAX_FIGURES figuras (as menos usadas saem
+# primeiro) e é compartilhado entre sessões: as figuras não devem ser
+# alteradas depois de devolvidas.
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from cury.loader import DATASET_PATH, loaded_version
+from cury.timing import stage
+
+MAX_FIGURES = 128
+
+_figures = OrderedDict()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+_lock = threading.Lock()
+
+
+def figure_key(chart_id, date_limit, traffic_options, path=DATASET_PATH):
+    """
+        Esta função monta a chave de uma figura no cache.
+        Input: id do gráfico, data limite, lista de condições de trânsito, caminho do CSV
+        Output: tupla (id, data, trânsito em ordem, versão dos dados)
+    """
+    return (chart_id, pd.Timestamp(date_limit), tuple(sorted(traffic_options)), loaded_version(path))
+
+
+def cached_figure(chart_id, date_limit, traffic_options, builder, path=DATASET_PATH):
+    """
+        Esta função devolve a figura do cache ou a monta com builder.
+        Parâmetros:
+            Input:
+                - chart_id: nome único do gráfico (ex.: 'empresa/order_metric')
+                - date_limit: data limite do filtro
+                - traffic_options: condições de trânsito do filtro
+                - builder: função sem argumentos que agrega e monta a figura
+                - path: caminho do CSV
+            Output:
+                - figura Plotly (compartilhada; não alterar no lugar)
+    """
+    key = figure_key(chart_id, date_limit, traffic_options, path)
+    with _lock:
+        if key in _figures:
+            _stats['hits'] += 1
+            _figures.move_to_end(key)
+            return _figures[key]
+        _stats['misses'] += 1
+    # Monta fora do lock: outras sessões continuam lendo o cache
+    with stage('figura/' + chart_id):
+        fig = builder()
+    with _lock:
+        _figures[key] = fig
+        _figures.move_to_end(key)
+        while len(_figures) > MAX_FIGURES:
+            _figures.popitem(last=False)
+            _stats['evictions'] += 1
+    return fig
+
+
+def store_figure(chart_id, date_limit, traffic_options, fig, path=DATASET_PATH):
+    """
+        Esta função coloca no cache uma figura montada fora do dashboard
+        (ex.: pelo export em lote, cury/export.py).
+        Input: id do gráfico, data limite, condições de trânsito, figura, caminho do CSV
+        Output: None
+    """
+    key = figure_key(chart_id, date_limit, traffic_options, path)
+    with _lock:
+        _figures[key] = fig
+        _figures.move_to_end(key)
+        while len(_figures) > MAX_FIGURES:
+            _figures.popitem(last=False)
+            _stats['evictions'] += 1
+
+
+def figure_cache_info():
+    """
+        Esta função devolve os contadores do cache de figuras.
+        Output: dicionário com 'hits', 'misses', 'evictions', 'size' e 'max_size'
+    """
+    with _lock:
+        return dict(_stats, size=len(_figures), max_size=MAX_FIGURES)
+
+
+def clear_figures():
+    """ Esta função esvazia o cache de figuras e zera os contadores. """
+    with _lock:
+        _figures.clear()
+        for name in _stats:
+            _stats[name] = 0
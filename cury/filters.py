@@ -0,0 +1,117 @@
+# Filtros da barra lateral com índices pré-calculados
+#
+# O dataset é carregado ordenado por Order_Date (ver loader.build_dataset),
+# então o corte de data vira uma busca binária. Para Road_traffic_density
+# guardamos as posições das linhas de cada categoria, e o filtro de trânsito
+# vira a união das posições das categorias escolhidas. O custo passa a
+# depender do tamanho da seleção, não do tamanho do dataset.
+import numpy as np
+import pandas as pd
+
+from cury.loader import DATASET_PATH, load_derived
+from cury.timing import stage
+
+
+def build_filter_index(df1):
+    """
+        Esta função monta o índice usado pelos filtros de data e de trânsito.
+        Input: DataFrame limpo, ordenado por Order_Date
+        Output: dicionário com
+                - 'dates': array de Order_Date (ordenado)
+                - 'traffic': {categoria: posições das linhas (ordenadas)}
+    """
+    if not df1['Order_Date'].is_monotonic_increasing:
+        raise ValueError('o dataset precisa estar ordenado por Order_Date')
+    traffic = df1['Road_traffic_density']
+    codes = traffic.cat.codes.to_numpy()
+    # Um único argsort estável agrupa as posições por categoria, já ordenadas
+    order = np.argsort(codes, kind='stable')
+    # Posições em int32 quando cabem: metade da memória no índice e nas seleções
+    if len(order) < 2 ** 31:
+        order = order.astype(np.int32)
+    bounds = np.searchsorted(codes[order], np.arange(len(traffic.cat.categories) + 1))
+    positions = {}
+    for i, category in enumerate(traffic.cat.categories):
+        positions[category] = order[bounds[i]:bounds[i + 1]]
+    return {'dates': df1['Order_Date'].to_numpy(), 'traffic': positions}
+
+
+def load_filter_index(path=DATASET_PATH):
+    """ Esta função devolve o índice de filtros da versão atual do dataset. """
+    return load_derived('filter_index', build_filter_index, path, columns=['Order_Date', 'Road_traffic_density'])
+
+
+def filter_positions(index, date_limit, traffic_options):
+    """
+        Esta função calcula as posições das linhas que passam nos filtros.
+        Parâmetros:
+            Input:
+                - index: saída de build_filter_index
+                - date_limit: data limite (exclusiva)
+                - traffic_options: condições de trânsito selecionadas
+            Output:
+                - (end, positions): end é o número de linhas antes da data
+                  limite; positions é None quando todas as categorias foram
+                  escolhidas (seleção = linhas [0, end)), senão um array
+                  ordenado com as posições selecionadas
+    """
+    end = int(np.searchsorted(index['dates'], pd.Timestamp(date_limit).to_datetime64(), side='left'))
+    options = set(traffic_options)
+    selected = [c for c in index['traffic'] if c in options]
+    if len(selected) == len(index['traffic']):
+        return end, None
+    parts = []
+    for category in selected:
+        pos = index['traffic'][category]
+        parts.append(pos[:np.searchsorted(pos, end)])
+    if not parts:
+        return end, np.empty(0, dtype=np.int64)
+    # Posições de categorias diferentes não se repetem: basta juntar e ordenar
+    return end, np.sort(np.concatenate(parts))
+
+
+def filter_view(df1, index, date_limit, traffic_options):
+    """
+        Esta função aplica os filtros sem copiar o dataframe: devolve só a
+        seleção de linhas. O dataframe compartilhado continua único no
+        processo, e cada sessão guarda apenas a seleção.
+        Parâmetros:
+            Input:
+                - df1: DataFrame (mesma ordem de linhas do índice)
+                - index: saída de build_filter_index
+                - date_limit: data limite (exclusiva)
+                - traffic_options: condições de trânsito selecionadas
+            Output:
+                - view (dicionário) com 'data' (o próprio df1), 'rows'
+                  (slice das linhas [0, end) ou array de posições) e 'size'
+    """
+    with stage('filtro', rows_in=len(df1)) as record:
+        end, positions = filter_positions(index, date_limit, traffic_options)
+        rows = slice(0, end) if positions is None else positions
+        size = end if positions is None else len(positions)
+        record['rows_out'] = size
+    return {'data': df1, 'rows': rows, 'size': size}
+
+
+def view_frame(view, columns=None):
+    """
+        Esta função materializa as linhas selecionadas. Com a seleção
+        contínua (todas as condições de trânsito) e todas as colunas, o
+        resultado é uma view somente leitura do dataframe compartilhado, sem
+        cópia; nos demais casos só as linhas e colunas pedidas são copiadas.
+        Input: view (saída de filter_view), lista de colunas (None = todas)
+        Output: DataFrame
+    """
+    df1 = view['data']
+    if columns is None:
+        return df1.iloc[view['rows']]
+    return df1.iloc[view['rows'], [df1.columns.get_loc(col) for col in columns]]
+
+
+def filter_dataset(df1, index, date_limit, traffic_options):
+    """
+        Esta função aplica os filtros de data e de trânsito usando o índice.
+        Input: DataFrame (mesma ordem de linhas do índice), índice, data limite, trânsito
+        Output: DataFrame filtrado
+    """
+    return view_frame(filter_view(df1, index, date_limit, traffic_options))
@@ -0,0 +1,38 @@
+# Cálculos geográficos vetorizados
+import numpy as np
+
+# Mesmo raio médio da Terra usado pelo pacote haversine
+AVG_EARTH_RADIUS_KM = 6371.0088
+
+COORDINATE_COLUMNS = ['Restaurant_latitude', 'Restaurant_longitude',
+                      'Delivery_location_latitude', 'Delivery_location_longitude']
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+        Esta função calcula a distância do grande círculo (haversine) entre
+        dois pontos, para arrays inteiros de uma vez com NumPy.
+        Parâmetros:
+            Input:
+                - lat1, lon1: coordenadas do ponto de origem, em graus
+                - lat2, lon2: coordenadas do ponto de destino, em graus
+            Output:
+                - array com as distâncias em km
+    """
+    lat1 = np.radians(np.asarray(lat1, dtype=np.float64))
+    lon1 = np.radians(np.asarray(lon1, dtype=np.float64))
+    lat2 = np.radians(np.asarray(lat2, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lon2, dtype=np.float64))
+    d = (np.sin((lat2 - lat1) * 0.5) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2)
+    return 2 * AVG_EARTH_RADIUS_KM * np.arcsin(np.sqrt(d))
+
+
+def delivery_distance(df1):
+    """
+        Esta função calcula a distância entre o restaurante e o local de
+        entrega de cada pedido.
+        Input: DataFrame com as colunas de COORDINATE_COLUMNS
+        Output: array com as distâncias em km
+    """
+    return haversine_km(*(df1[col].to_numpy() for col in COORDINATE_COLUMNS))
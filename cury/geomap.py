@@ -0,0 +1,190 @@
+# Visão geográfica escalável: grade de coordenadas e mapa em cache
+#
+# As coordenadas dos restaurantes e dos locais de entrega são agrupadas numa
+# grade fixa de GRID_DEGREES graus (operações vetorizadas, uma vez por versão
+# dos dados). Cada célula da grade guarda a quantidade de pedidos por
+# Order_Date x Road_traffic_density, então os filtros da barra lateral
+# continuam valendo. O mapa recebe uma camada de calor ou de agrupamento com
+# um ponto por célula da grade, e não um marcador por pedido. Se a seleção
+# ocupa mais de MAX_POINTS células, a grade é engrossada (células 2x, 4x...
+# maiores) até caber: o tamanho do HTML e o tempo de montagem ficam limitados,
+# qualquer que seja o número de pedidos.
+#
+# O HTML pronto do mapa fica num cache LRU (MAX_MAPS mapas) com chave na
+# versão dos dados, nos filtros e na camada escolhida.
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from cury.cube import filter_cube
+from cury.loader import DATASET_PATH, load_derived, loaded_version
+from cury.timing import stage
+
+# ~5,5 km de latitude
+GRID_DEGREES = 0.05
+MAX_POINTS = 4000
+
+POINTS = {
+    'restaurant': ('Restaurant_latitude', 'Restaurant_longitude'),
+    'delivery': ('Delivery_location_latitude', 'Delivery_location_longitude'),
+}
+LAYERS = ['heat', 'cluster']
+CELL = ['Order_Date', 'Road_traffic_density']
+
+MAX_MAPS = 32
+_maps = OrderedDict()
+_lock = threading.Lock()
+
+
+# Deslocamento que deixa os índices da grade positivos, para juntar
+# latitude e longitude numa única chave inteira
+_OFFSET = 1 << 20
+
+
+def _cell_key(lat_bin, lon_bin):
+    return (lat_bin.astype(np.int64) + _OFFSET) * (2 * _OFFSET) + (lon_bin.astype(np.int64) + _OFFSET)
+
+
+def _cell_bins(key):
+    return key // (2 * _OFFSET) - _OFFSET, key % (2 * _OFFSET) - _OFFSET
+
+
+def build_geo_bins(df1, grid=GRID_DEGREES):
+    """
+        Esta função conta os pedidos por célula da grade de coordenadas.
+        Parâmetros:
+            Input:
+                - df1: DataFrame limpo (Order_Date, Road_traffic_density e coordenadas)
+                - grid: tamanho da célula em graus
+            Output:
+                - DataFrame com Order_Date, Road_traffic_density, 'point'
+                  ('restaurant' ou 'delivery'), 'lat_bin', 'lon_bin' e 'orders'
+    """
+    date_codes, dates = pd.factorize(df1['Order_Date'], sort=True)
+    traffic = df1['Road_traffic_density']
+    n_traffic = len(traffic.cat.categories)
+    cell_codes = date_codes.astype(np.int64) * n_traffic + traffic.cat.codes.to_numpy()
+    frames = []
+    for point, (lat_col, lon_col) in POINTS.items():
+        lat = df1[lat_col].to_numpy()
+        lon = df1[lon_col].to_numpy()
+        # (0, 0) é coordenada não preenchida, não um ponto no oceano
+        valid = ~np.isnan(lat) & ~np.isnan(lon) & ~((lat == 0) & (lon == 0)) & (cell_codes >= 0)
+        grid_key = _cell_key(np.floor(lat[valid] / grid), np.floor(lon[valid] / grid))
+        # Uma contagem só sobre a chave (célula de data/trânsito, célula da grade)
+        n_grid = 4 * _OFFSET * _OFFSET
+        keys, orders = np.unique(cell_codes[valid] * n_grid + grid_key, return_counts=True)
+        lat_bin, lon_bin = _cell_bins(keys % n_grid)
+        codes = keys // n_grid
+        frames.append(pd.DataFrame({
+            'Order_Date': dates[codes // n_traffic],
+            'Road_traffic_density': pd.Categorical.from_codes(codes % n_traffic, traffic.cat.categories),
+            'point': point,
+            'lat_bin': lat_bin.astype(np.int32),
+            'lon_bin': lon_bin.astype(np.int32),
+            'orders': orders,
+        }))
+    bins = pd.concat(frames, ignore_index=True)
+    bins['point'] = pd.Categorical(bins['point'], categories=list(POINTS))
+    return bins
+
+
+def load_geo_bins(path=DATASET_PATH):
+    """
+        Esta função devolve a grade do dataset atual, construída uma única
+        vez por versão dos dados (mesmo cache de load_dataset).
+        Input: caminho do CSV
+        Output: DataFrame da grade (compartilhado; não alterar no lugar)
+    """
+    columns = CELL + [col for cols in POINTS.values() for col in cols]
+    return load_derived('geo_bins', build_geo_bins, path, columns=columns)
+
+
+def grid_points(bins, point, grid=GRID_DEGREES, max_points=MAX_POINTS):
+    """
+        Esta função soma os pedidos de cada célula da grade (já filtrada),
+        engrossando a grade até que haja no máximo max_points células.
+        Input: grade, 'restaurant' ou 'delivery', tamanho da célula em graus, limite de pontos
+        Output: DataFrame com 'latitude', 'longitude' (centro da célula) e 'orders'
+    """
+    df_aux = bins.loc[bins['point'] == point, :]
+    lat_bin = df_aux['lat_bin'].to_numpy()
+    lon_bin = df_aux['lon_bin'].to_numpy()
+    orders = df_aux['orders'].to_numpy()
+    factor = 1
+    while True:
+        keys, inverse = np.unique(_cell_key(lat_bin // factor, lon_bin // factor), return_inverse=True)
+        if len(keys) <= max_points:
+            break
+        factor *= 2
+    lat_bin, lon_bin = _cell_bins(keys)
+    return pd.DataFrame({'latitude': (lat_bin + 0.5) * grid * factor,
+                         'longitude': (lon_bin + 0.5) * grid * factor,
+                         'orders': np.bincount(inverse, weights=orders, minlength=len(keys)).astype(np.int64)})
+
+
+# Um marcador por ponto criado no navegador, com o número de pedidos no popup
+CLUSTER_CALLBACK = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {radius: 4});
+    marker.bindPopup(row[2] + ' pedidos');
+    return marker;
+}
+"""
+
+
+def render_map(points, layer, width=1024, height=600):
+    """
+        Esta função monta o mapa e devolve o HTML pronto.
+        Input: pontos de grid_points, camada ('heat' ou 'cluster'), tamanho
+        Output: HTML do mapa (texto)
+    """
+    import folium
+    from folium.plugins import FastMarkerCluster, HeatMap
+
+    if layer not in LAYERS:
+        raise ValueError('camada desconhecida: ' + str(layer))
+    map = folium.Map()
+    if len(points):
+        data = points[['latitude', 'longitude', 'orders']].to_numpy().tolist()
+        if layer == 'heat':
+            HeatMap(data, max_zoom=12, radius=12).add_to(map)
+        else:
+            FastMarkerCluster(data, callback=CLUSTER_CALLBACK).add_to(map)
+        map.fit_bounds([[points['latitude'].min(), points['longitude'].min()],
+                        [points['latitude'].max(), points['longitude'].max()]])
+    figure = folium.Figure(width=width, height=height).add_child(map)
+    return figure.render()
+
+
+def map_html(path, date_limit, traffic_options, layer='heat', point='delivery'):
+    """
+        Esta função devolve o HTML do mapa para os filtros atuais, montando o
+        mapa só quando essa combinação ainda não está no cache.
+        Parâmetros:
+            Input:
+                - path: caminho do CSV
+                - date_limit: data limite (exclusiva)
+                - traffic_options: lista de condições de trânsito
+                - layer: 'heat' (mapa de calor) ou 'cluster' (agrupamento)
+                - point: 'delivery' (locais de entrega) ou 'restaurant'
+            Output:
+                - HTML do mapa (texto)
+    """
+    key = (loaded_version(path), pd.Timestamp(date_limit), tuple(sorted(traffic_options)), layer, point)
+    with _lock:
+        if key in _maps:
+            _maps.move_to_end(key)
+            return _maps[key]
+    bins = filter_cube(load_geo_bins(path), date_limit, traffic_options)
+    points = grid_points(bins, point)
+    with stage('folium', rows_in=len(bins)) as record:
+        html = render_map(points, layer)
+        record['rows_out'] = len(points)
+    with _lock:
+        _maps[key] = html
+        while len(_maps) > MAX_MAPS:
+            _maps.popitem(last=False)
+    return html
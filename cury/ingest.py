@@ -0,0 +1,314 @@
+# Ingestão incremental do train.csv no snapshot colunar
+#
+# Uso:
+#     python -m cury.ingest dataset/train.csv
+#
+# O manifesto do snapshot guarda uma marca d'água: até que byte do CSV as
+# linhas já foram limpas. Quando o export do dia é acrescentado ao fim do
+# CSV, só os bytes depois da marca são lidos e limpos, gravados como um
+# novo bloco do snapshot e somados ao cubo gravado. Pedidos com ID repetido
+# são rejeitados com a mesma regra do CSV inteiro (fica a primeira
+# ocorrência, loader.drop_repeated_ids): no bloco novo e contra os IDs já
+# gravados. Reconstruir do zero ou acrescentar aos poucos grava as mesmas
+# linhas.
+#
+# Os IDs gravados não são relidos a cada append: cada bloco tem ao lado um
+# índice (ids-*.npy, na lista 'ids' do manifesto) com os hashes de 64 bits
+# dos seus IDs, ordenados, e a linha de cada um no bloco. O índice é
+# gravado junto com o bloco e nunca regravado; a busca dos IDs novos é uma
+# busca binária em cada índice via memory map, e só os hashes encontrados
+# são conferidos com o ID gravado (colisões de hash não rejeitam pedidos).
+#
+# Cada bloco é gravado ordenado por data, com a primeira e a última data no
+# manifesto. Pedidos atrasados (datas anteriores às já gravadas) não
+# regravam a base: o bloco novo entra como os outros e a leitura intercala
+# os blocos por data (snapshot.read_snapshot). O custo do append é sempre o
+# do trecho novo do CSV.
+#
+# Se o CSV foi reescrito em vez de crescer (o começo ou o trecho já lido
+# mudou), o snapshot é reconstruído do zero.
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from cury import snapshot
+from cury.cube import build_cube, merge_cubes
+from cury.loader import DATASET_PATH, file_signature, prepare_dataset, read_dataset
+
+# Bytes do começo e do fim do trecho já lido usados para reconhecer o CSV
+FINGERPRINT_BYTES = 4096
+
+# Uma ingestão por vez para cada CSV neste processo: a sessão no arranque a
+# frio e a thread de atualização não montam o mesmo snapshot duas vezes
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def _path_lock(csv_path):
+    key = os.path.abspath(csv_path)
+    with _locks_lock:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def _fingerprint(path, offset):
+    with open(path, 'rb') as f:
+        head = f.read(min(offset, FINGERPRINT_BYTES))
+        start = max(0, offset - FINGERPRINT_BYTES)
+        f.seek(start)
+        tail = f.read(offset - start)
+    return hashlib.sha1(head + b'|' + tail).hexdigest()
+
+
+def status(csv_path, manifest):
+    """
+        Esta função compara o CSV com a marca d'água do snapshot.
+        Input: caminho do CSV, manifesto (ou None)
+        Output: 'fresh' (nada a fazer), 'append' (CSV cresceu) ou 'rebuild'
+    """
+    if manifest is None:
+        return 'rebuild'
+    watermark = manifest['csv']
+    signature = file_signature(csv_path)
+    if signature[1] == watermark['size'] and signature[2] == watermark['mtime_ns']:
+        return 'fresh'
+    if signature[1] < watermark['offset'] or _fingerprint(csv_path, watermark['offset']) != watermark['fingerprint']:
+        return 'rebuild'
+    return 'append'
+
+
+def _watermark(csv_path, offset):
+    signature = file_signature(csv_path)
+    return {'offset': offset, 'size': signature[1], 'mtime_ns': signature[2],
+            'fingerprint': _fingerprint(csv_path, offset)}
+
+
+def _part_name(csv_path, prefix, number):
+    folder = os.path.basename(snapshot.parts_dir(csv_path))
+    return '{}/{}-{:05d}{}'.format(folder, prefix, number, snapshot.SUFFIX)
+
+
+def _write_cube(csv_path, cube, number):
+    os.makedirs(snapshot.parts_dir(csv_path), exist_ok=True)
+    name = _part_name(csv_path, 'cube', number)
+    snapshot.write_table(cube, snapshot.resolve(csv_path, name))
+    return name
+
+
+def _write_ids(csv_path, df1, number):
+    # Índice dos IDs de um bloco: linha 0 com os hashes ordenados, linha 1
+    # com a posição de cada um no bloco. Um único array contíguo (.npy), lido
+    # via memory map sem cópia
+    os.makedirs(snapshot.parts_dir(csv_path), exist_ok=True)
+    hashes = pd.util.hash_array(df1['ID'].to_numpy(dtype=object))
+    order = np.argsort(hashes, kind='stable')
+    name = _part_name(csv_path, 'ids', number).replace(snapshot.SUFFIX, '.npy')
+    path = snapshot.resolve(csv_path, name)
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, np.stack([hashes[order], order.astype(np.uint64)]))
+    os.replace(path + '.tmp', path)
+    return name
+
+
+def _remove_unused(csv_path, manifest, previous=None):
+    # Remove blocos e cubos que nem o manifesto atual nem o anterior usam. Os
+    # arquivos do anterior ficam por mais uma ingestão: quem ainda lê a
+    # geração anterior (outra sessão, a atualização em segundo plano) não
+    # perde os arquivos no meio da leitura
+    used = set()
+    for item in [manifest, previous]:
+        if item is not None:
+            used.update(os.path.basename(name) for name in item['parts'] + item['ids'] + [item['cube']])
+    base = os.path.basename(snapshot.snapshot_path(csv_path))
+    if base not in used and os.path.exists(snapshot.resolve(csv_path, base)):
+        os.remove(snapshot.resolve(csv_path, base))
+    folder = snapshot.parts_dir(csv_path)
+    if not os.path.isdir(folder):
+        return
+    for name in os.listdir(folder):
+        if name not in used:
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError:
+                pass
+
+
+def _build_until(csv_path, offset, rejected):
+    # Lê exatamente os primeiros `offset` bytes, para que a marca d'água
+    # corresponda ao que foi limpo mesmo se o CSV crescer durante a leitura
+    with open(csv_path, 'rb') as f:
+        data = f.read(offset)
+    return prepare_dataset(read_dataset(io.BytesIO(data)), rejected)
+
+
+def rebuild(csv_path=DATASET_PATH):
+    """
+        Esta função reconstrói o snapshot a partir do CSV inteiro.
+        Input: caminho do CSV
+        Output: relatório (dicionário) da ingestão
+    """
+    start = time.perf_counter()
+    previous = snapshot.read_manifest(csv_path)
+    offset = file_signature(csv_path)[1]
+    rejected = []
+    df1 = _build_until(csv_path, offset, rejected)
+    if previous is None:
+        sequence = 0
+        base = os.path.basename(snapshot.snapshot_path(csv_path))
+    else:
+        # Nomes novos: quem ainda lê pelo manifesto anterior não é afetado
+        sequence = previous['sequence'] + 1
+        os.makedirs(snapshot.parts_dir(csv_path), exist_ok=True)
+        base = _part_name(csv_path, 'base', sequence)
+    snapshot.write_table(df1, snapshot.resolve(csv_path, base))
+    manifest = {
+        'csv': _watermark(csv_path, offset),
+        'parts': [base],
+        'ids': [_write_ids(csv_path, df1, sequence)],
+        'dates': [_date_range(df1)],
+        'cube': _write_cube(csv_path, build_cube(df1), sequence),
+        'rows': len(df1),
+        'rejected': len(rejected),
+        'sequence': sequence,
+    }
+    snapshot.write_manifest(csv_path, manifest)
+    _remove_unused(csv_path, manifest, previous)
+    return {'mode': 'rebuild', 'rows_added': len(df1), 'rejected_ids': rejected,
+            'seconds': time.perf_counter() - start}
+
+
+def _date_range(df1):
+    # Primeira e última data de um bloco (já ordenado por data), em texto ISO
+    if not len(df1):
+        return [None, None]
+    return [str(df1['Order_Date'].iloc[0]), str(df1['Order_Date'].iloc[-1])]
+
+
+def _existing_ids(csv_path, manifest, ids):
+    # Procura os IDs novos nos índices dos blocos já gravados (_write_ids):
+    # uma busca binária por ID em cada índice, sem ler as colunas ID inteiras
+    import pyarrow as pa
+
+    ids = np.asarray(ids, dtype=object)
+    hashes = pd.util.hash_array(ids)
+    found = set()
+    for part, name in zip(manifest['parts'], manifest['ids']):
+        index = np.load(snapshot.resolve(csv_path, name), mmap_mode='r')
+        left = np.searchsorted(index[0], hashes, side='left')
+        counts = np.searchsorted(index[0], hashes, side='right') - left
+        if not counts.any():
+            continue
+        # Cada hash encontrado pode ter mais de uma posição (colisão): uma
+        # candidata por posição, conferida com o ID gravado naquela linha
+        query = np.repeat(np.arange(len(ids)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        rows = index[1][np.repeat(left, counts) + offsets].astype(np.int64)
+        with pa.memory_map(snapshot.resolve(csv_path, part), 'r') as source:
+            stored_ids = pa.ipc.open_file(source).read_all().column('ID').take(rows).to_pylist()
+        found.update(new for new, old in zip(ids[query], stored_ids) if new == old)
+    return found
+
+
+def append(csv_path, manifest):
+    """
+        Esta função limpa apenas as linhas acrescentadas ao CSV depois da
+        marca d'água e as acrescenta ao snapshot e ao cubo gravado.
+        Input: caminho do CSV, manifesto atual
+        Output: relatório (dicionário) da ingestão
+    """
+    start = time.perf_counter()
+    offset = manifest['csv']['offset']
+    with open(csv_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    # Só linhas completas: uma linha sendo escrita fica para a próxima vez
+    data = data[:data.rfind(b'\n') + 1]
+    report = {'mode': 'append', 'rows_added': 0, 'rejected_ids': [], 'seconds': 0.0}
+    if not data.strip():
+        report['seconds'] = time.perf_counter() - start
+        return report
+
+    header = pd.read_csv(csv_path, nrows=0).columns
+    # Mesma leitura do CSV inteiro (tipos de texto explícitos): o bloco pode
+    # ter uma só linha, com 'NaN ' em todas as linhas de uma coluna de texto
+    # IDs repetidos no próprio bloco: descartados por prepare_dataset
+    delta = prepare_dataset(read_dataset(io.BytesIO(data), header=None, names=header), report['rejected_ids'])
+
+    # IDs já presentes no snapshot
+    existing = _existing_ids(csv_path, manifest, delta['ID'].unique())
+    rejected = delta['ID'].isin(list(existing))
+    report['rejected_ids'] += delta.loc[rejected, 'ID'].tolist()
+    delta = delta.loc[~rejected, :].reset_index(drop=True)
+
+    previous = manifest
+    manifest = dict(manifest)
+    sequence = manifest['sequence'] + 1
+    if len(delta):
+        # Bloco próprio mesmo com datas anteriores às gravadas (prepare_dataset
+        # já ordena por data): nada do que está gravado é regravado
+        os.makedirs(snapshot.parts_dir(csv_path), exist_ok=True)
+        name = _part_name(csv_path, 'part', sequence)
+        snapshot.write_table(delta, snapshot.resolve(csv_path, name))
+        manifest['parts'] = manifest['parts'] + [name]
+        manifest['ids'] = manifest['ids'] + [_write_ids(csv_path, delta, sequence)]
+        manifest['dates'] = manifest['dates'] + [_date_range(delta)]
+        stored = snapshot.read_tables([snapshot.resolve(csv_path, manifest['cube'])])
+        manifest['cube'] = _write_cube(csv_path, merge_cubes([stored, build_cube(delta)]), sequence)
+        manifest['rows'] += len(delta)
+
+    manifest['csv'] = _watermark(csv_path, offset + len(data))
+    manifest['rejected'] += len(report['rejected_ids'])
+    manifest['sequence'] = sequence
+    snapshot.write_manifest(csv_path, manifest)
+    _remove_unused(csv_path, manifest, previous)
+    report['rows_added'] = len(delta)
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+
+def ingest(csv_path=DATASET_PATH):
+    """
+        Esta função atualiza o snapshot com o que mudou no CSV: nada, só as
+        linhas novas, ou tudo (se o CSV foi reescrito ou não há snapshot).
+        Input: caminho do CSV
+        Output: relatório (dicionário) da ingestão
+    """
+    with _path_lock(csv_path):
+        manifest = snapshot.read_manifest(csv_path)
+        mode = status(csv_path, manifest)
+        if mode == 'fresh':
+            return {'mode': 'fresh', 'rows_added': 0, 'rejected_ids': [], 'seconds': 0.0}
+        if mode == 'append':
+            return append(csv_path, manifest)
+        return rebuild(csv_path)
+
+
+def refresh(csv_path, manifest):
+    """
+        Esta função é usada pelo loader: atualiza o snapshot se o CSV mudou.
+        Input: caminho do CSV, manifesto atual
+        Output: True se o manifesto foi regravado
+    """
+    with _path_lock(csv_path):
+        # Outra thread pode ter ingerido enquanto esta esperava
+        current = snapshot.read_manifest(csv_path)
+        if current != manifest:
+            return True
+        mode = status(csv_path, manifest)
+        if mode == 'fresh':
+            return False
+        if mode == 'append':
+            append(csv_path, manifest)
+        else:
+            rebuild(csv_path)
+        return snapshot.read_manifest(csv_path) != manifest
+
+
+if __name__ == '__main__':
+    print(json.dumps(ingest(sys.argv[1] if len(sys.argv) > 1 else DATASET_PATH), indent=2, default=str))
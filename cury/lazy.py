@@ -0,0 +1,58 @@
+# Seções pesadas calculadas só quando o usuário pede
+#
+# st.tabs executa o conteúdo de todas as abas a cada reexecução: o navegador
+# apenas esconde as inativas. O Streamlit não informa ao script qual aba está
+# aberta, então as seções caras (mapa do folium, gráficos semanais) ficam
+# atrás de um botão dentro da aba. Enquanto a seção não é aberta, nenhuma
+# agregação, figura ou mapa dela é montado e a primeira pintura da aba
+# padrão não paga por ela.
+#
+# Depois de aberta, a seção continua aberta nas reexecuções seguintes da
+# mesma sessão (st.session_state). O conteúdo volta a ser executado a cada
+# reexecução, mas sai dos caches de figuras e de mapas (cury/figures.py,
+# cury/geomap.py): reabrir a aba ou repetir um filtro não recalcula nada.
+import streamlit as st
+
+# Chave no st.session_state com as seções já abertas nesta sessão
+STATE_KEY = 'cury_lazy_sections'
+
+
+def section_open(key):
+    """
+        Esta função diz se a seção já foi aberta nesta sessão.
+        Input: nome único da seção (ex.: 'empresa/geografica')
+        Output: True ou False
+    """
+    return key in st.session_state.get(STATE_KEY, ())
+
+
+def open_section(key):
+    """ Esta função marca a seção como aberta nesta sessão. """
+    opened = set(st.session_state.get(STATE_KEY, ()))
+    opened.add(key)
+    st.session_state[STATE_KEY] = opened
+
+
+def lazy_section(key, label):
+    """
+        Esta função mostra o botão que abre uma seção pesada.
+        Uso:
+            if lazy_section('empresa/geografica', 'Carregar mapa'):
+                ... conteúdo da seção ...
+        Parâmetros:
+            Input:
+                - key: nome único da seção
+                - label: texto do botão
+            Output:
+                - True se a seção deve ser desenhada nesta reexecução (botão
+                  clicado agora ou numa reexecução anterior), senão False
+    """
+    if section_open(key):
+        return True
+    placeholder = st.empty()
+    if placeholder.button(label, key=STATE_KEY + '/' + key):
+        open_section(key)
+        # O botão sai da tela já nesta reexecução
+        placeholder.empty()
+        return True
+    return False
@@ -0,0 +1,557 @@
+# Carregamento e limpeza do dataset compartilhados entre as páginas
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from cury import snapshot
+from cury.geo import delivery_distance
+from cury.timing import stage
+
+# Relativo ao repositório, não ao diretório de onde o processo foi iniciado
+DATASET_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dataset', 'train.csv')
+
+# ---------------------------------
+# Cache em memória do processo
+# ---------------------------------
+# O Streamlit reexecuta o script da página a cada interação, mas os módulos
+# importados continuam vivos, então o dataframe limpo fica guardado aqui.
+_cache = {}
+_stats = {'hits': 0, 'misses': 0, 'swaps': 0}
+_lock = threading.RLock()
+# Caminhos com atualização em segundo plano (cury/refresh.py), com a
+# indicação de se este processo ingere o CSV, e os builders dos objetos
+# derivados, que a atualização refaz em cada geração nova
+_background = {}
+_builders = {}
+# Geração sendo montada pela thread de atualização (ver generation_manifest)
+_building = threading.local()
+# Gerações fixadas na reexecução aberta nesta thread (begin_rerun)
+_rerun = threading.local()
+
+
+# Sentinela de valor ausente usado no train.csv do Kaggle
+NA_SENTINEL = 'NaN '
+
+# Colunas cujas linhas com 'NaN ' são descartadas na limpeza
+REQUIRED_COLUMNS = ['Delivery_person_Age', 'Road_traffic_density', 'Time_taken(min)',
+                    'City', 'Festival', 'multiple_deliveries']
+
+# Colunas de texto que chegam com espaços no final
+TEXT_COLUMNS = ['ID', 'Delivery_person_ID', 'Road_traffic_density', 'Type_of_order',
+                'Type_of_vehicle', 'City', 'Festival']
+
+# Na leitura, 'NaN ' vira NA de verdade apenas nessas colunas; as demais
+# (ex.: Time_Orderd) continuam com o texto original, como antes
+NA_VALUES = {col: [NA_SENTINEL] for col in REQUIRED_COLUMNS + ['Delivery_person_Ratings']}
+
+# Colunas lidas sempre como texto: num bloco pequeno (ingestão incremental)
+# em que todas as linhas têm 'NaN ' numa coluna de texto, o pd.read_csv a
+# inferiria como float
+TEXT_DTYPES = {col: str for col in TEXT_COLUMNS + ['Order_Date', 'Time_Orderd', 'Time_Order_picked',
+                                                   'Weatherconditions', 'Time_taken(min)']}
+
+# Categorias conhecidas de cada coluna de baixa cardinalidade. A ordem é a
+# alfabética, a mesma em que os groupby sobre texto já devolviam os grupos.
+CATEGORIES = {
+    'City': ['Metropolitian', 'Semi-Urban', 'Urban'],
+    'Festival': ['No', 'Yes'],
+    'Road_traffic_density': ['High', 'Jam', 'Low', 'Medium'],
+    'Type_of_order': ['Buffet', 'Drinks', 'Meal', 'Snack'],
+    'Type_of_vehicle': ['bicycle', 'electric_scooter', 'motorcycle', 'scooter'],
+    'Weatherconditions': ['conditions Cloudy', 'conditions Fog', 'conditions NaN', 'conditions Sandstorms',
+                          'conditions Stormy', 'conditions Sunny', 'conditions Windy'],
+}
+
+# Colunas inteiras que cabem em tipos menores que int64
+INTEGER_COLUMNS = ['Delivery_person_Age', 'Vehicle_condition', 'multiple_deliveries', 'Time_taken(min)']
+
+
+def read_dataset(path=DATASET_PATH, **kwargs):
+    """
+        Esta função lê o CSV bruto tratando o sentinela 'NaN ' como NA.
+        Com isso as colunas numéricas (idade, avaliação, múltiplas entregas)
+        já chegam como números e não precisam ser comparadas com texto; as
+        colunas de texto (TEXT_DTYPES) chegam como texto mesmo sem nenhum
+        valor presente.
+        Input: caminho do CSV (e argumentos extras do pd.read_csv)
+        Output: DataFrame bruto
+    """
+    return pd.read_csv(path, na_values=NA_VALUES, dtype=TEXT_DTYPES, **kwargs)
+
+
+def _strip(series):
+    # Colunas de baixa cardinalidade: remove os espaços só dos valores únicos.
+    # NA fica NA (código -1 aponta para o último elemento, o NaN acrescentado)
+    codes, uniques = pd.factorize(series)
+    stripped = pd.Index(uniques, dtype=object).str.strip().to_numpy(dtype=object)
+    return pd.Series(np.append(stripped, np.nan)[codes], index=series.index, name=series.name)
+
+
+def clean_code(df1):
+    """
+
+    Esta função tem a responsabilidade de limpar o dataframe
+
+    Tipos de Limpeza:
+    1. Remoção dos dados NaN.
+    2. Mudança do tipo da coluna de dados.
+    3. Remoção dos espaços das variáveis de texto.
+    4. Formatação da coluna de datas.
+    5. Limpeza da coluna de tempo (remoção do texto da variável numérica)
+
+    Aceita tanto o dataframe lido com read_dataset (NA de verdade) quanto
+    o lido com pd.read_csv puro (sentinela 'NaN ' em texto).
+
+    Input: DataFrame
+    Output: DataFrame
+
+    """
+    # 1. Remoção dos dados NaN com uma única máscara e uma única cópia
+    linhasSelecionadas = pd.Series(True, index=df1.index)
+    for col in REQUIRED_COLUMNS:
+        linhasSelecionadas &= df1[col].notna()
+        if df1[col].dtype == object:
+            linhasSelecionadas &= (df1[col] != NA_SENTINEL)
+    df1 = df1.take(np.flatnonzero(linhasSelecionadas.to_numpy()))
+    df1.index = pd.RangeIndex(len(df1))
+
+    # 2. Mudança do tipo das colunas numéricas
+    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype(int)
+    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype(float)
+    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype(int)
+
+    # 3. convertendo a coluna order_date de texto para data
+    df1['Order_Date'] = pd.to_datetime(df1['Order_Date'], format='%d-%m-%Y')
+
+    # 4. Removendo os espaços dentro de strings/texto/object
+    df1['ID'] = df1['ID'].str.strip()
+    for col in TEXT_COLUMNS[1:]:
+        df1[col] = _strip(df1[col])
+
+    # 5. Limpando a coluna de time taken ('(min) 24' -> 24)
+    df1['Time_taken(min)'] = df1['Time_taken(min)'].str.slice(len('(min) ')).astype(int)
+
+    return df1
+
+
+def _categorical(series, categories):
+    values = pd.Categorical(series, categories=categories)
+    unknown = (values.codes == -1) & series.notna().to_numpy()
+    if unknown.any():
+        # Valor fora da lista conhecida: entra no fim em vez de virar NaN
+        extra = sorted(series[unknown].unique())
+        values = pd.Categorical(series, categories=list(categories) + extra)
+    return values
+
+
+def optimize_dtypes(df1):
+    """
+        Esta função reduz a memória do dataframe limpo.
+
+        1. Colunas de baixa cardinalidade viram categóricas com as categorias
+           de CATEGORIES (filtros e groupby passam a comparar códigos inteiros).
+        2. Delivery_person_ID vira categórica com as categorias do próprio dado.
+        3. Colunas inteiras são reduzidas ao menor tipo que comporta os valores.
+
+        As colunas float (avaliação e coordenadas) continuam em float64: em
+        float32 elas deixariam de bater com os valores do CSV.
+
+        Input: DataFrame limpo
+        Output: DataFrame com os tipos otimizados
+    """
+    for col, categories in CATEGORIES.items():
+        df1[col] = _categorical(df1[col], categories)
+    df1['Delivery_person_ID'] = df1['Delivery_person_ID'].astype('category')
+    for col in INTEGER_COLUMNS:
+        df1[col] = pd.to_numeric(df1[col], downcast='integer')
+    return df1
+
+
+def drop_repeated_ids(df1):
+    """
+        Esta função descarta os pedidos com ID repetido, mantendo a primeira
+        ocorrência na ordem do CSV. É a regra de todos os caminhos: CSV
+        inteiro, snapshot reconstruído e blocos acrescentados pela ingestão
+        incremental (cury/ingest.py), que também rejeita IDs já gravados.
+        Input: DataFrame limpo (na ordem do CSV)
+        Output: tupla (DataFrame sem IDs repetidos, lista dos IDs descartados)
+    """
+    repeated = df1['ID'].duplicated().to_numpy()
+    if not repeated.any():
+        return df1, []
+    rejected = df1.loc[repeated, 'ID'].tolist()
+    df1 = df1.take(np.flatnonzero(~repeated))
+    df1.index = pd.RangeIndex(len(df1))
+    return df1, rejected
+
+
+def prepare_dataset(df1, rejected=None):
+    """
+        Esta função transforma o dataframe bruto no dataframe das páginas:
+        limpa, descarta IDs repetidos (drop_repeated_ids), otimiza os tipos,
+        calcula uma única vez a coluna distance_km (restaurante -> entrega) e
+        ordena as linhas por Order_Date.
+        Input: DataFrame bruto (lido com read_dataset), lista que recebe os
+               IDs repetidos descartados (opcional)
+        Output: DataFrame pronto para as páginas
+    """
+    with stage('clean_code', rows_in=len(df1)) as record:
+        df1 = clean_code(df1)
+        # Antes da ordenação por data: fica a primeira ocorrência no CSV
+        df1, repeated = drop_repeated_ids(df1)
+        record['rows_out'] = len(df1)
+    if rejected is not None:
+        rejected.extend(repeated)
+    df1 = optimize_dtypes(df1)
+    df1['distance_km'] = delivery_distance(df1)
+    # Ordenado por data, o corte do slider vira uma busca binária (cury/filters.py)
+    df1 = df1.sort_values('Order_Date', kind='mergesort', ignore_index=True)
+    return df1
+
+
+def share_frame(df1):
+    """
+        Esta função monta a versão compartilhada (somente leitura) do
+        dataframe, guardada uma vez por processo.
+
+        O dataframe é copiado uma vez, já consolidado (um bloco por tipo):
+        sem isso, operações como take e groupby consolidam o dataframe
+        compartilhado no lugar, copiando as colunas de novo. Depois os arrays
+        dos blocos são marcados como não graváveis, então qualquer escrita no
+        lugar (df.loc[...] = ...) levanta ValueError, e os recortes de linhas
+        (df.iloc[a:b]) continuam sendo views sem cópia.
+        Input: DataFrame
+        Output: DataFrame somente leitura
+    """
+    df1 = df1.copy()
+    # O pandas não tem API pública para congelar um DataFrame; os blocos
+    # numpy, de datas e de categorias guardam os dados num ndarray
+    for block in df1._mgr.blocks:
+        values = getattr(block.values, '_ndarray', block.values)
+        if isinstance(values, np.ndarray):
+            values.flags.writeable = False
+    return df1
+
+
+def build_dataset(path=DATASET_PATH):
+    """
+        Esta função lê o CSV inteiro e prepara o dataframe das páginas.
+        Input: caminho do CSV
+        Output: DataFrame pronto para as páginas
+    """
+    with stage('read_csv') as record:
+        df1 = read_dataset(path)
+        record['rows_out'] = len(df1)
+    with stage('prepare_dataset', rows_in=len(df1)) as record:
+        df1 = prepare_dataset(df1)
+        record['rows_out'] = len(df1)
+    return df1
+
+
+def file_signature(path):
+    """
+        Esta função identifica a versão de um arquivo no disco.
+        Parâmetros:
+            Input:
+                - path: caminho do arquivo
+            Output:
+                - tupla (caminho absoluto, tamanho em bytes, mtime em ns)
+    """
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def _signature_or_none(path):
+    return file_signature(path) if os.path.exists(path) else None
+
+
+def dataset_version(path=DATASET_PATH):
+    """
+        Esta função identifica a versão atual dos dados de origem.
+        Input: caminho do CSV
+        Output: tupla (assinatura do CSV, assinatura do manifesto do snapshot);
+                None onde o arquivo não existe
+    """
+    return (_signature_or_none(path), _signature_or_none(snapshot.manifest_path(path)))
+
+
+def loaded_version(path=DATASET_PATH):
+    """
+        Esta função identifica a versão dos dados que as sessões estão lendo.
+        Com a atualização em segundo plano (cury/refresh.py) é a versão da
+        geração publicada, que pode estar atrás dos arquivos no disco; sem
+        ela é a versão atual dos arquivos (dataset_version).
+        Input: caminho do CSV
+        Output: tupla da versão (usada nas chaves dos caches de figuras e mapas)
+    """
+    key = os.path.abspath(path)
+    with _lock:
+        entry = _pinned(key) or _cache.get(key)
+        if key in _background and entry is not None:
+            return entry['version']
+    return dataset_version(path)
+
+
+def generation_manifest(path=DATASET_PATH):
+    """
+        Esta função devolve o manifesto do snapshot da geração que está sendo
+        lida (ou montada pela atualização em segundo plano). Os builders de
+        load_derived que leem arquivos do snapshot devem usar este manifesto,
+        e não o do disco, para não misturar gerações.
+        Input: caminho do CSV
+        Output: dicionário do manifesto, ou None sem snapshot
+    """
+    key = os.path.abspath(path)
+    with _lock:
+        entry = _entry(key)
+    return None if entry is None else entry['manifest']
+
+
+def _new_entry(key, version):
+    # Geração nova dos dados: descarta todas as projeções e derivados antigos
+    entry = {'version': version, 'frames': {}, 'manifest': None}
+    _cache[key] = entry
+    return entry
+
+
+def begin_rerun():
+    """
+        Esta função abre, na thread atual, o contexto de uma reexecução da
+        página (ou de uma requisição da API). Até end_rerun, cada caminho
+        com atualização em segundo plano é lido sempre da geração usada na
+        primeira leitura: uma troca no meio da reexecução não mistura dados
+        de gerações diferentes (o índice dos filtros de uma com o dataframe
+        da outra).
+    """
+    _rerun.generations = {}
+
+
+def end_rerun():
+    """ Esta função fecha o contexto aberto por begin_rerun. """
+    _rerun.generations = None
+
+
+def _pinned(key):
+    # Geração já usada nesta reexecução (None fora de begin_rerun)
+    generations = getattr(_rerun, 'generations', None)
+    return None if generations is None else generations.get(key)
+
+
+def _entry(key):
+    # Geração em montagem nesta thread (refresh_generation), senão a fixada
+    # nesta reexecução, senão a publicada. Assim um builder que chama outro
+    # load_derived (ex.: rollups sobre o cubo e os sketches) lê a mesma
+    # geração que está montando
+    if getattr(_building, 'key', None) == key:
+        return _building.entry
+    return _pinned(key) or _cache.get(key)
+
+
+def _pin(key, entry):
+    generations = getattr(_rerun, 'generations', None)
+    if generations is not None and key in _background:
+        generations[key] = entry
+
+
+def _read_frame(path, columns_key, entry):
+    # Materializa uma projeção da geração: do snapshot (pelo manifesto da
+    # geração), do dataframe completo já limpo ou do CSV
+    frames = entry['frames']
+    if entry['manifest'] is not None:
+        with stage('read_snapshot') as record:
+            df1 = share_frame(snapshot.read_snapshot(path, columns_key, entry['manifest']))
+            record['rows_out'] = len(df1)
+    elif None in frames:
+        df1 = share_frame(frames[None].loc[:, list(columns_key)])
+    else:
+        df1 = share_frame(build_dataset(path))
+        if columns_key is not None:
+            frames[None] = df1
+            df1 = share_frame(df1.loc[:, list(columns_key)])
+    frames[columns_key] = df1
+    return df1
+
+
+def load_dataset(path=DATASET_PATH, columns=None):
+    """
+        Esta função devolve o dataframe já limpo, reaproveitando o resultado
+        enquanto os arquivos de origem não mudarem.
+
+        Se existir um snapshot colunar ao lado do CSV (ver cury/snapshot.py),
+        ele é lido via memory map e apenas as colunas pedidas são
+        materializadas. Se o CSV cresceu desde o snapshot, só as linhas novas
+        são limpas e acrescentadas (cury/ingest.py). Sem snapshot, o CSV é
+        lido e limpo inteiro.
+
+        A chave do cache é o caminho, o tamanho e o mtime do CSV e do
+        manifesto do snapshot: se qualquer um deles mudar, os dados são lidos
+        novamente. Com a atualização em segundo plano ligada para o caminho
+        (cury/refresh.py), a sessão nunca ingere nem reconstrói: lê sempre a
+        última geração publicada, e a troca de geração é feita pela thread de
+        atualização.
+
+        O dataframe devolvido é um só por processo (por conjunto de
+        colunas), compartilhado entre as páginas e sessões, e é somente
+        leitura (share_frame): escritas no lugar levantam ValueError. Os
+        filtros de cada sessão devolvem seleções de linhas
+        (cury/filters.py), não cópias.
+
+        Input: caminho do CSV, lista de colunas (None = todas)
+        Output: DataFrame limpo
+    """
+    key = os.path.abspath(path)
+    columns_key = None if columns is None else tuple(columns)
+    with _lock:
+        entry = _entry(key)
+        background = entry is not None and (key in _background or getattr(_building, 'key', None) == key)
+        if not background:
+            version = dataset_version(path)
+            if version == (None, None):
+                raise FileNotFoundError(path)
+            if entry is None and _background.get(key) and version[0] is not None and version[1] is None:
+                # Arranque a frio com a atualização ligada: sem isso a sessão
+                # limparia o CSV aqui enquanto a thread de atualização monta
+                # o mesmo snapshot. O ingest é serializado por caminho
+                # (cury/ingest.py): quem chega primeiro monta o snapshot e o
+                # outro o encontra pronto
+                from cury.ingest import ingest
+
+                with stage('ingest'):
+                    ingest(path)
+                version = dataset_version(path)
+            if entry is None or entry['version'] != version:
+                entry = _new_entry(key, version)
+        _pin(key, entry)
+        frames = entry['frames']
+        if columns_key in frames:
+            _stats['hits'] += 1
+            return frames[columns_key]
+        _stats['misses'] += 1
+        if background:
+            try:
+                return _read_frame(path, columns_key, entry)
+            except FileNotFoundError:
+                # Os blocos desta geração já foram substituídos por uma
+                # ingestão: a geração atual do disco é lida aqui mesmo
+                entry = _new_entry(key, dataset_version(path))
+                _pin(key, entry)
+        manifest = snapshot.read_manifest(path)
+        if manifest is not None and entry['version'][0] is not None and key not in _background:
+            from cury.ingest import refresh
+
+            with stage('ingest'):
+                refreshed = refresh(path, manifest)
+            if refreshed:
+                # O snapshot recebeu as linhas novas: a versão mudou
+                manifest = snapshot.read_manifest(path)
+                entry = _new_entry(key, dataset_version(path))
+        entry['manifest'] = manifest
+        return _read_frame(path, columns_key, entry)
+
+
+def load_derived(name, builder, path=DATASET_PATH, columns=None):
+    """
+        Esta função guarda no mesmo cache do dataset um objeto derivado dele
+        (cubo, índices, agregados...), que é descartado junto quando os
+        arquivos de origem mudam.
+        Parâmetros:
+            Input:
+                - name: nome único do objeto derivado
+                - builder: função que recebe o DataFrame e devolve o objeto
+                - path: caminho do CSV
+                - columns: colunas que o builder precisa (None = todas)
+            Output:
+                - o objeto devolvido por builder
+    """
+    key = ('__derived__', name)
+    with _lock:
+        # A atualização em segundo plano reconstrói o objeto na geração nova
+        _builders[name] = (builder, columns)
+        df1 = load_dataset(path, columns)
+        frames = _entry(os.path.abspath(path))['frames']
+        if key in frames:
+            _stats['hits'] += 1
+            return frames[key]
+        _stats['misses'] += 1
+        with stage('build/' + name, rows_in=len(df1)):
+            frames[key] = builder(df1)
+        return frames[key]
+
+
+def set_background(path, enabled=True, ingest=True):
+    """
+        Esta função liga ou desliga o modo de atualização em segundo plano
+        para o caminho (usada por cury/refresh.py).
+        Input: caminho do CSV, True para ligar, se este processo ingere o
+               CSV (False = outro processo grava o snapshot)
+    """
+    key = os.path.abspath(path)
+    with _lock:
+        if enabled:
+            _background[key] = ingest
+        else:
+            _background.pop(key, None)
+
+
+def refresh_generation(path=DATASET_PATH):
+    """
+        Esta função monta uma geração nova dos dados fora do lock, com as
+        mesmas projeções e objetos derivados da geração publicada, e a
+        publica de uma vez. As sessões continuam lendo a geração anterior
+        enquanto a nova é montada e nunca veem uma geração pela metade.
+        Input: caminho do CSV
+        Output: True se uma geração nova foi publicada
+    """
+    key = os.path.abspath(path)
+    version = dataset_version(path)
+    with _lock:
+        current = _cache.get(key)
+        # Nada foi pedido ainda: a primeira sessão carrega os dados
+        if current is None or current['version'] == version or version == (None, None):
+            return False
+        wanted = [k for k in current['frames'] if not (isinstance(k, tuple) and k[:1] == ('__derived__',))]
+        derived = [k[1] for k in current['frames'] if isinstance(k, tuple) and k[:1] == ('__derived__',)]
+        builders = dict(_builders)
+    entry = {'version': version, 'frames': {}, 'manifest': snapshot.read_manifest(path)}
+    # O dataframe completo primeiro: sem snapshot as projeções saem dele
+    for columns_key in sorted(wanted, key=lambda k: k is not None):
+        if columns_key not in entry['frames']:
+            _read_frame(path, columns_key, entry)
+    _building.entry, _building.key = entry, key
+    try:
+        for name in derived:
+            # Já montado por outro builder que depende dele
+            if ('__derived__', name) in entry['frames']:
+                continue
+            builder, columns = builders[name]
+            columns_key = None if columns is None else tuple(columns)
+            if columns_key not in entry['frames']:
+                _read_frame(path, columns_key, entry)
+            entry['frames'][('__derived__', name)] = builder(entry['frames'][columns_key])
+    finally:
+        _building.entry, _building.key = None, None
+    with _lock:
+        _cache[key] = entry
+        _stats['swaps'] += 1
+    return True
+
+
+def cache_info():
+    """
+        Esta função devolve os contadores do cache do dataset.
+        Output: dicionário com 'hits', 'misses', 'swaps' (gerações publicadas
+                em segundo plano) e 'size' (objetos em cache)
+    """
+    with _lock:
+        size = sum(len(entry['frames']) for entry in _cache.values())
+        return {'hits': _stats['hits'], 'misses': _stats['misses'], 'swaps': _stats['swaps'], 'size': size}
+
+
+def clear_cache():
+    """ Esta função esvazia o cache do dataset e zera os contadores. """
+    with _lock:
+        _cache.clear()
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,107 @@
+# Agregação em paralelo num pool de processos
+#
+# O dataset limpo é dividido em faixas contíguas de linhas. Como ele é
+# carregado ordenado por Order_Date, cada faixa é um intervalo de datas. Cada
+# processo calcula os agregados parciais da sua faixa (os mesmos de
+# cury/stream.py, que se somam sem perda), e o resultado é a junção deles.
+#
+# Número de processos: argumento workers, ou a variável de ambiente
+# CURY_WORKERS, ou o número de CPUs. Entradas pequenas (menos de
+# MIN_ROWS_PER_WORKER linhas por processo) usam o caminho serial: abaixo
+# disso o custo de enviar as linhas aos processos é maior que o ganho.
+#
+# Escopo: só a construção do cubo (uma vez por versão dos dados, ver
+# load_cube) passa por aqui. As agregações de cada reexecução leem o cubo
+# (cury/planner.py) ou a fatia já filtrada, pequenas demais para compensar o
+# envio das linhas a outro processo.
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+MIN_ROWS_PER_WORKER = 250000
+
+# Pools reaproveitados entre as reexecuções do Streamlit, um por número de
+# processos: um pool nunca é trocado enquanto outra thread (sessão ou
+# atualizador) ainda pode estar usando-o
+_pools = {}
+_lock = threading.Lock()
+
+
+def default_workers():
+    """ Esta função devolve o número de processos configurado (CURY_WORKERS ou CPUs). """
+    return int(os.environ.get('CURY_WORKERS') or os.cpu_count() or 1)
+
+
+def _get_pool(workers):
+    with _lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            # spawn: o processo do Streamlit tem threads, e fork com threads não é seguro
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+            _pools[workers] = pool
+        return pool
+
+
+def shutdown():
+    """ Esta função encerra os pools de processos (chamar só sem agregações em andamento). """
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+def partitions(df1, n):
+    """
+        Esta função divide o dataframe em n faixas contíguas de linhas, sem
+        partir um mesmo dia entre duas faixas quando ele está ordenado por data.
+        Input: DataFrame, número de faixas
+        Output: lista de DataFrames
+    """
+    bounds = np.linspace(0, len(df1), n + 1).astype(np.int64)
+    if 'Order_Date' in df1.columns and df1['Order_Date'].is_monotonic_increasing:
+        dates = df1['Order_Date'].to_numpy()
+        bounds[1:-1] = np.searchsorted(dates, dates[bounds[1:-1]], side='left')
+    bounds = np.unique(bounds)
+    return [df1.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def aggregate(df1, func, merge, workers=None):
+    """
+        Esta função calcula func em paralelo sobre faixas do dataframe e junta
+        os resultados com merge.
+        Parâmetros:
+            Input:
+                - df1: DataFrame limpo
+                - func: função (do nível do módulo) DataFrame -> agregado parcial
+                - merge: função lista de parciais -> agregado
+                - workers: número de processos (None = default_workers())
+            Output:
+                - o mesmo que func(df1)
+    """
+    workers = default_workers() if workers is None else workers
+    # O pool é do número configurado; o tamanho da entrada só limita as faixas
+    n_parts = min(workers, len(df1) // MIN_ROWS_PER_WORKER)
+    if n_parts <= 1:
+        return func(df1)
+    parts = partitions(df1, n_parts)
+    if len(parts) == 1:
+        return func(df1)
+    return merge(list(_get_pool(workers).map(func, parts)))
+
+
+def aggregate_kpis(df1, workers=None):
+    """
+        Esta função calcula em paralelo os agregados parciais dos KPIs
+        (cubo, extremos e tabela por entregador, ver cury/stream.py).
+        Input: DataFrame limpo, número de processos (None = default_workers())
+        Output: dicionário de agregados
+    """
+    from cury.stream import merge_partials, partial_aggregates
+
+    aggregates = aggregate(df1, partial_aggregates, merge_partials, workers)
+    aggregates['couriers']['Delivery_person_ID'] = aggregates['couriers']['Delivery_person_ID'].astype('category')
+    return aggregates
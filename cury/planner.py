@@ -0,0 +1,150 @@
+# Planejador das agregações de uma reexecução da página
+#
+# Cada página declara de uma vez as agregações que os gráficos e métricas vão
+# pedir ao cubo (agrupamento + medida). Na primeira leitura o plano:
+#
+#   1. junta os pedidos com o mesmo agrupamento (uma passada calcula todas as
+#      medidas daquele agrupamento);
+#   2. calcula agrupamentos contidos em outro pedido (ex.: 'City' dentro de
+#      City x Road_traffic_density) a partir da tabela já somada do maior,
+#      sem voltar ao cubo, porque contagens e somas se somam;
+#   3. guarda médias, desvios padrão e contagens prontas para todas as
+#      leituras seguintes.
+#
+# Se todas as figuras vierem do cache (cury/figures.py), nada é calculado.
+import numpy as np
+import pandas as pd
+
+from cury.cube import MEASURES, mean_std_from_sums
+from cury.timing import stage
+
+# Medida que conta pedidos (coluna 'orders' do cubo)
+ORDERS = 'orders'
+
+
+def _by(by):
+    if by is None:
+        return ()
+    if isinstance(by, str):
+        return (by,)
+    return tuple(by)
+
+
+def _columns(measure):
+    if measure == ORDERS:
+        return [ORDERS]
+    if measure not in MEASURES:
+        raise ValueError('medida desconhecida: ' + str(measure))
+    return [measure + '_count', measure + '_sum', measure + '_sumsq']
+
+
+def plan_queries(cube, queries):
+    """
+        Esta função registra as agregações que a página vai usar.
+        Parâmetros:
+            Input:
+                - cube: cubo (já filtrado)
+                - queries: lista de (agrupamento, medida); agrupamento é uma
+                  dimensão, uma lista de dimensões ou [] (total), e medida é
+                  'orders', 'time', 'rating' ou 'distance'
+            Output:
+                - plano (dicionário); as agregações só rodam na primeira leitura
+    """
+    requests = {}
+    for by, measure in queries:
+        _columns(measure)
+        requests.setdefault(_by(by), set()).add(measure)
+    return {'cube': cube, 'requests': requests, 'tables': None, 'passes': 0, 'rollups': 0}
+
+
+def _sum_by(df_aux, by, columns):
+    if not by:
+        return df_aux[columns].sum().to_frame().T
+    return df_aux.groupby(list(by), observed=True)[columns].sum().sort_index().reset_index()
+
+
+def execute(plan):
+    """
+        Esta função roda o plano: uma passada pelo cubo por agrupamento que
+        não está contido em outro, e roll-ups para os demais.
+        Input: plano
+        Output: plano (com as tabelas somadas em plan['tables'])
+    """
+    requests = plan['requests']
+    # Maiores agrupamentos primeiro: cada um vira base ou sai de uma base
+    parents = {}
+    for by in sorted(requests, key=len, reverse=True):
+        bases = [base for base in parents if parents[base] == base and set(by) <= set(base)]
+        parents[by] = bases[0] if bases else by
+    columns = {}
+    for by, base in parents.items():
+        for measure in requests[by]:
+            columns.setdefault(base, [])
+            columns[base] += [col for col in _columns(measure) if col not in columns[base]]
+    tables = {}
+    with stage('agregacao', rows_in=len(plan['cube'])) as record:
+        for base in [by for by in parents if parents[by] == by]:
+            tables[base] = _sum_by(plan['cube'], base, columns[base])
+            plan['passes'] += 1
+        for by, base in parents.items():
+            if by != base:
+                tables[by] = _sum_by(tables[base], by, columns[base])
+                plan['rollups'] += 1
+        record['rows_out'] = sum(len(table) for table in tables.values())
+    plan['tables'] = tables
+    return plan
+
+
+def _table(plan, by, measure):
+    if plan['tables'] is None:
+        execute(plan)
+    if by not in plan['tables'] or _columns(measure)[0] not in plan['tables'][by]:
+        # Pedido fora do plano: calcula direto do cubo (e guarda)
+        with stage('agregacao', rows_in=len(plan['cube'])) as record:
+            table = _sum_by(plan['cube'], by, _columns(measure))
+            record['rows_out'] = len(table)
+        plan['passes'] += 1
+        if by in plan['tables']:
+            table = plan['tables'][by].merge(table, on=list(by)) if by else pd.concat([plan['tables'][by], table], axis=1)
+        plan['tables'][by] = table
+    return plan['tables'][by]
+
+
+def mean_std_of(plan, by, measure):
+    """
+        Esta função lê média e desvio padrão de uma medida por agrupamento.
+        Input: plano, agrupamento (dimensão ou lista), medida ('time', 'rating' ou 'distance')
+        Output: DataFrame com as dimensões e as colunas 'mean' e 'std'
+                (o mesmo formato de cube.mean_std_by)
+    """
+    by = _by(by)
+    table = _table(plan, by, measure)
+    count, total, total_sq = _columns(measure)
+    mean, std = mean_std_from_sums(table[count].to_numpy(), table[total].to_numpy(dtype=np.float64),
+                                   table[total_sq].to_numpy(dtype=np.float64))
+    df_aux = table.loc[:, list(by)].copy()
+    df_aux['mean'] = mean
+    df_aux['std'] = std
+    return df_aux.reset_index(drop=True)
+
+
+def mean_std_total(plan, measure):
+    """
+        Esta função lê média e desvio padrão de uma medida em todo o cubo.
+        Input: plano, medida
+        Output: tupla (média, desvio padrão)
+    """
+    df_aux = mean_std_of(plan, [], measure)
+    return float(df_aux['mean'].iloc[0]), float(df_aux['std'].iloc[0])
+
+
+def count_of(plan, by, name=ORDERS):
+    """
+        Esta função lê a quantidade de pedidos por agrupamento.
+        Input: plano, agrupamento (dimensão ou lista), nome da coluna de contagem
+        Output: DataFrame com as dimensões e a contagem (o mesmo formato de cube.count_by)
+    """
+    by = _by(by)
+    table = _table(plan, by, ORDERS)
+    df_aux = table.loc[:, list(by) + [ORDERS]].rename(columns={ORDERS: name})
+    return df_aux.reset_index(drop=True)
@@ -0,0 +1,169 @@
+# Atualização dos dados em segundo plano, com troca atômica de geração
+#
+# Uso (processo separado, atualizando só o snapshot no disco):
+#     python -m cury.refresh dataset/train.csv --interval 60
+#
+# Sem a atualização, a primeira sessão que encontra o CSV mudado paga, dentro
+# da própria reexecução, a ingestão (cury/ingest.py), a leitura do snapshot e
+# a reconstrução do cubo, dos sketches, do índice dos filtros e da grade do
+# mapa, e as outras sessões esperam no lock do cache.
+#
+# start_refresher (chamado pelas páginas) liga uma thread por caminho e por
+# processo que, a cada CURY_REFRESH_SECONDS segundos:
+#
+#   1. ingere o CSV no snapshot: nada, só as linhas novas ou tudo. O
+#      manifesto é trocado de uma vez (os.replace), então o disco sempre tem
+#      um snapshot completo;
+#   2. se a versão mudou, monta a geração nova em memória (as mesmas
+#      projeções e objetos derivados que as sessões já usam) fora do lock;
+#   3. publica a geração com uma única atribuição no cache do loader.
+#
+# Enquanto isso as sessões continuam lendo a geração anterior, sem bloquear
+# nem ver uma geração pela metade; cada reexecução usa uma geração só do
+# começo ao fim (cury/loader.py).
+#
+# Com várias instâncias lendo o mesmo disco, só uma deve gravar o snapshot:
+# rode o módulo como processo separado e defina CURY_REFRESH_INGEST=0 nas
+# instâncias do dashboard, que então só acompanham o manifesto.
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from cury import loader
+from cury.ingest import ingest
+
+INTERVAL_ENV = 'CURY_REFRESH_SECONDS'
+INGEST_ENV = 'CURY_REFRESH_INGEST'
+DEFAULT_INTERVAL = 30.0
+
+_workers = {}
+_lock = threading.Lock()
+
+
+def _env_interval():
+    try:
+        return float(os.environ.get(INTERVAL_ENV, DEFAULT_INTERVAL))
+    except ValueError:
+        return DEFAULT_INTERVAL
+
+
+def refresh_once(path=loader.DATASET_PATH, ingest_csv=True):
+    """
+        Esta função faz um ciclo da atualização: ingere o CSV no snapshot e
+        publica uma geração nova dos dados se a versão mudou.
+        Input: caminho do CSV, se o CSV deve ser ingerido (False = só
+               acompanha o manifesto gravado por outro processo)
+        Output: relatório (dicionário) com 'mode', 'rows_added', 'swapped' e 'seconds'
+    """
+    start = time.perf_counter()
+    if ingest_csv:
+        report = ingest(path)
+    else:
+        report = {'mode': 'watch', 'rows_added': 0, 'rejected_ids': []}
+    report['swapped'] = loader.refresh_generation(path)
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+
+def _load_export(path):
+    # Figuras de um export novo (CURY_EXPORT_DIR) entram no cache aqui, fora
+    # das reexecuções das páginas (cury/export.py)
+    from cury.export import EXPORT_ENV, load_export
+
+    output = os.environ.get(EXPORT_ENV)
+    if output:
+        load_export(output, path)
+
+
+def _run(worker):
+    while True:
+        try:
+            report = refresh_once(worker['path'], worker['ingest'])
+            worker['last_report'] = report
+            worker['last_error'] = None
+            if report['swapped']:
+                worker['swaps'] += 1
+            _load_export(worker['path'])
+        except Exception as error:
+            # A geração publicada continua valendo; tenta de novo no próximo ciclo
+            worker['last_error'] = repr(error)
+        worker['runs'] += 1
+        worker['last_run'] = datetime.now().isoformat(timespec='seconds')
+        if worker['stop'].wait(worker['interval']):
+            return
+
+
+def start_refresher(path=loader.DATASET_PATH, interval=None):
+    """
+        Esta função liga a atualização em segundo plano do caminho (uma
+        thread por processo; chamadas repetidas não fazem nada).
+        Input: caminho do CSV, intervalo em segundos (None = CURY_REFRESH_SECONDS,
+               padrão 30; 0 desliga e a sessão volta a atualizar os dados)
+        Output: estado da thread (dicionário), ou None se desligada
+    """
+    key = os.path.abspath(path)
+    with _lock:
+        if key in _workers:
+            return _workers[key]
+        interval = _env_interval() if interval is None else interval
+        if interval <= 0:
+            return None
+        worker = {'path': path, 'interval': interval, 'runs': 0, 'swaps': 0,
+                  'ingest': os.environ.get(INGEST_ENV, '1') != '0',
+                  'last_run': None, 'last_report': None, 'last_error': None,
+                  'stop': threading.Event()}
+        loader.set_background(path, True, worker['ingest'])
+        worker['thread'] = threading.Thread(target=_run, args=(worker,), name='cury-refresh', daemon=True)
+        _workers[key] = worker
+        worker['thread'].start()
+        return worker
+
+
+def stop_refresher(path=loader.DATASET_PATH):
+    """ Esta função desliga a atualização em segundo plano do caminho. """
+    key = os.path.abspath(path)
+    with _lock:
+        worker = _workers.pop(key, None)
+    if worker is not None:
+        worker['stop'].set()
+        worker['thread'].join()
+        loader.set_background(path, False)
+
+
+def refresher_info(path=loader.DATASET_PATH):
+    """
+        Esta função devolve o estado da atualização em segundo plano.
+        Input: caminho do CSV
+        Output: dicionário com 'interval', 'runs', 'swaps', 'last_run',
+                'last_report' e 'last_error', ou None se desligada
+    """
+    with _lock:
+        worker = _workers.get(os.path.abspath(path))
+        if worker is None:
+            return None
+        return {name: worker[name] for name in
+                ['interval', 'ingest', 'runs', 'swaps', 'last_run', 'last_report', 'last_error']}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m cury.refresh')
+    parser.add_argument('path', nargs='?', default=loader.DATASET_PATH)
+    parser.add_argument('--interval', type=float, default=_env_interval(),
+                        help='segundos entre as ingestões (0 = uma vez só)')
+    args = parser.parse_args(argv)
+    # Fora do dashboard não há geração em memória: só o snapshot é atualizado
+    while True:
+        report = ingest(args.path)
+        if report['mode'] != 'fresh' or args.interval <= 0:
+            print(json.dumps(dict(report, at=datetime.now().isoformat(timespec='seconds')), default=str), flush=True)
+        if args.interval <= 0:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# Rollups de pedidos e entregadores por dia, semana ISO e mês
+#
+# A visão tática agrupava os pedidos por semana com dt.strftime('%U') a cada
+# reexecução: chaves de texto ('05', '14'...) que ordenam como texto, semanas
+# começando no domingo e que recomeçam em '00' na virada do ano.
+#
+# Aqui o tempo vira chave inteira uma única vez por geração dos dados, sobre
+# as células dia x trânsito (não sobre as linhas dos pedidos):
+#
+#     day    AAAAMMDD  (20220211)
+#     week   AAAAWW    (202206: ano ISO * 100 + semana ISO, segunda a domingo)
+#     month  AAAAMM    (202202)
+#
+# Para cada resolução fica uma tabela período x Road_traffic_density com os
+# pedidos (somados do cubo, cury/cube.py), a união dos sketches HyperLogLog
+# dos entregadores (cury/hll.py) e o primeiro e o último dia do período no
+# calendário. Com os filtros da barra lateral:
+#
+#   - trânsito: seleciona linhas da tabela;
+#   - data limite: os períodos que terminam antes dela saem prontos da
+#     tabela; o único período que contém a data limite é somado a partir das
+#     células de dia (no máximo 31 dias x 4 condições de trânsito).
+#
+# As tabelas são objetos derivados do loader: montadas uma vez por geração e
+# refeitas pela atualização em segundo plano (cury/refresh.py).
+import numpy as np
+import pandas as pd
+
+from cury.cube import load_cube
+from cury.hll import CELL, estimate, load_sketches
+from cury.loader import DATASET_PATH, load_derived
+from cury.timing import stage
+
+RESOLUTIONS = ['day', 'week', 'month']
+
+
+def time_keys(dates):
+    """
+        Esta função calcula as chaves inteiras de tempo de cada data.
+        Input: Series de datas (datetime64)
+        Output: DataFrame com as colunas 'day' (AAAAMMDD), 'week' (AAAAWW,
+                semana ISO) e 'month' (AAAAMM), em int32
+    """
+    year, month = dates.dt.year.astype(np.int32), dates.dt.month.astype(np.int32)
+    iso = dates.dt.isocalendar()
+    return pd.DataFrame({
+        'day': year * 10000 + month * 100 + dates.dt.day.astype(np.int32),
+        'week': iso['year'].astype(np.int32) * 100 + iso['week'].astype(np.int32),
+        'month': year * 100 + month,
+    }, index=dates.index)
+
+
+def period_bounds(dates, resolution):
+    """
+        Esta função devolve o primeiro e o último dia do período de cada data.
+        Input: Series de datas, resolução ('day', 'week' ou 'month')
+        Output: tupla (início, fim) de Series de datas
+    """
+    if resolution == 'day':
+        return dates, dates
+    if resolution == 'week':
+        start = dates - pd.to_timedelta(dates.dt.weekday, unit='D')
+        return start, start + pd.Timedelta(days=6)
+    if resolution == 'month':
+        start = dates - pd.to_timedelta(dates.dt.day - 1, unit='D')
+        return start, start + pd.to_timedelta(dates.dt.days_in_month - 1, unit='D')
+    raise ValueError('resolução desconhecida: {}'.format(resolution))
+
+
+def period_labels(keys, resolution):
+    """
+        Esta função formata as chaves inteiras para os eixos dos gráficos
+        (uma vez por período, não por linha).
+        Input: chaves inteiras, resolução
+        Output: lista de textos ('2022-02-11', '2022-W06', '2022-02')
+    """
+    if resolution == 'day':
+        return ['{}-{:02d}-{:02d}'.format(key // 10000, key // 100 % 100, key % 100) for key in keys]
+    if resolution == 'week':
+        return ['{}-W{:02d}'.format(key // 100, key % 100) for key in keys]
+    return ['{}-{:02d}'.format(key // 100, key % 100) for key in keys]
+
+
+def _group(keys, orders, registers):
+    # Soma os pedidos e une os sketches (máximo dos registradores) por chave
+    unique, inverse = np.unique(keys, return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.searchsorted(inverse[order], np.arange(len(unique) + 1))
+    totals = np.bincount(inverse, weights=orders, minlength=len(unique)).astype(np.int64)
+    registers = registers[order]
+    # Um max por grupo: np.maximum.reduceat no eixo 0 é ~30x mais lento aqui
+    merged = np.empty((len(unique), registers.shape[1]), dtype=registers.dtype)
+    for i in range(len(unique)):
+        merged[i] = registers[bounds[i]:bounds[i + 1]].max(axis=0)
+    return unique, totals, merged, order[bounds[:-1]]
+
+
+def build_rollups(cube, sketches):
+    """
+        Esta função monta as tabelas de cada resolução.
+        Input: cubo (cury/cube.py) e sketches (cury/hll.py) sem filtros
+        Output: dicionário com 'precision' e, por resolução, um dicionário
+                com 'cells' (chave, trânsito, 'start', 'end', 'orders') e
+                'registers'; a tabela 'day' traz também as chaves 'week' e
+                'month'
+    """
+    cells = sketches['cells']
+    orders = cube.groupby(CELL, observed=True)['orders'].sum().reset_index()
+    cells = cells.merge(orders, how='left', on=CELL)
+    cells['orders'] = cells['orders'].fillna(0).astype(np.int64)
+    keys = time_keys(cells['Order_Date'])
+    traffic = cells['Road_traffic_density']
+    n = len(traffic.cat.categories)
+    rollups = {'precision': sketches['precision']}
+    for resolution in RESOLUTIONS:
+        start, end = period_bounds(cells['Order_Date'], resolution)
+        unique, totals, registers, first = _group(keys[resolution].to_numpy(np.int64) * n + traffic.cat.codes.to_numpy(),
+                                                  cells['orders'].to_numpy(), sketches['registers'])
+        table = pd.DataFrame({
+            resolution: (unique // n).astype(np.int32),
+            'Road_traffic_density': pd.Categorical.from_codes(unique % n, traffic.cat.categories),
+            'start': start.to_numpy()[first],
+            'end': end.to_numpy()[first],
+            'orders': totals,
+        })
+        if resolution == 'day':
+            for coarser in RESOLUTIONS[1:]:
+                table[coarser] = keys[coarser].to_numpy()[first]
+        rollups[resolution] = {'cells': table, 'registers': registers}
+    return rollups
+
+
+def period_counts(rollups, resolution, date_limit, traffic_options):
+    """
+        Esta função lê a rollup de uma resolução com os filtros da barra
+        lateral.
+        Parâmetros:
+            Input:
+                - rollups: tabelas de load_rollups
+                - resolution: 'day', 'week' ou 'month'
+                - date_limit: data limite (exclusiva)
+                - traffic_options: lista de condições de trânsito
+            Output:
+                - DataFrame ordenado pela chave inteira, com a chave, 'period'
+                  (texto para o eixo), 'ID' (pedidos) e 'Delivery_person_ID'
+                  (entregadores únicos estimados)
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError('resolução desconhecida: {}'.format(resolution))
+    table, days = rollups[resolution], rollups['day']
+    with stage('rollup/' + resolution, rows_in=len(table['cells'])) as record:
+        cells = table['cells']
+        traffic = cells['Road_traffic_density'].isin(traffic_options).to_numpy()
+        complete = traffic & (cells['end'] < date_limit).to_numpy()
+        # Período cortado pela data limite: somado a partir dos dias
+        cut = cells.loc[traffic & (cells['start'] < date_limit).to_numpy() & ~complete, resolution].unique()
+        partial = (days['cells']['Road_traffic_density'].isin(traffic_options)
+                   & (days['cells']['start'] < date_limit)
+                   & days['cells'][resolution].isin(cut)).to_numpy()
+        keys, totals, registers, _ = _group(
+            np.concatenate([cells[resolution].to_numpy()[complete], days['cells'][resolution].to_numpy()[partial]]),
+            np.concatenate([cells['orders'].to_numpy()[complete], days['cells']['orders'].to_numpy()[partial]]),
+            np.concatenate([table['registers'][complete], days['registers'][partial]]))
+        df_aux = pd.DataFrame({
+            resolution: keys.astype(np.int32),
+            'period': period_labels(keys, resolution),
+            'ID': totals,
+            'Delivery_person_ID': [int(round(estimate(row))) for row in registers],
+        })
+        record['rows_out'] = len(df_aux)
+    return df_aux
+
+
+def load_rollups(path=DATASET_PATH):
+    """
+        Esta função devolve as rollups do dataset atual, construídas uma
+        única vez por versão dos dados (mesmo cache de load_dataset).
+        Input: caminho do CSV
+        Output: rollups (compartilhadas; não alterar no lugar)
+    """
+    # O cubo e os sketches vêm da mesma geração (também durante a montagem
+    # de uma geração nova em segundo plano)
+    return load_derived('rollups', lambda df1: build_rollups(load_cube(path), load_sketches(path)), path, columns=CELL)
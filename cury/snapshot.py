@@ -0,0 +1,198 @@
+# Snapshot colunar (Arrow IPC / Feather) do dataset já limpo
+#
+# Passo de build:
+#     python -m cury.snapshot dataset/train.csv
+#
+# O snapshot é um pequeno armazenamento ao lado do CSV:
+#     dataset/train.feather        base, com os tipos já otimizados
+#     dataset/train.parts/         blocos acrescentados pela ingestão
+#                                  incremental (cury/ingest.py), os índices
+#                                  de IDs de cada bloco, o cubo e as bases
+#                                  regravadas (nomes novos a cada
+#                                  gravação; os do manifesto anterior ficam
+#                                  até a ingestão seguinte)
+#     dataset/train.manifest.json  lista dos arquivos válidos e a marca
+#                                  d'água (até que byte do CSV já foi limpo)
+#
+# Cada bloco é ordenado por data e o manifesto guarda a primeira e a última
+# data de cada um. Se as faixas de datas dos blocos se sobrepõem (pedidos
+# atrasados acrescentados depois), a leitura intercala os blocos por data;
+# senão basta concatená-los.
+#
+# Os arquivos são gravados sem compressão para poder ser lidos via memory
+# map. O manifesto é sempre o último arquivo gravado e é trocado de uma vez:
+# quem lê nunca vê um snapshot pela metade.
+import json
+import os
+import sys
+
+import numpy as np
+
+SUFFIX = '.feather'
+# Incrementar quando o formato do dataframe limpo mudar (tipos, colunas)
+FORMAT_VERSION = 8
+
+
+def snapshot_path(csv_path):
+    """ Esta função devolve o caminho do snapshot base que acompanha o CSV. """
+    return os.path.splitext(csv_path)[0] + SUFFIX
+
+
+def manifest_path(csv_path):
+    """ Esta função devolve o caminho do manifesto do snapshot. """
+    return os.path.splitext(csv_path)[0] + '.manifest.json'
+
+
+def parts_dir(csv_path):
+    """ Esta função devolve a pasta dos blocos incrementais do snapshot. """
+    return os.path.splitext(csv_path)[0] + '.parts'
+
+
+def _normalize(table):
+    # Colunas categóricas viram dicionários com índice int32 em todos os
+    # arquivos, para que blocos diferentes tenham o mesmo esquema
+    import pyarrow as pa
+
+    fields = []
+    for field in table.schema:
+        if pa.types.is_dictionary(field.type):
+            field = pa.field(field.name, pa.dictionary(pa.int32(), field.type.value_type))
+        fields.append(field)
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+
+def write_table(df1, path):
+    """
+        Esta função grava um dataframe em Arrow IPC sem compressão.
+        Input: DataFrame, caminho do .feather
+        Output: path
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    table = _normalize(pa.Table.from_pandas(df1, preserve_index=False))
+    # Grava num arquivo temporário e troca de uma vez
+    tmp_path = path + '.tmp'
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_tables(paths, columns=None):
+    """
+        Esta função lê um ou mais arquivos do snapshot via memory map,
+        materializando apenas as colunas pedidas.
+        Input: lista de caminhos .feather, lista de colunas (None = todas)
+        Output: DataFrame com as linhas de todos os arquivos, na ordem
+    """
+    import pyarrow as pa
+
+    tables = []
+    for path in paths:
+        with pa.memory_map(path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(list(columns))
+        tables.append(table)
+    from cury.loader import CATEGORIES
+
+    df1 = pa.concat_tables(tables).to_pandas(split_blocks=True)
+    for col in df1.columns:
+        if df1[col].dtype.name != 'category':
+            continue
+        # Ao juntar blocos com dicionários diferentes as categorias podem
+        # sair fora de ordem; volta à ordem do dataset montado de uma vez
+        # (loader.optimize_dtypes): as conhecidas e depois as novas, em ordem
+        categories = list(df1[col].cat.categories)
+        known = CATEGORIES.get(col, [])
+        expected = known + sorted(set(categories) - set(known))
+        if categories != expected:
+            df1[col] = df1[col].cat.set_categories(expected)
+    return df1
+
+
+def read_manifest(csv_path):
+    """
+        Esta função lê o manifesto do snapshot.
+        Input: caminho do CSV
+        Output: dicionário do manifesto, ou None se não existe ou é de outro formato
+    """
+    path = manifest_path(csv_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def write_manifest(csv_path, manifest):
+    """ Esta função grava o manifesto de forma atômica. """
+    path = manifest_path(csv_path)
+    manifest = dict(manifest, format=FORMAT_VERSION)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def resolve(csv_path, name):
+    """ Esta função transforma um nome do manifesto em caminho no disco. """
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), name)
+
+
+def in_date_order(ranges):
+    """
+        Esta função diz se os blocos, na ordem do manifesto, já formam uma
+        sequência ordenada por data (nenhum começa antes do fim do anterior).
+        Input: lista de [primeira data, última data] (None em blocos vazios)
+        Output: True se basta concatenar os blocos
+    """
+    last = None
+    for first, end in ranges:
+        if first is None:
+            continue
+        if last is not None and first < last:
+            return False
+        last = end
+    return True
+
+
+def read_snapshot(csv_path, columns=None, manifest=None):
+    """
+        Esta função lê o dataset limpo a partir do snapshot (base + blocos),
+        ordenado por data.
+        Input: caminho do CSV, lista de colunas (None = todas), manifesto já lido (opcional)
+        Output: DataFrame
+    """
+    manifest = manifest or read_manifest(csv_path)
+    paths = [resolve(csv_path, name) for name in manifest['parts']]
+    if in_date_order(manifest['dates']):
+        return read_tables(paths, columns)
+    # Intercalação estável pela Order_Date de blocos já ordenados: a mesma
+    # ordem de uma reconstrução completa, para qualquer projeção de colunas
+    extra = columns is not None and 'Order_Date' not in columns
+    df1 = read_tables(paths, None if columns is None else list(columns) + ['Order_Date'] * extra)
+    order = np.argsort(df1['Order_Date'].to_numpy(), kind='stable')
+    df1 = df1.take(order).reset_index(drop=True)
+    return df1.drop(columns='Order_Date') if extra else df1
+
+
+def build_snapshot(csv_path):
+    """
+        Esta função lê e limpa o CSV inteiro e grava o snapshot ao lado dele.
+        Input: caminho do CSV
+        Output: caminho do manifesto
+    """
+    from cury.ingest import rebuild
+
+    rebuild(csv_path)
+    return manifest_path(csv_path)
+
+
+if __name__ == '__main__':
+    from cury.loader import DATASET_PATH
+
+    print(build_snapshot(sys.argv[1] if len(sys.argv) > 1 else DATASET_PATH))
@@ -0,0 +1,171 @@
+# Processamento do train.csv em blocos, com memória limitada
+#
+# Uso:
+#     python -m cury.stream dataset/train.csv [linhas_por_bloco]
+#
+# Para históricos de pedidos que não cabem na memória, o CSV é lido em blocos
+# de CHUNK_SIZE linhas. Cada bloco passa pela mesma limpeza do dashboard
+# (loader.prepare_dataset) e vira um conjunto de agregados parciais que podem
+# ser somados entre si:
+#
+#   - 'cube':      o cubo do dashboard (contagem, soma e soma dos quadrados)
+#                  para as médias e desvios padrão
+#   - 'extremes':  mínimo e máximo de idade e condição do veículo por
+#                  Order_Date x Road_traffic_density
+#   - 'couriers':  por Order_Date x Road_traffic_density x City x entregador,
+#                  o maior tempo de entrega (top_delivers) e a contagem e soma
+#                  das avaliações
+#
+# Os agregados mantêm Order_Date e Road_traffic_density, então os filtros da
+# barra lateral continuam valendo. A memória passa a depender do número de
+# chaves (dias, entregadores...), não do número de linhas do CSV.
+import json
+import sys
+
+import numpy as np
+
+from cury.cube import build_cube, filter_cube, mean_std, merge_cubes, merge_frames
+from cury.loader import DATASET_PATH, prepare_dataset, read_dataset
+from cury.topk import top_k
+
+CHUNK_SIZE = 200000
+
+CELL = ['Order_Date', 'Road_traffic_density']
+COURIER_KEYS = CELL + ['City', 'Delivery_person_ID']
+
+# Agregado -> (coluna do dataset, função); a mesma função junta os parciais
+EXTREMES = {
+    'age_min': ('Delivery_person_Age', 'min'),
+    'age_max': ('Delivery_person_Age', 'max'),
+    'vehicle_min': ('Vehicle_condition', 'min'),
+    'vehicle_max': ('Vehicle_condition', 'max'),
+}
+COURIERS = {
+    'time_max': ('Time_taken(min)', 'max'),
+    'rating_count': ('Delivery_person_Ratings', 'count'),
+    'rating_sum': ('Delivery_person_Ratings', 'sum'),
+}
+
+
+def _merge_how(spec):
+    # 'count' e 'sum' de blocos diferentes se juntam somando
+    return {name: 'sum' if how == 'count' else how for name, (col, how) in spec.items()}
+
+
+def partial_aggregates(df1):
+    """
+        Esta função resume um bloco de pedidos já limpo nos agregados parciais.
+        Input: DataFrame limpo (saída de prepare_dataset)
+        Output: dicionário com 'rows', 'cube', 'extremes' e 'couriers'
+    """
+    extremes = df1.groupby(CELL, observed=True).agg(**EXTREMES).reset_index()
+    df_aux = df1.loc[:, COURIER_KEYS + ['Time_taken(min)', 'Delivery_person_Ratings']]
+    # Entregador como texto: cada bloco tem as suas próprias categorias
+    df_aux['Delivery_person_ID'] = df_aux['Delivery_person_ID'].astype(object)
+    couriers = df_aux.groupby(COURIER_KEYS, observed=True).agg(**COURIERS).reset_index()
+    return {'rows': len(df1), 'cube': build_cube(df1), 'extremes': extremes, 'couriers': couriers}
+
+
+def merge_partials(partials):
+    """
+        Esta função junta agregados parciais de blocos diferentes.
+        Input: lista de dicionários devolvidos por partial_aggregates
+        Output: dicionário no mesmo formato, equivalente a agregar tudo junto
+    """
+    return {
+        'rows': sum(p['rows'] for p in partials),
+        'cube': merge_cubes([p['cube'] for p in partials]),
+        'extremes': merge_frames([p['extremes'] for p in partials], CELL, _merge_how(EXTREMES)),
+        'couriers': merge_frames([p['couriers'] for p in partials], COURIER_KEYS, _merge_how(COURIERS)),
+    }
+
+
+def stream_aggregates(path=DATASET_PATH, chunksize=CHUNK_SIZE):
+    """
+        Esta função lê o CSV em blocos e acumula os agregados parciais. Só um
+        bloco de linhas (e o conjunto dos IDs já vistos) fica na memória por
+        vez.
+        Input: caminho do CSV, linhas por bloco
+        Output: dicionário de agregados (ver partial_aggregates)
+    """
+    total = None
+    seen = set()
+    for chunk in read_dataset(path, chunksize=chunksize):
+        df1 = prepare_dataset(chunk)
+        # IDs repetidos entre blocos: fica a primeira ocorrência, como no CSV inteiro
+        repeated = df1['ID'].isin(seen).to_numpy()
+        if repeated.any():
+            df1 = df1.loc[~repeated, :].reset_index(drop=True)
+        seen.update(df1['ID'])
+        partial = partial_aggregates(df1)
+        total = partial if total is None else merge_partials([total, partial])
+    if total is None:
+        raise ValueError('CSV sem linhas: ' + path)
+    total['couriers']['Delivery_person_ID'] = total['couriers']['Delivery_person_ID'].astype('category')
+    return total
+
+
+def filter_aggregates(aggregates, date_limit, traffic_options):
+    """
+        Esta função aplica os filtros da barra lateral a todos os agregados.
+        Input: agregados, data limite (exclusiva), lista de condições de trânsito
+        Output: agregados filtrados
+    """
+    filtered = {'rows': aggregates['rows']}
+    for name in ['cube', 'extremes', 'couriers']:
+        filtered[name] = filter_cube(aggregates[name], date_limit, traffic_options)
+    return filtered
+
+
+def extreme(aggregates, name):
+    """
+        Esta função devolve um dos extremos ('age_min', 'age_max',
+        'vehicle_min' ou 'vehicle_max') dos pedidos agregados.
+    """
+    how = EXTREMES[name][1]
+    return getattr(aggregates['extremes'][name], how)()
+
+
+def ratings_by_courier(aggregates):
+    """
+        Esta função calcula a avaliação média por entregador.
+        Input: agregados
+        Output: DataFrame com Delivery_person_ID e Delivery_person_Ratings
+    """
+    df_aux = aggregates['couriers'].groupby('Delivery_person_ID', observed=True)[['rating_count', 'rating_sum']].sum().sort_index()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratings = df_aux['rating_sum'] / df_aux['rating_count'].replace(0, np.nan)
+    return ratings.rename('Delivery_person_Ratings').reset_index()
+
+
+def top_delivers(aggregates, k=10):
+    """
+        Esta função monta as tabelas dos k entregadores mais rápidos e mais
+        lentos por cidade, como o top_delivers da visão entregadores.
+        Input: agregados, tamanho dos rankings
+        Output: tupla (mais rápidos, mais lentos): DataFrames com City,
+                Delivery_person_ID e Time_taken(min)
+    """
+    df_aux = aggregates['couriers'].rename(columns={'time_max': 'Time_taken(min)'})
+    return top_k(df_aux, 'City', 'Delivery_person_ID', 'Time_taken(min)', agg='max', k=k)
+
+
+def summary(aggregates):
+    """
+        Esta função reúne os KPIs numéricos do dashboard.
+        Input: agregados (filtrados ou não)
+        Output: dicionário KPI -> valor
+    """
+    kpis = {'orders': int(aggregates['cube']['orders'].sum()),
+            'unique_couriers': int(aggregates['couriers']['Delivery_person_ID'].nunique())}
+    for name in EXTREMES:
+        kpis[name] = int(extreme(aggregates, name))
+    for name in ['time', 'rating', 'distance']:
+        kpis[name + '_mean'], kpis[name + '_std'] = mean_std(aggregates['cube'], name)
+    return kpis
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else DATASET_PATH
+    chunksize = int(sys.argv[2]) if len(sys.argv) > 2 else CHUNK_SIZE
+    print(json.dumps(summary(stream_aggregates(path, chunksize)), indent=2))
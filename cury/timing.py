@@ -0,0 +1,224 @@
+# Tempos por etapa de cada reexecução das páginas
+#
+# Cada página abre uma execução (start_run) e fecha no fim (finish_run). No
+# meio, as etapas caras são medidas com stage(): leitura do CSV, limpeza,
+# filtros, groupbys, montagem das figuras Plotly, renderização do folium e
+# serialização para o navegador (st.plotly_chart, st.dataframe...). Cada
+# etapa guarda o tempo, as linhas de entrada e saída e a variação da memória
+# residente (RSS) do processo.
+#
+# Fora de uma execução (CLI, benchmarks, processos do pool) stage() não faz
+# nada. Cada sessão do Streamlit roda o script na sua própria thread, então a
+# execução atual fica numa variável local da thread.
+#
+# Saídas:
+#   - painel na barra lateral (debug_panel), ligado com CURY_DEBUG=1 ou com
+#     ?debug=1 na URL
+#   - log em CURY_METRICS_LOG: arquivo '.prom' vira um textfile do Prometheus
+#     (node_exporter) com os acumulados do processo; qualquer outra extensão
+#     recebe uma linha JSON por execução
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+DEBUG_ENV = 'CURY_DEBUG'
+LOG_ENV = 'CURY_METRICS_LOG'
+
+_local = threading.local()
+_totals = {}
+_lock = threading.Lock()
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = None
+
+
+def rss():
+    """
+        Esta função devolve a memória residente atual do processo em bytes
+        (None fora do Linux).
+    """
+    if _PAGE_SIZE is None:
+        return None
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def start_run(page):
+    """
+        Esta função abre a execução de uma página na thread atual.
+        Input: nome da página (ex.: 'empresa')
+        Output: execução (dicionário com 'page', 'started', 'stages'...)
+    """
+    run = {'page': page, 'started': datetime.now().isoformat(timespec='milliseconds'),
+           'start': time.perf_counter(), 'rss_start': rss(), 'stages': [], 'depth': 0}
+    _local.run = run
+    return run
+
+
+def current_run():
+    """ Esta função devolve a execução aberta na thread atual (ou None). """
+    return getattr(_local, 'run', None)
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    """
+        Esta função mede uma etapa da execução atual.
+        Uso:
+            with stage('filter', rows_in=len(df1)) as record:
+                df1 = ...
+                record['rows_out'] = len(df1)
+        Input: nome da etapa, linhas de entrada
+        Output: registro da etapa (dicionário), onde rows_out pode ser preenchido
+    """
+    record = {'stage': name, 'rows_in': rows_in, 'rows_out': None}
+    run = current_run()
+    if run is None:
+        yield record
+        return
+    record['depth'] = run['depth']
+    run['stages'].append(record)
+    run['depth'] += 1
+    memory = rss()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = time.perf_counter() - start
+        after = rss()
+        record['rss_delta'] = None if memory is None or after is None else after - memory
+        run['depth'] -= 1
+
+
+def finish_run(run):
+    """
+        Esta função fecha a execução, soma nos acumulados do processo e grava
+        o log (se CURY_METRICS_LOG estiver definido).
+        Input: execução
+        Output: execução (com 'seconds' e 'rss_delta')
+    """
+    run['seconds'] = time.perf_counter() - run['start']
+    end = rss()
+    run['rss_delta'] = None if run['rss_start'] is None or end is None else end - run['rss_start']
+    if current_run() is run:
+        _local.run = None
+    with _lock:
+        for record in [{'stage': '(total)', 'seconds': run['seconds']}] + run['stages']:
+            key = (run['page'], record['stage'])
+            totals = _totals.setdefault(key, {'seconds': 0.0, 'count': 0})
+            totals['seconds'] += record['seconds']
+            totals['count'] += 1
+            totals['last'] = record['seconds']
+    path = os.environ.get(LOG_ENV)
+    if path:
+        if path.endswith('.prom'):
+            write_prometheus(path)
+        else:
+            append_jsonl(run, path)
+    return run
+
+
+def run_record(run):
+    """
+        Esta função monta o registro serializável de uma execução.
+        Input: execução
+        Output: dicionário (o que vai para o log JSON)
+    """
+    return {'page': run['page'], 'started': run['started'], 'seconds': run.get('seconds'),
+            'rss_delta': run.get('rss_delta'),
+            'stages': [{key: record.get(key) for key in ['stage', 'depth', 'seconds', 'rows_in', 'rows_out', 'rss_delta']}
+                       for record in run['stages']]}
+
+
+def append_jsonl(run, path):
+    """ Esta função acrescenta a execução como uma linha JSON no arquivo. """
+    line = json.dumps(run_record(run), ensure_ascii=False)
+    with _lock:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def write_prometheus(path):
+    """
+        Esta função grava os acumulados do processo no formato textfile do
+        Prometheus. O arquivo é trocado de uma vez (os.replace), como o
+        coletor do node_exporter espera.
+        Input: caminho do arquivo .prom
+    """
+    metrics = [
+        ('cury_stage_seconds_total', 'counter', 'Tempo acumulado por página e etapa', 'seconds'),
+        ('cury_stage_runs_total', 'counter', 'Execuções medidas por página e etapa', 'count'),
+        ('cury_stage_last_seconds', 'gauge', 'Tempo da última execução por página e etapa', 'last'),
+    ]
+    lines = []
+    with _lock:
+        for name, kind, help_text, field in metrics:
+            lines.append('# HELP {} {}'.format(name, help_text))
+            lines.append('# TYPE {} {}'.format(name, kind))
+            for (page, name_stage), totals in sorted(_totals.items()):
+                lines.append('{}{{page="{}",stage="{}"}} {}'.format(
+                    name, _label(page), _label(name_stage), totals[field]))
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(path + '.tmp', path)
+
+
+def stage_totals():
+    """
+        Esta função devolve os acumulados do processo.
+        Output: dicionário (página, etapa) -> {'seconds', 'count', 'last'}
+    """
+    with _lock:
+        return {key: dict(totals) for key, totals in _totals.items()}
+
+
+def debug_enabled():
+    """ Esta função diz se o painel de depuração está ligado (CURY_DEBUG=1 ou ?debug=1). """
+    if os.environ.get(DEBUG_ENV, '').lower() in ('1', 'true', 'yes'):
+        return True
+    import streamlit as st
+
+    try:
+        return st.experimental_get_query_params().get('debug', ['0'])[0] in ('1', 'true')
+    except Exception:
+        return False
+
+
+def _mib(value):
+    return None if value is None else round(value / 2 ** 20, 1)
+
+
+def debug_panel(run):
+    """
+        Esta função mostra na barra lateral os tempos da execução, se o
+        painel estiver ligado.
+        Input: execução (já fechada com finish_run)
+        Output: None (desenha no Streamlit)
+    """
+    if not debug_enabled():
+        return
+    import pandas as pd
+    import streamlit as st
+
+    with st.sidebar.expander('Depuração: tempos desta execução', expanded=True):
+        st.caption('Total: {:.3f} s - memória: {} MiB'.format(run['seconds'], _mib(run['rss_delta'])))
+        df_aux = pd.DataFrame({
+            'etapa': ['  ' * record['depth'] + record['stage'] for record in run['stages']],
+            'segundos': [round(record['seconds'], 4) for record in run['stages']],
+            'linhas entrada': [record['rows_in'] for record in run['stages']],
+            'linhas saída': [record['rows_out'] for record in run['stages']],
+            'memória (MiB)': [_mib(record['rss_delta']) for record in run['stages']],
+        })
+        st.dataframe(df_aux)
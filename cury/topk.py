@@ -0,0 +1,76 @@
+# Top-k por grupo (ex.: os entregadores mais rápidos e mais lentos por cidade)
+#
+# Uma única agregação por (grupo, chave) e, dentro de cada grupo, uma seleção
+# parcial (np.partition) dos k menores e dos k maiores valores, sem ordenar a
+# tabela inteira. Os grupos são os presentes nos dados (nada fixo no código)
+# e a métrica é qualquer coluna com qualquer agregação do pandas ('max',
+# 'mean', ...).
+#
+# Empates saem na ordem da chave, como numa ordenação estável; valores NaN
+# ficam sempre no fim.
+import numpy as np
+
+from cury.timing import stage
+
+
+def first_positions(keys, k):
+    """
+        Esta função devolve as posições dos k menores valores, em ordem
+        estável, sem ordenar o array inteiro.
+        Input: array float (NaN já trocado por inf), k
+        Output: array de posições
+    """
+    if k >= len(keys):
+        return np.argsort(keys, kind='stable')
+    kth = np.partition(keys, k - 1)[k - 1]
+    less = np.flatnonzero(keys < kth)
+    equal = np.flatnonzero(keys == kth)[:k - len(less)]
+    candidates = np.sort(np.concatenate([less, equal]))
+    return candidates[np.argsort(keys[candidates], kind='stable')]
+
+
+def _selection_keys(values, ascending):
+    keys = values if ascending else -values
+    return np.where(np.isnan(keys), np.inf, keys)
+
+
+def _rankings(df1, group, key, value, agg, k):
+    df_aux = df1.groupby([group, key], observed=True)[value].agg(agg).sort_index()
+    groups = np.asarray(df_aux.index.get_level_values(0))
+    values = df_aux.to_numpy(dtype=np.float64)
+    # As linhas de df_aux já estão ordenadas por grupo: cada grupo é uma faixa
+    changes = np.flatnonzero(groups[1:] != groups[:-1]) + 1
+    bounds = np.concatenate([[0], changes, [len(groups)]])
+    smallest, largest = [], []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        part = values[start:stop]
+        smallest.append(start + first_positions(_selection_keys(part, True), k))
+        largest.append(start + first_positions(_selection_keys(part, False), k))
+    df_aux = df_aux.reset_index()
+    rankings = []
+    for positions in [smallest, largest]:
+        positions = np.concatenate(positions) if positions else np.array([], dtype=np.int64)
+        rankings.append(df_aux.iloc[positions].reset_index(drop=True))
+    return rankings[0], rankings[1]
+
+
+def top_k(df1, group, key, value, agg='max', k=10):
+    """
+        Esta função calcula, numa só passada, os k menores e os k maiores de
+        cada grupo.
+        Parâmetros:
+            Input:
+                - df1: DataFrame
+                - group: coluna dos grupos (ex.: 'City')
+                - key: coluna ranqueada dentro do grupo (ex.: 'Delivery_person_ID')
+                - value: coluna da métrica (ex.: 'Time_taken(min)')
+                - agg: agregação da métrica por (grupo, chave): 'max', 'mean', ...
+                - k: tamanho de cada ranking
+            Output:
+                - tupla (menores, maiores): DataFrames com as colunas group,
+                  key e value, grupo a grupo (na ordem dos grupos)
+    """
+    with stage('top_k', rows_in=len(df1)) as record:
+        rankings = _rankings(df1, group, key, value, agg, k)
+        record['rows_out'] = len(rankings[0]) + len(rankings[1])
+    return rankings
@@ -0,0 +1,154 @@
+# Visualizador paginado da tabela de dados
+#
+# Em vez de mandar o dataframe inteiro ao navegador (st.write(df1)), a
+# ordenação, o filtro de texto e a paginação são feitos aqui no servidor e só
+# a página visível (linhas e colunas escolhidas) é enviada. Cada página tem no
+# máximo MAX_PAGE_SIZE linhas.
+#
+# A ordenação não ordena a tabela inteira: as linhas da página saem de uma
+# seleção parcial (np.partition) das primeiras posições, com o mesmo
+# resultado de uma ordenação estável.
+#
+# A tabela pode ser uma seleção de linhas do dataset compartilhado (view de
+# cury/filters.py): só as colunas usadas no filtro e na ordenação e as linhas
+# da página são lidas, sem copiar a seleção inteira.
+import math
+
+import numpy as np
+import pandas as pd
+
+from cury.timing import stage
+from cury.topk import first_positions
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+NO_SORT = '(sem ordenação)'
+NO_FILTER = '(sem filtro)'
+
+
+def _contains(series, text):
+    # Categóricas: o texto é procurado só nas categorias
+    if series.dtype.name == 'category':
+        categories = series.cat.categories.astype(str)
+        match = np.asarray(categories.str.contains(text, case=False, regex=False), dtype=bool)
+        codes = series.cat.codes.to_numpy()
+        return (codes >= 0) & np.append(match, False)[codes]
+    return series.astype(str).str.contains(text, case=False, regex=False).to_numpy(dtype=bool)
+
+
+def _sort_keys(series, ascending):
+    # Chave numérica (float) com a ordem da coluna; NaN sempre no fim, como no pandas
+    if series.dtype.name == 'category':
+        keys = series.cat.codes.to_numpy().astype(np.float64)
+        keys[keys < 0] = np.nan
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        keys = series.to_numpy().view(np.int64).astype(np.float64)
+        keys[series.isna().to_numpy()] = np.nan
+    elif pd.api.types.is_numeric_dtype(series):
+        keys = series.to_numpy(dtype=np.float64)
+    else:
+        codes, _ = pd.factorize(series, sort=True)
+        keys = codes.astype(np.float64)
+        keys[codes < 0] = np.nan
+    # Sempre fora do lugar: keys pode ser uma view do bloco somente leitura
+    # do dataset compartilhado (loader.share_frame)
+    if not ascending:
+        keys = -keys
+    return np.where(np.isnan(keys), np.inf, keys)
+
+
+def _selected(series, rows):
+    # Coluna só nas linhas da seleção (recorte contínuo = view, sem cópia)
+    return series if rows is None else series.iloc[rows]
+
+
+def query_page(df1, page=1, page_size=PAGE_SIZE, columns=None, sort_by=None, ascending=True,
+               filter_column=None, filter_text='', rows=None):
+    """
+        Esta função calcula uma página da tabela no servidor.
+        Parâmetros:
+            Input:
+                - df1: DataFrame completo (não é alterado)
+                - page: número da página, a partir de 1
+                - page_size: linhas por página (no máximo MAX_PAGE_SIZE)
+                - columns: colunas visíveis (None = todas)
+                - sort_by: coluna de ordenação (None = ordem atual)
+                - ascending: ordem crescente ou decrescente
+                - filter_column, filter_text: mantém as linhas cuja coluna contém o texto
+                - rows: linhas de df1 que formam a tabela (slice ou array de
+                  posições, como em filter_view); None = todas
+            Output:
+                - tupla (DataFrame da página, total de linhas após o filtro,
+                  número de páginas, página devolvida)
+    """
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    if isinstance(rows, slice):
+        rows = slice(*rows.indices(len(df1))[:2])
+    size = len(df1) if rows is None else len(range(len(df1))[rows]) if isinstance(rows, slice) else len(rows)
+    positions = None
+    if filter_column and filter_text:
+        positions = np.flatnonzero(_contains(_selected(df1[filter_column], rows), filter_text))
+    total = size if positions is None else len(positions)
+    n_pages = max(1, math.ceil(total / page_size))
+    page = max(1, min(int(page), n_pages))
+    start = (page - 1) * page_size
+    stop = min(total, start + page_size)
+    if sort_by:
+        keys = _sort_keys(_selected(df1[sort_by], rows), ascending)
+        if positions is not None:
+            keys = keys[positions]
+        selected = first_positions(keys, stop)[start:stop]
+        if positions is not None:
+            selected = positions[selected]
+    elif positions is None:
+        selected = np.arange(start, stop)
+    else:
+        selected = positions[start:stop]
+    # Posições da página na tabela -> posições em df1
+    if isinstance(rows, slice):
+        selected = selected + rows.start
+    elif rows is not None:
+        selected = rows[selected]
+    columns = list(df1.columns) if not columns else list(columns)
+    col_positions = [df1.columns.get_loc(col) for col in columns]
+    return df1.iloc[selected, col_positions], total, n_pages, page
+
+
+def data_viewer(data, key, page_size=PAGE_SIZE):
+    """
+        Esta função mostra a tabela paginada com os controles de colunas,
+        ordenação, filtro e página.
+        Input: DataFrame ou view (filters.filter_view), prefixo único das
+               chaves dos widgets, linhas por página
+        Output: None (desenha no Streamlit)
+    """
+    import streamlit as st
+
+    if isinstance(data, dict):
+        df1, rows = data['data'], data['rows']
+    else:
+        df1, rows = data, None
+
+    all_columns = list(df1.columns)
+    text_columns = [col for col in all_columns
+                    if df1[col].dtype.name in ('category', 'object')]
+    # Sem st.columns: a tabela pode ser desenhada dentro de uma coluna da página
+    with st.expander('Colunas, ordenação e filtro'):
+        columns = st.multiselect('Colunas', all_columns, default=all_columns, key=key + '_columns')
+        sort_by = st.selectbox('Ordenar por', [NO_SORT] + all_columns, key=key + '_sort')
+        order = st.radio('Ordem', ['Crescente', 'Decrescente'], horizontal=True, key=key + '_order')
+        filter_column = st.selectbox('Filtrar coluna', [NO_FILTER] + text_columns, key=key + '_filter_column')
+        filter_text = st.text_input('Contém', key=key + '_filter_text')
+    page = st.number_input('Página', min_value=1, value=1, step=1, key=key + '_page')
+
+    df_page, total, n_pages, page = query_page(
+        df1, page, page_size, columns,
+        sort_by=None if sort_by == NO_SORT else sort_by,
+        ascending=order == 'Crescente',
+        filter_column=None if filter_column == NO_FILTER else filter_column,
+        filter_text=filter_text, rows=rows)
+    st.caption('{} linhas - página {} de {}'.format(total, page, n_pages))
+    with stage('envio/tabela', rows_in=total) as record:
+        st.dataframe(df_page)
+        record['rows_out'] = len(df_page)
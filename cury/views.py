@@ -0,0 +1,417 @@
+# Cálculos das três visões do dashboard, sem o Streamlit
+#
+# As páginas (pages/*.py), o export em lote (cury/export.py), a API
+# (cury/api.py) e a suíte de benchmarks chamam as mesmas funções daqui: as
+# colunas lidas, as agregações declaradas ao planner, os KPIs, as tabelas e
+# os gráficos. As páginas só cuidam do layout; um KPI exportado é sempre o
+# mesmo número que a página mostra.
+#
+# view_inputs monta o que uma visão lê para os filtros da barra lateral (a
+# seleção de linhas, o plano sobre o cubo e, no restaurante, os sketches), e
+# VIEWS junta, por visão, os KPIs, as tabelas e os gráficos (como funções
+# sem argumentos, montados só quando pedidos).
+#
+# O plotly é importado dentro das funções dos gráficos: a API, a visão
+# entregadores (que não tem gráficos) e as reexecuções com as figuras em
+# cache (cury/figures.py) não pagam o import dele.
+import math
+from datetime import datetime
+
+import numpy as np
+
+from cury.cube import filter_cube, load_cube
+from cury.filters import filter_view, load_filter_index, view_frame
+from cury.hll import count_distinct, filter_sketches, load_sketches
+from cury.loader import load_dataset
+from cury.planner import count_of, mean_std_of, mean_std_total, plan_queries
+from cury.rollups import RESOLUTIONS, load_rollups, period_counts
+from cury.timing import stage
+from cury.topk import top_k
+
+# Filtros padrão da barra lateral (todas as datas, todo o trânsito)
+DATE_LIMIT = datetime(2022, 4, 13)
+TRAFFIC_OPTIONS = ['Low', 'Medium', 'High', 'Jam']
+
+# Colunas do dataset lidas por cada visão
+COLUMNS = {
+    'empresa': ['Order_Date', 'Road_traffic_density', 'City',
+                'Delivery_location_latitude', 'Delivery_location_longitude'],
+    'entregadores': ['ID', 'Delivery_person_ID', 'Delivery_person_Age', 'Delivery_person_Ratings', 'Order_Date',
+                     'Weatherconditions', 'Road_traffic_density', 'Vehicle_condition', 'City', 'Time_taken(min)'],
+    'restaurante': ['ID', 'Delivery_person_ID', 'Order_Date', 'Road_traffic_density', 'Type_of_order',
+                    'Festival', 'City', 'Time_taken(min)', 'distance_km'],
+}
+
+# Agregações de cada visão sobre o cubo, declaradas uma vez: cada
+# agrupamento distinto passa uma vez pelo cubo e os contidos nele saem por
+# roll-up (cury/planner.py)
+QUERIES = {
+    'empresa': [
+        ('Order_Date', 'orders'),
+        (['City', 'Road_traffic_density'], 'orders'),
+        ('Road_traffic_density', 'orders'),
+    ],
+    'entregadores': [
+        ('Road_traffic_density', 'rating'),
+        ('Weatherconditions', 'rating'),
+    ],
+    'restaurante': [
+        (['City', 'Road_traffic_density'], 'time'),
+        (['City', 'Type_of_order'], 'time'),
+        ('City', 'time'),
+        ('City', 'distance'),
+        ('Festival', 'time'),
+        ([], 'distance'),
+    ],
+}
+
+# Tabelas de cada visão (as chaves de 'tables' em VIEWS), conhecidas sem
+# calcular nada: a API valida a rota antes do cache e do ETag
+TABLES = {
+    'empresa': ['orders_by_day', 'orders_by_week', 'orders_by_month', 'orders_by_traffic', 'orders_by_city_traffic'],
+    'entregadores': ['ratings_by_deliver', 'rating_by_traffic', 'rating_by_weather', 'top_fastest', 'top_slowest'],
+    'restaurante': ['time_by_city', 'time_by_city_traffic', 'time_by_city_order_type', 'time_by_festival',
+                    'distance_by_city'],
+}
+
+# Colunas do mapa dos centros das cidades
+MAP_COLUMNS = ['City', 'Road_traffic_density', 'Delivery_location_latitude', 'Delivery_location_longitude']
+
+
+def view_inputs(name, path, date_limit, traffic_options):
+    """
+        Esta função monta as entradas de uma visão para os filtros da barra
+        lateral.
+        Parâmetros:
+            Input:
+                - name: 'empresa', 'entregadores' ou 'restaurante'
+                - path: caminho do CSV
+                - date_limit: data limite (exclusiva)
+                - traffic_options: condições de trânsito selecionadas
+            Output:
+                - dicionário com 'view' (seleção de linhas, cury/filters.py),
+                  'plan' (agregações de QUERIES sobre o cubo filtrado) e, no
+                  restaurante, 'sketches' (entregadores únicos)
+    """
+    with stage('load_dataset') as record:
+        df1 = load_dataset(path, columns=COLUMNS[name])
+        record['rows_out'] = len(df1)
+    # Filtro de data (busca binária) e de trânsito (posições por categoria):
+    # só a seleção de linhas, o df1 compartilhado não é copiado
+    inputs = {'view': filter_view(df1, load_filter_index(path), date_limit, traffic_options)}
+    cube = filter_cube(load_cube(path), date_limit, traffic_options)
+    inputs['plan'] = plan_queries(cube, QUERIES[name])
+    if name == 'restaurante':
+        inputs['sketches'] = filter_sketches(load_sketches(path), date_limit, traffic_options)
+    return inputs
+
+
+def plot_frame(df_aux):
+    """
+        Esta função prepara uma tabela para o plotly: as colunas categóricas
+        (cury/loader.py) voltam a ser texto. O plotly agrupa categóricas por
+        todas as categorias, inclusive as que a seleção não tem, e com uma
+        seleção vazia os gráficos quebravam em vez de sair vazios.
+        Input: DataFrame
+        Output: DataFrame sem colunas categóricas
+    """
+    categorical = {col: df_aux[col].astype(object) for col in df_aux.columns if df_aux[col].dtype.name == 'category'}
+    return df_aux.assign(**categorical)
+
+
+# ---------------------------------
+# Visão empresa
+# ---------------------------------
+
+def country_maps(df1):
+    # folium (e tudo o que ele importa) só carrega quando o mapa é aberto
+    import folium
+
+    df_aux = df1.loc[:, MAP_COLUMNS].groupby(['City', 'Road_traffic_density'], observed=True).median().sort_index().reset_index()
+
+    df_aux = df_aux.loc[df_aux['City'] != 'NaN', :]
+    df_aux = df_aux.loc[df_aux['Road_traffic_density'] != 'NaN', :]
+
+    map = folium.Map()
+
+    for index, location_info in df_aux.iterrows():
+      folium.Marker([location_info['Delivery_location_latitude'],
+                     location_info['Delivery_location_longitude']],
+                    popup=location_info[['City', 'Road_traffic_density']]).add_to(map)
+
+    # HTML pronto (o mesmo que o folium_static enviaria), para ficar em cache
+    with stage('folium', rows_in=len(df1)) as record:
+        html = folium.Figure(width=1024, height=600).add_child(map).render()
+        record['rows_out'] = len(df_aux)
+    return html
+
+def order_share_by_period(periods):
+    import plotly.express as px
+
+    # Quantidade de pedidos por período / Número único de entregadores por período
+    # (rollup já filtrada, com os entregadores estimados pelos sketches HyperLogLog)
+    # Criando uma nova coluna (assign devolve uma cópia: a rollup não é alterada)
+    df_aux = periods.loc[:, ['period', 'ID', 'Delivery_person_ID']]
+    df_aux = df_aux.assign(order_by_deliver=df_aux['ID'] / df_aux['Delivery_person_ID'])
+    # Gerando o gráfico de linhas
+    fig = px.line(df_aux, x='period', y='order_by_deliver')
+
+    return fig
+
+def order_by_period(periods):
+    import plotly.express as px
+
+    # períodos já ordenados pela chave inteira (dia, semana ISO ou mês)
+    fig = px.line(periods, x='period', y='ID')
+    return fig
+
+def orders_by_city_traffic(plan):
+    df_aux = count_of(plan, ['City', 'Road_traffic_density'], 'ID')
+    df_aux = df_aux.loc[df_aux['City'] != 'NaN', :]
+    df_aux = df_aux.loc[df_aux['Road_traffic_density'] != 'NaN', :]
+    return df_aux
+
+def traffic_order_city(plan):
+    import plotly.express as px
+
+    df_aux = plot_frame(orders_by_city_traffic(plan))
+    fig = px.scatter(df_aux, x='City', y='Road_traffic_density', size='ID', color='City')
+    return fig
+
+def orders_by_traffic(plan):
+    df_aux = count_of(plan, 'Road_traffic_density', 'ID')
+    df_aux = df_aux.loc[df_aux['Road_traffic_density'] != 'NaN', :]
+    df_aux = df_aux.assign(entregas_perc=df_aux['ID'] / df_aux['ID'].sum())
+    return df_aux
+
+def traffic_order_share(plan):
+    import plotly.express as px
+
+    df_aux = plot_frame(orders_by_traffic(plan))
+    fig = px.pie(df_aux, values='entregas_perc', names='Road_traffic_density')
+    return fig
+
+def order_metric(plan):
+    import plotly.express as px
+
+    # pedidos por dia, somados a partir das células do cubo (via plano)
+    df_aux = count_of(plan, 'Order_Date', 'ID')
+    # desenhar o gráfico de linhas
+    fig = px.bar(df_aux, x='Order_Date', y='ID')
+    return fig
+
+
+# ---------------------------------
+# Visão entregadores
+# ---------------------------------
+
+def top_delivers(df1):
+    # Mais rápidos e mais lentos por cidade numa só passada (cury/topk.py)
+    df_rapidos, df_lentos = top_k(df1, 'City', 'Delivery_person_ID', 'Time_taken(min)', agg='max', k=10)
+    return df_rapidos, df_lentos
+
+def courier_kpis(view):
+    """
+        Esta função calcula as métricas gerais dos entregadores.
+        Input: view (saída de filter_view)
+        Output: dicionário com 'maior_idade', 'menor_idade', 'melhor_condicao' e 'pior_condicao'
+    """
+    df_aux = view_frame(view, ['Delivery_person_Age', 'Vehicle_condition'])
+    return {
+        'maior_idade': df_aux.loc[:, 'Delivery_person_Age'].max(),
+        'menor_idade': df_aux.loc[:, 'Delivery_person_Age'].min(),
+        'melhor_condicao': df_aux.loc[:, 'Vehicle_condition'].max(),
+        'pior_condicao': df_aux.loc[:, 'Vehicle_condition'].min(),
+    }
+
+def ratings_by_deliver(view):
+    cols = ['Delivery_person_Ratings', 'Delivery_person_ID']
+    with stage('agregacao/avaliacoes', rows_in=view['size']) as record:
+        df_aux = view_frame(view, cols).groupby('Delivery_person_ID', observed=True).mean().sort_index().reset_index()
+        record['rows_out'] = len(df_aux)
+    return df_aux
+
+def rating_by(plan, by):
+    # Média e desvio padrão das avaliações, com os nomes de coluna da página
+    df_aux = mean_std_of(plan, by, 'rating')
+    df_aux.columns = [by, 'delivery_mean', 'delivery_std']
+    return df_aux
+
+
+# ---------------------------------
+# Visão restaurantes
+# ---------------------------------
+
+def time_by(plan, by):
+    df_aux = mean_std_of(plan, by, 'time')
+    df_aux = df_aux.rename(columns={'mean': 'avg_time', 'std': 'std_time'})
+    return df_aux
+
+def avg_std_time_on_traffic(plan):
+    import plotly.express as px
+
+    df_aux = plot_frame(time_by(plan, ['City', 'Road_traffic_density']))
+    # Sem linhas não há média para o meio da escala
+    midpoint = np.average(df_aux['std_time']) if len(df_aux) else None
+    fig = px.sunburst(df_aux, path=['City', 'Road_traffic_density'], values='avg_time', color='std_time', color_continuous_scale='RdBu', color_continuous_midpoint=midpoint)
+    return fig
+
+def avg_std_time_graph(plan):
+    import plotly.graph_objects as go
+
+    df_aux = plot_frame(time_by(plan, 'City'))
+    fig = go.Figure()
+    fig.add_trace(go.Bar(name='Control', x=df_aux['City'], y=df_aux['avg_time'], error_y=dict(type='data', array=df_aux['std_time'])))
+    fig.update_layout(barmode='group')
+    return fig
+
+def avg_std_time_delivery(plan, festival, op):
+    """
+        Esta função calcula o tempo médio e o desvio padrão do tempo de entrega.
+        Parâmetros:
+            Input:
+                - plan: plano das agregações da página (cury/planner.py)
+                - op: tipo de operação que precisa ser calculado
+                    'avg_time': Calcula o tempo médio
+                    'std_time': Calcula o desvio padrão do tempo.
+            Output:
+                - número arredondado (NaN se a seleção não tem pedidos
+                  desse festival)
+    """
+    df_aux = time_by(plan, 'Festival')
+    df_aux = df_aux.loc[df_aux['Festival'] == festival, op]
+    if not len(df_aux):
+        return np.nan
+    return np.round(df_aux.iloc[0], 2)
+
+def distance(plan, fig):
+    import plotly.graph_objects as go
+
+    # distance_km é somada no cubo; a média sai de soma / contagem (via plano)
+    if fig == False:
+        avg_distance = np.round(mean_std_total(plan, 'distance')[0], 2)
+        return avg_distance
+    else:
+        avg_distance = plot_frame(mean_std_of(plan, 'City', 'distance'))
+        fig = go.Figure(data=[go.Pie(labels=avg_distance['City'], values=avg_distance['mean'], pull=[0, 0.1, 0])])
+
+        return fig
+
+def restaurant_kpis(plan, sketches):
+    """
+        Esta função calcula as métricas gerais dos restaurantes, na ordem das
+        colunas da página.
+        Input: plano da visão, sketches filtrados (cury/hll.py)
+        Output: dicionário com 'entregadores_unicos', 'distancia_media' e
+                'festival_<yes|no>_<avg_time|std_time>'
+    """
+    # Estimativa HyperLogLog (união dos sketches das células filtradas)
+    kpis = {'entregadores_unicos': count_distinct(sketches), 'distancia_media': distance(plan, fig=False)}
+    for festival in ['Yes', 'No']:
+        for op in ['avg_time', 'std_time']:
+            kpis['festival_{}_{}'.format(festival.lower(), op)] = avg_std_time_delivery(plan, festival, op)
+    return kpis
+
+
+# ---------------------------------
+# Visões completas (export em lote e API)
+# ---------------------------------
+
+def json_kpis(kpis):
+    """
+        Esta função prepara os KPIs para o JSON: escalares do numpy viram
+        tipos do Python e NaN (KPI sem pedidos na seleção) vira None (null),
+        já que NaN não é JSON válido.
+        Input: dicionário KPI -> valor
+        Output: dicionário KPI -> valor serializável
+    """
+    values = {}
+    for key, value in kpis.items():
+        value = value.item() if hasattr(value, 'item') else value
+        values[key] = None if isinstance(value, float) and math.isnan(value) else value
+    return values
+
+
+def empresa(path, date_limit, traffic_options):
+    """
+        Esta função calcula a visão empresa.
+        Input: caminho do CSV, data limite, condições de trânsito
+        Output: dicionário com 'kpis', 'tables' e 'figures' (id do gráfico ->
+                função sem argumentos que monta a figura ou o HTML do mapa)
+    """
+    inputs = view_inputs('empresa', path, date_limit, traffic_options)
+    plan = inputs['plan']
+    rollups = load_rollups(path)
+    periods = {resolution: period_counts(rollups, resolution, date_limit, traffic_options) for resolution in RESOLUTIONS}
+    orders_by_day = count_of(plan, 'Order_Date', 'ID')
+    figures = {
+        'empresa/order_metric': lambda: order_metric(plan),
+        'empresa/traffic_order_share': lambda: traffic_order_share(plan),
+        'empresa/traffic_order_city': lambda: traffic_order_city(plan),
+        'empresa/country_maps': lambda: country_maps(view_frame(inputs['view'], MAP_COLUMNS)),
+    }
+    # Os gráficos da visão tática nas três granularidades do seletor
+    for resolution in RESOLUTIONS:
+        figures['empresa/order_by_period/' + resolution] = lambda df_aux=periods[resolution]: order_by_period(df_aux)
+        figures['empresa/order_share_by_period/' + resolution] = lambda df_aux=periods[resolution]: order_share_by_period(df_aux)
+    return {
+        'kpis': {'orders': int(orders_by_day['ID'].sum())},
+        'tables': {
+            'orders_by_day': orders_by_day,
+            'orders_by_week': periods['week'],
+            'orders_by_month': periods['month'],
+            'orders_by_traffic': orders_by_traffic(plan),
+            'orders_by_city_traffic': orders_by_city_traffic(plan),
+        },
+        'figures': figures,
+    }
+
+
+def entregadores(path, date_limit, traffic_options):
+    """
+        Esta função calcula a visão entregadores.
+        Input: caminho do CSV, data limite, condições de trânsito
+        Output: dicionário com 'kpis', 'tables' e 'figures'
+    """
+    inputs = view_inputs('entregadores', path, date_limit, traffic_options)
+    view, plan = inputs['view'], inputs['plan']
+    df_rapidos, df_lentos = top_delivers(view_frame(view, ['City', 'Delivery_person_ID', 'Time_taken(min)']))
+    return {
+        'kpis': courier_kpis(view),
+        'tables': {
+            'ratings_by_deliver': ratings_by_deliver(view),
+            'rating_by_traffic': rating_by(plan, 'Road_traffic_density'),
+            'rating_by_weather': rating_by(plan, 'Weatherconditions'),
+            'top_fastest': df_rapidos,
+            'top_slowest': df_lentos,
+        },
+        'figures': {},
+    }
+
+
+def restaurante(path, date_limit, traffic_options):
+    """
+        Esta função calcula a visão restaurantes.
+        Input: caminho do CSV, data limite, condições de trânsito
+        Output: dicionário com 'kpis', 'tables' e 'figures'
+    """
+    inputs = view_inputs('restaurante', path, date_limit, traffic_options)
+    plan = inputs['plan']
+    return {
+        'kpis': restaurant_kpis(plan, inputs['sketches']),
+        'tables': {
+            'time_by_city': time_by(plan, 'City'),
+            'time_by_city_traffic': time_by(plan, ['City', 'Road_traffic_density']),
+            'time_by_city_order_type': time_by(plan, ['City', 'Type_of_order']),
+            'time_by_festival': time_by(plan, 'Festival'),
+            'distance_by_city': mean_std_of(plan, 'City', 'distance'),
+        },
+        'figures': {
+            'restaurante/avg_std_time_graph': lambda: avg_std_time_graph(plan),
+            'restaurante/distance': lambda: distance(plan, fig=True),
+            'restaurante/avg_std_time_on_traffic': lambda: avg_std_time_on_traffic(plan),
+        },
+    }
+
+
+VIEWS = {'empresa': empresa, 'entregadores': entregadores, 'restaurante': restaurante}
@@ -0,0 +1,56 @@
+# Dados de teste: um train.csv sintético pequeno (benchmarks/synthetic.py),
+# gravado uma vez por sessão num diretório temporário
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_csv
+from cury.loader import build_dataset, clear_cache
+
+N_ROWS = 3000
+
+# Filtros da barra lateral usados nas equivalências: data limite no meio de
+# uma semana e de um mês, depois de todos os pedidos, e trânsito completo,
+# parcial e vazio
+DATE_LIMITS = ['2022-03-10', '2022-04-13']
+TRAFFIC_SETS = [['Low', 'Medium', 'High', 'Jam'], ['Low', 'Jam'], ['High'], []]
+FILTERS = [(date_limit, traffic) for date_limit in DATE_LIMITS for traffic in TRAFFIC_SETS]
+
+
+@pytest.fixture(scope='session')
+def csv_path(tmp_path_factory):
+    return str(write_csv(N_ROWS, str(tmp_path_factory.mktemp('dataset') / 'train.csv')))
+
+
+@pytest.fixture(scope='session')
+def dataset(csv_path):
+    # Dataset limpo lido direto do CSV (sem cache nem snapshot); não alterar
+    return build_dataset(csv_path)
+
+
+def filter_mask(df1, date_limit, traffic_options):
+    """ Esta função devolve o filtro da barra lateral como máscara booleana (a referência). """
+    return ((df1['Order_Date'] < date_limit) & df1['Road_traffic_density'].isin(traffic_options)).to_numpy()
+
+
+def groupby_mean_std(df_aux, by, col):
+    """ Esta função é a referência: média e desvio padrão por groupby nas linhas dos pedidos. """
+    df_aux = df_aux.groupby(by, observed=True)[col].agg(['mean', 'std']).sort_index()
+    return df_aux.reset_index()
+
+
+def groupby_count(df_aux, by):
+    """ Esta função é a referência: pedidos por groupby nas linhas. """
+    return df_aux.groupby(by, observed=True).size().rename('orders').sort_index().reset_index()
+
+
+def assert_same(result, expected):
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    # Cada teste começa sem as gerações carregadas pelos anteriores
+    clear_cache()
+    yield
+    clear_cache()
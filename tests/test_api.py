@@ -0,0 +1,82 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+
+from cury import api, views
+
+
+@pytest.fixture
+def server(csv_path):
+    api.clear_responses()
+    server = api.serve(port=0, path=csv_path, refresh=False)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://{}:{}'.format(*server.server_address[:2])
+    server.shutdown()
+    server.server_close()
+
+
+def _get(url, headers=None):
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers.get('ETag'), response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers.get('ETag'), error.read()
+
+
+def test_tables_match_views(csv_path):
+    for name, builder in views.VIEWS.items():
+        assert list(builder(csv_path, views.DATE_LIMIT, views.TRAFFIC_OPTIONS)['tables']) == views.TABLES[name]
+
+
+@pytest.mark.parametrize('route', ['/api/empresa/unknown', '/api/empresa/orders_by_day/extra',
+                                   '/api/unknown', '/api/version/extra', '/other'])
+def test_unknown_route_is_404_even_with_if_none_match(server, route):
+    status, tag, body = _get(server + route, {'If-None-Match': '*'})
+    assert status == 404
+    assert tag is None
+    assert 'error' in json.loads(body)
+    assert api.cache_info()['misses'] == 0
+
+
+def test_etag_and_not_modified(server):
+    url = server + '/api/restaurante/time_by_festival?traffic=Low,Jam'
+    status, tag, body = _get(url)
+    assert status == 200 and tag
+    assert json.loads(body)['traffic_options'] == ['Jam', 'Low']
+    status, same_tag, body = _get(url, {'If-None-Match': tag})
+    assert (status, same_tag, body) == (304, tag, b'')
+    # Outros filtros: outra resposta, outro ETag
+    status, other_tag, _ = _get(server + '/api/restaurante/time_by_festival?traffic=Low', {'If-None-Match': tag})
+    assert status == 200 and other_tag != tag
+    assert _get(server + '/api/empresa?date=06-04-2022')[0] == 400
+
+
+def _strict_json(body):
+    # NaN/Infinity não são JSON válido
+    def reject(token):
+        raise ValueError('token inválido: ' + token)
+
+    return json.loads(body, parse_constant=reject)
+
+
+@pytest.mark.parametrize('query', ['date=2022-01-01', 'date=2022-02-12&traffic=Jam', 'traffic=Jam'])
+@pytest.mark.parametrize('view', list(views.VIEWS))
+def test_views_are_valid_json_for_any_selection(server, view, query):
+    # Regressão: festival sem pedidos na seleção dava 500 (.item() de uma
+    # Series vazia) ou um NaN solto no corpo
+    status, _, body = _get(server + '/api/' + view + '?' + query)
+    assert status == 200
+    payload = _strict_json(body)
+    if query == 'date=2022-01-01':
+        assert all(value in (None, 0) for value in payload['kpis'].values())
+        assert not any(payload['tables'].values())
+
+
+def test_json_kpis_maps_nan_to_null():
+    assert views.json_kpis({'a': np.float64('nan'), 'b': np.int64(3), 'c': 2.5}) == {'a': None, 'b': 3, 'c': 2.5}
@@ -0,0 +1,60 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate
+from conftest import FILTERS, assert_same, filter_mask, groupby_count, groupby_mean_std
+from cury import ingest
+from cury.cube import DIMENSIONS, MEASURES, build_cube, count_by, filter_cube, load_cube, mean_std, mean_std_by
+from cury.loader import build_dataset
+
+# Agrupamentos usados pelas páginas
+GROUPS = [['City'], ['City', 'Road_traffic_density'], ['Road_traffic_density'],
+          ['City', 'Type_of_order'], ['Festival'], ['Weatherconditions']]
+
+
+@pytest.fixture(scope='module')
+def cube(dataset):
+    return build_cube(dataset)
+
+
+@pytest.fixture
+def csv_copy(csv_path, tmp_path):
+    path = str(tmp_path / 'train.csv')
+    shutil.copy(csv_path, path)
+    return path
+
+
+@pytest.mark.parametrize('date_limit, traffic', FILTERS)
+def test_cube_matches_groupby(dataset, cube, date_limit, traffic):
+    df_aux = dataset.loc[filter_mask(dataset, date_limit, traffic)]
+    filtered = filter_cube(cube, date_limit, traffic)
+    assert filtered['orders'].sum() == len(df_aux)
+    for by in GROUPS:
+        assert_same(count_by(filtered, by), groupby_count(df_aux, by))
+        for name, col in MEASURES.items():
+            assert_same(mean_std_by(filtered, by, name), groupby_mean_std(df_aux, by, col))
+    for name, col in MEASURES.items():
+        if len(df_aux):
+            assert mean_std(filtered, name) == pytest.approx((df_aux[col].mean(), df_aux[col].std()))
+        else:
+            assert np.isnan(mean_std(filtered, name)).all()
+
+
+@pytest.mark.parametrize('with_snapshot', [False, True])
+def test_load_cube_matches_build_cube(csv_copy, with_snapshot):
+    if with_snapshot:
+        ingest.ingest(csv_copy)
+    cube = load_cube(csv_copy).sort_values(DIMENSIONS, ignore_index=True)
+    expected = build_cube(build_dataset(csv_copy)).sort_values(DIMENSIONS, ignore_index=True)
+    assert cube.equals(expected)
+    assert load_cube(csv_copy) is load_cube(csv_copy)
+
+
+def test_load_cube_follows_new_version(csv_copy):
+    before = load_cube(csv_copy)
+    generate(200, offset=10 ** 6).to_csv(csv_copy, mode='a', header=False, index=False)
+    after = load_cube(csv_copy)
+    assert after is not before
+    assert after['orders'].sum() == len(build_dataset(csv_copy))
@@ -0,0 +1,59 @@
+import json
+import os
+
+import pytest
+
+from cury import export, views
+from cury.figures import clear_figures, figure_cache_info
+
+
+def test_export_matches_views(csv_path, tmp_path):
+    manifest = export.export_all(csv_path, output=str(tmp_path), formats=['json'], workers=1)
+    inputs = views.view_inputs('entregadores', csv_path, views.DATE_LIMIT, views.TRAFFIC_OPTIONS)
+    assert manifest['views']['entregadores']['kpis'] == views.json_kpis(views.courier_kpis(inputs['view']))
+    inputs = views.view_inputs('restaurante', csv_path, views.DATE_LIMIT, views.TRAFFIC_OPTIONS)
+    kpis = views.restaurant_kpis(inputs['plan'], inputs['sketches'])
+    assert manifest['views']['restaurante']['kpis'] == views.json_kpis(kpis)
+    with open(tmp_path / 'restaurante' / 'time_by_festival.json', encoding='utf-8') as f:
+        rows = json.load(f)
+    expected = views.time_by(inputs['plan'], 'Festival')
+    assert [row['Festival'] for row in rows] == list(expected['Festival'].astype(str))
+    assert [row['avg_time'] for row in rows] == pytest.approx(list(expected['avg_time']))
+
+
+def test_preload_once_per_process_and_version(csv_path, tmp_path, monkeypatch):
+    manifest = export.export_all(csv_path, output=str(tmp_path), formats=['json'], workers=1)
+    n_figures = sum(len(view['figures']) for view in manifest['views'].values())
+    clear_figures()
+    monkeypatch.setattr(export, '_started', set())
+    monkeypatch.setattr(export, '_preloaded', set())
+    monkeypatch.setenv(export.EXPORT_ENV, str(tmp_path))
+    assert export.preload_export(path=csv_path) == n_figures
+    assert figure_cache_info()['size'] == n_figures
+    # As reexecuções seguintes não tocam no disco
+    os.remove(tmp_path / export.MANIFEST)
+    assert export.preload_export(path=csv_path) == 0
+    clear_figures()
+
+
+def test_load_export_skips_other_version(csv_path, tmp_path, monkeypatch):
+    export.export_all(csv_path, output=str(tmp_path), formats=['json'], workers=1)
+    monkeypatch.setattr(export, '_preloaded', set())
+    with open(tmp_path / export.MANIFEST, encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest['dataset_version'] = [[csv_path, 0, 0], None]
+    with open(tmp_path / export.MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    assert export.load_export(str(tmp_path), csv_path) == 0
+
+
+@pytest.mark.parametrize('date_limit, traffic', [('2022-01-01', views.TRAFFIC_OPTIONS), (views.DATE_LIMIT, [])])
+def test_export_empty_selection(csv_path, tmp_path, date_limit, traffic):
+    # Regressão: sem linhas, traffic_order_city quebrava e os KPIs saíam como NaN
+    manifest = export.export_all(csv_path, date_limit, traffic, output=str(tmp_path), formats=['json'], workers=1)
+    for name, view in manifest['views'].items():
+        assert all(os.path.exists(tmp_path / file) for file in view['files'])
+        with open(tmp_path / name / 'kpis.json', encoding='utf-8') as f:
+            kpis = json.load(f, parse_constant=lambda token: pytest.fail('JSON inválido: ' + token))
+        assert kpis == view['kpis']
+        assert all(value in (None, 0) for value in kpis.values())
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from conftest import FILTERS, filter_mask
+from cury.filters import build_filter_index, filter_dataset, filter_view, view_frame
+
+
+@pytest.mark.parametrize('date_limit, traffic', FILTERS)
+def test_filter_view_matches_mask(dataset, date_limit, traffic):
+    index = build_filter_index(dataset)
+    expected = np.flatnonzero(filter_mask(dataset, date_limit, traffic))
+    view = filter_view(dataset, index, date_limit, traffic)
+    assert view['size'] == len(expected)
+    assert np.array_equal(np.arange(len(dataset))[view['rows']], expected)
+    assert filter_dataset(dataset, index, date_limit, traffic).equals(dataset.iloc[expected])
+    columns = ['City', 'Time_taken(min)']
+    assert view_frame(view, columns).equals(dataset.iloc[expected][columns])
+
+
+def test_filter_index_requires_date_order(dataset):
+    with pytest.raises(ValueError):
+        build_filter_index(dataset.iloc[::-1])
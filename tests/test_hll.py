@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from conftest import FILTERS, filter_mask
+from cury import parallel
+from cury.hll import build_sketches, count_distinct, filter_sketches, merge_sketches, relative_error
+
+
+def _assert_close(estimate, exact, precision):
+    # Três erros padrão, e ao menos um entregador
+    assert abs(estimate - exact) <= max(1, 3 * relative_error(precision) * exact)
+
+
+@pytest.mark.parametrize('precision', [12, 14])
+@pytest.mark.parametrize('date_limit, traffic', FILTERS)
+def test_count_distinct_close_to_nunique(dataset, precision, date_limit, traffic):
+    sketches = filter_sketches(build_sketches(dataset, precision), date_limit, traffic)
+    exact = dataset.loc[filter_mask(dataset, date_limit, traffic), 'Delivery_person_ID'].nunique()
+    _assert_close(count_distinct(sketches), exact, precision)
+
+
+def test_merged_sketches_match_full_build(dataset):
+    full = build_sketches(dataset)
+    merged = merge_sketches([build_sketches(part) for part in parallel.partitions(dataset, 3)])
+    assert merged['cells'].equals(full['cells'])
+    assert np.array_equal(merged['registers'], full['registers'])
+
+
+def test_sketches_reject_mixed_precision(dataset):
+    with pytest.raises(ValueError):
+        merge_sketches([build_sketches(dataset, 12), build_sketches(dataset, 14)])
+    with pytest.raises(ValueError):
+        build_sketches(dataset, 20)
@@ -0,0 +1,126 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate
+from cury import ingest, snapshot, stream
+from cury.cube import DIMENSIONS, build_cube
+from cury.loader import build_dataset
+
+
+@pytest.fixture
+def csv_copy(csv_path, tmp_path):
+    path = str(tmp_path / 'train.csv')
+    shutil.copy(csv_path, path)
+    return path
+
+
+def _append_rows(path, n_rows, offset):
+    # Datas sorteadas no mesmo intervalo: quase todas anteriores às já gravadas
+    generate(n_rows, offset=offset).to_csv(path, mode='a', header=False, index=False)
+
+
+def _sorted_cube(cube):
+    return cube.sort_values(DIMENSIONS, ignore_index=True)
+
+
+def test_append_equals_full_build(csv_copy):
+    assert ingest.ingest(csv_copy)['mode'] == 'rebuild'
+    for number in range(3):
+        _append_rows(csv_copy, 300, offset=10 ** 6 * (number + 1))
+        report = ingest.ingest(csv_copy)
+        assert report['mode'] == 'append' and report['rows_added'] > 0 and not report['rejected_ids']
+    manifest = snapshot.read_manifest(csv_copy)
+    # Os pedidos atrasados viraram blocos próprios; a base não foi regravada
+    assert len(manifest['parts']) == 4
+    assert not snapshot.in_date_order(manifest['dates'])
+    expected = build_dataset(csv_copy)
+    pd.testing.assert_frame_equal(snapshot.read_snapshot(csv_copy), expected)
+    # Qualquer projeção sai na mesma ordem de linhas
+    pd.testing.assert_frame_equal(snapshot.read_snapshot(csv_copy, ['ID', 'City']), expected[['ID', 'City']])
+    stored = snapshot.read_tables([snapshot.resolve(csv_copy, manifest['cube'])])
+    pd.testing.assert_frame_equal(_sorted_cube(stored), _sorted_cube(build_cube(expected)), check_dtype=False,
+                                  check_categorical=False)
+
+
+def test_append_rejects_repeated_ids(csv_copy):
+    ingest.ingest(csv_copy)
+    rows = snapshot.read_manifest(csv_copy)['rows']
+    # As primeiras linhas do CSV de novo: todos os IDs já existem
+    with open(csv_copy, encoding='utf-8') as f:
+        lines = f.readlines()[1:51]
+    with open(csv_copy, 'a', encoding='utf-8') as f:
+        f.writelines(lines)
+    report = ingest.ingest(csv_copy)
+    assert report['rows_added'] == 0 and report['rejected_ids']
+    assert snapshot.read_manifest(csv_copy)['rows'] == rows
+    assert ingest.ingest(csv_copy)['mode'] == 'fresh'
+
+
+def test_in_date_order():
+    assert snapshot.in_date_order([['2022-02-11', '2022-03-01'], [None, None], ['2022-03-01', '2022-04-06']])
+    assert not snapshot.in_date_order([['2022-02-11', '2022-03-01'], ['2022-02-20', '2022-02-21']])
+
+
+@pytest.mark.parametrize('column', ['Festival', 'City', 'Road_traffic_density', 'Type_of_order'])
+def test_append_single_row_with_missing_text(csv_copy, column):
+    # Regressão: num bloco de uma linha, a coluna só com 'NaN ' era lida como float
+    ingest.ingest(csv_copy)
+    with open(csv_copy, encoding='utf-8') as f:
+        header, line = f.readline().rstrip('\n').split(','), f.readline().rstrip('\n').split(',')
+    line[0] = '0xffff '
+    line[header.index(column)] = 'NaN '
+    with open(csv_copy, 'a', encoding='utf-8') as f:
+        f.write(','.join(line) + '\n')
+    report = ingest.ingest(csv_copy)
+    assert report['mode'] == 'append' and not report['rejected_ids']
+    assert ingest.ingest(csv_copy)['mode'] == 'fresh'
+    pd.testing.assert_frame_equal(snapshot.read_snapshot(csv_copy), build_dataset(csv_copy))
+
+
+def _with_time(line, minutes):
+    # Mesmo ID com outro conteúdo: só a primeira ocorrência pode ficar
+    return line.rsplit(',', 1)[0] + ',(min) {}\n'.format(minutes)
+
+
+def test_repeated_ids_same_rows_on_every_path(csv_copy, tmp_path):
+    ingest.ingest(csv_copy)
+    with open(csv_copy, encoding='utf-8') as f:
+        lines = f.readlines()
+    # Bloco com IDs já gravados e um ID novo repetido dentro do próprio bloco
+    new = _with_time(lines[1], 11).replace(lines[1].split(',', 1)[0], '0xfffe ', 1)
+    delta = [_with_time(lines[2], 12), new, _with_time(new, 13), _with_time(lines[3], 14)]
+    with open(csv_copy, 'a', encoding='utf-8') as f:
+        f.writelines(delta)
+    report = ingest.ingest(csv_copy)
+    assert report['mode'] == 'append' and report['rows_added'] == 1
+    assert sorted(report['rejected_ids']) == sorted([lines[2].split(',')[0].strip(), '0xfffe', lines[3].split(',')[0].strip()])
+
+    expected = build_dataset(csv_copy)
+    assert expected['ID'].is_unique
+    assert expected.loc[expected['ID'] == '0xfffe', 'Time_taken(min)'].tolist() == [11]
+    pd.testing.assert_frame_equal(snapshot.read_snapshot(csv_copy), expected)
+    # Reconstruir do zero grava as mesmas linhas e conta os mesmos descartes
+    (tmp_path / 'fresh').mkdir()
+    fresh = str(tmp_path / 'fresh' / 'train.csv')
+    shutil.copy(csv_copy, fresh)
+    rebuilt = ingest.rebuild(fresh)
+    assert sorted(rebuilt['rejected_ids']) == sorted(report['rejected_ids'])
+    pd.testing.assert_frame_equal(snapshot.read_snapshot(fresh), expected)
+    assert snapshot.read_manifest(fresh)['rejected'] == snapshot.read_manifest(csv_copy)['rejected']
+    assert stream.stream_aggregates(csv_copy, chunksize=500)['rows'] == len(expected)
+
+
+def test_existing_ids_survive_hash_collisions(csv_copy, monkeypatch):
+    ingest.ingest(csv_copy)
+    stored = build_dataset(csv_copy)['ID']
+    manifest = snapshot.read_manifest(csv_copy)
+    assert ingest._existing_ids(csv_copy, manifest, [stored[0], stored[5], 'novo']) == {stored[0], stored[5]}
+    # Todos os hashes iguais, no índice e na busca: só a comparação com o ID
+    # gravado decide
+    monkeypatch.setattr(ingest.pd.util, 'hash_array', lambda values: np.zeros(len(values), dtype=np.uint64))
+    ingest.rebuild(csv_copy)
+    manifest = snapshot.read_manifest(csv_copy)
+    assert ingest._existing_ids(csv_copy, manifest, [stored[7], 'novo', 'outro']) == {stored[7]}
@@ -0,0 +1,68 @@
+import os
+import runpy
+import shutil
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate
+from cury import loader, refresh, timing, views
+from cury.loader import build_dataset, cache_info, dataset_version, load_dataset
+
+
+@pytest.fixture
+def csv_copy(csv_path, tmp_path):
+    path = str(tmp_path / 'train.csv')
+    shutil.copy(csv_path, path)
+    return path
+
+
+def _grow(path, n_rows, offset):
+    # O CSV cresce: muda o tamanho na assinatura da versão
+    generate(n_rows, offset=offset).to_csv(path, mode='a', header=False, index=False)
+
+
+def test_cache_hit_returns_same_frame(csv_path, dataset):
+    df1 = load_dataset(csv_path)
+    assert df1.equals(dataset)
+    assert load_dataset(csv_path) is df1
+    assert cache_info()['hits'] == 1
+    columns = ['Order_Date', 'City']
+    assert load_dataset(csv_path, columns).equals(dataset[columns])
+
+
+def test_new_version_reloads_dataset(csv_copy):
+    before = load_dataset(csv_copy)
+    version = dataset_version(csv_copy)
+    _grow(csv_copy, 200, offset=10 ** 6)
+    assert dataset_version(csv_copy) != version
+    after = load_dataset(csv_copy)
+    assert after is not before
+    assert after.equals(build_dataset(csv_copy))
+    assert load_dataset(csv_copy) is after
+
+
+def test_shared_frame_is_read_only(csv_path):
+    df1 = load_dataset(csv_path)
+    with pytest.raises(ValueError):
+        df1.loc[df1.index[0], 'Time_taken(min)'] = 0
+    with pytest.raises(ValueError):
+        df1['Delivery_person_Ratings'].to_numpy()[0] = 0
+    # Recortes de linhas continuam sendo views, sem cópia
+    assert np.shares_memory(df1.iloc[10:20]['distance_km'].to_numpy(), df1['distance_km'].to_numpy())
+
+
+@pytest.mark.parametrize('page', ['1_visao_empresa.py', '2_visao_entregadores.py', '3_visao_restaurante.py'])
+def test_page_error_closes_rerun(page, csv_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError('falha na página')
+
+    monkeypatch.setattr(loader, 'DATASET_PATH', csv_path)
+    monkeypatch.setattr(refresh, 'start_refresher', lambda path: None)
+    monkeypatch.setattr(views, 'view_inputs', fail)
+    pages = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pages')
+    with pytest.raises(RuntimeError):
+        runpy.run_path(os.path.join(pages, page))
+    # Nem a geração fixada nem a execução ficam abertas na thread
+    assert getattr(loader._rerun, 'generations', None) is None
+    assert timing.current_run() is None
@@ -0,0 +1,68 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from cury import parallel, stream
+from cury.cube import DIMENSIONS, build_cube, merge_cubes
+from cury.loader import build_dataset
+
+
+@pytest.fixture
+def small_pools(monkeypatch):
+    # Faixas de poucas linhas, para exercitar o pool com o dataset de teste
+    monkeypatch.setattr(parallel, 'MIN_ROWS_PER_WORKER', 100)
+    yield
+    parallel.shutdown()
+
+
+def _sorted(cube):
+    return cube.sort_values(DIMENSIONS, ignore_index=True)
+
+
+def test_aggregate_matches_serial(csv_path, small_pools):
+    df1 = build_dataset(csv_path)
+    expected = _sorted(build_cube(df1))
+    for workers in [2, 3]:
+        cube = parallel.aggregate(df1, build_cube, merge_cubes, workers)
+        assert _sorted(cube).equals(expected)
+
+
+def test_concurrent_worker_counts_share_no_pool(csv_path, small_pools):
+    # Regressão: pedir outro número de processos encerrava o pool em uso
+    df1 = build_dataset(csv_path)
+    expected = _sorted(build_cube(df1))
+    results, errors = [], []
+
+    def run(workers):
+        try:
+            for _ in range(3):
+                results.append(_sorted(parallel.aggregate(df1, build_cube, merge_cubes, workers)))
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=run, args=(workers,)) for workers in [2, 3]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(results) == 6
+    assert all(cube.equals(expected) for cube in results)
+
+
+def test_partitions_do_not_split_days(dataset):
+    parts = parallel.partitions(dataset, 4)
+    assert len(parts) == 4 and sum(len(part) for part in parts) == len(dataset)
+    for before, after in zip(parts[:-1], parts[1:]):
+        assert before['Order_Date'].iloc[-1] < after['Order_Date'].iloc[0]
+    merged = merge_cubes([build_cube(part) for part in parts])
+    assert _sorted(merged).equals(_sorted(build_cube(dataset)))
+
+
+def test_parallel_kpis_match_stream(csv_path, dataset, small_pools):
+    aggregates = parallel.aggregate_kpis(dataset, workers=2)
+    streamed = stream.stream_aggregates(csv_path, chunksize=700)
+    assert stream.summary(aggregates) == pytest.approx(stream.summary(streamed))
+    pd.testing.assert_frame_equal(stream.ratings_by_courier(aggregates), stream.ratings_by_courier(streamed),
+                                  check_categorical=False)
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from conftest import FILTERS, assert_same, filter_mask, groupby_count, groupby_mean_std
+from cury.cube import MEASURES, build_cube, filter_cube, mean_std
+from cury.planner import count_of, mean_std_of, mean_std_total, plan_queries
+
+# Agrupamentos das páginas: contidos uns nos outros (roll-up no plano) e soltos
+GROUPS = [['City'], ['City', 'Road_traffic_density'], ['Road_traffic_density'],
+          ['City', 'Type_of_order'], ['Festival'], ['Weatherconditions']]
+
+
+@pytest.fixture(scope='module')
+def cube(dataset):
+    return build_cube(dataset)
+
+
+@pytest.mark.parametrize('date_limit, traffic', FILTERS)
+def test_planner_matches_groupby(dataset, cube, date_limit, traffic):
+    df_aux = dataset.loc[filter_mask(dataset, date_limit, traffic)]
+    plan = plan_queries(filter_cube(cube, date_limit, traffic),
+                        [(by, measure) for by in GROUPS for measure in ['orders', 'time', 'distance']])
+    for by in GROUPS:
+        assert_same(count_of(plan, by), groupby_count(df_aux, by))
+        assert_same(mean_std_of(plan, by, 'time'), groupby_mean_std(df_aux, by, 'Time_taken(min)'))
+    # 'City' e 'Road_traffic_density' saem da tabela City x Road_traffic_density
+    assert (plan['passes'], plan['rollups']) == (4, 2)
+    for by in GROUPS:
+        # Fora do plano: calculado do cubo na leitura
+        assert_same(mean_std_of(plan, by, 'rating'), groupby_mean_std(df_aux, by, 'Delivery_person_Ratings'))
+    for name, col in MEASURES.items():
+        mean, std = mean_std_total(plan, name)
+        if len(df_aux):
+            assert mean == pytest.approx(df_aux[col].mean())
+            assert std == pytest.approx(df_aux[col].std(), nan_ok=True)
+            assert mean_std(filter_cube(cube, date_limit, traffic), name) == pytest.approx((mean, std), nan_ok=True)
+        else:
+            assert np.isnan(mean) and np.isnan(std)
+
+
+def test_unknown_measure_is_rejected(cube):
+    with pytest.raises(ValueError):
+        plan_queries(cube, [('City', 'price')])
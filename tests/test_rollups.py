@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from conftest import FILTERS, filter_mask
+from cury.cube import build_cube
+from cury.hll import build_sketches, relative_error
+from cury.rollups import RESOLUTIONS, build_rollups, period_counts, time_keys
+
+
+@pytest.fixture(scope='module')
+def rollups(dataset):
+    return build_rollups(build_cube(dataset), build_sketches(dataset))
+
+
+def test_time_keys_use_iso_weeks(dataset):
+    dates = dataset['Order_Date'].drop_duplicates()
+    keys = time_keys(dates)
+    iso = [date.isocalendar() for date in dates]
+    assert keys['week'].tolist() == [year * 100 + week for year, week, _ in iso]
+    assert keys['day'].tolist() == [int(date.strftime('%Y%m%d')) for date in dates]
+    assert keys['month'].tolist() == [int(date.strftime('%Y%m')) for date in dates]
+
+
+@pytest.mark.parametrize('resolution', RESOLUTIONS)
+@pytest.mark.parametrize('date_limit, traffic', FILTERS)
+def test_period_counts_match_groupby(dataset, rollups, resolution, date_limit, traffic):
+    df_aux = dataset.loc[filter_mask(dataset, date_limit, traffic)]
+    # Referência: chave de tempo por linha e groupby nos pedidos
+    keys = time_keys(df_aux['Order_Date'])[resolution]
+    expected = df_aux.groupby(keys.to_numpy()).agg(orders=('ID', 'size'), couriers=('Delivery_person_ID', 'nunique'))
+    result = period_counts(rollups, resolution, date_limit, traffic)
+    assert result[resolution].tolist() == expected.index.tolist()
+    assert result['ID'].tolist() == expected['orders'].tolist()
+    errors = np.abs(result['Delivery_person_ID'].to_numpy() - expected['couriers'].to_numpy())
+    assert np.all(errors <= np.maximum(1, 3 * relative_error() * expected['couriers'].to_numpy()))
+
+
+def test_period_counts_reject_unknown_resolution(rollups):
+    with pytest.raises(ValueError):
+        period_counts(rollups, 'year', '2022-04-13', ['Low'])
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from conftest import FILTERS, filter_mask
+from cury import stream
+from cury.topk import top_k
+
+
+@pytest.fixture(scope='module')
+def streamed(csv_path):
+    # Blocos pequenos: vários parciais com categorias diferentes a juntar
+    return stream.stream_aggregates(csv_path, chunksize=700)
+
+
+def _courier_ratings(df_aux):
+    ratings = df_aux.groupby('Delivery_person_ID', observed=True)['Delivery_person_Ratings'].mean().sort_index()
+    return ratings.reset_index()
+
+
+@pytest.mark.parametrize('date_limit, traffic', FILTERS)
+def test_stream_matches_full_dataset(dataset, streamed, date_limit, traffic):
+    df_aux = dataset.loc[filter_mask(dataset, date_limit, traffic)]
+    filtered = stream.filter_aggregates(streamed, date_limit, traffic)
+    assert streamed['rows'] == len(dataset)
+    assert filtered['cube']['orders'].sum() == len(df_aux)
+    if len(df_aux):
+        kpis = stream.summary(filtered)
+        assert kpis['unique_couriers'] == df_aux['Delivery_person_ID'].nunique()
+        assert (kpis['age_min'], kpis['age_max']) == (df_aux['Delivery_person_Age'].min(), df_aux['Delivery_person_Age'].max())
+        assert (kpis['vehicle_min'], kpis['vehicle_max']) == (df_aux['Vehicle_condition'].min(), df_aux['Vehicle_condition'].max())
+        assert kpis['time_mean'] == pytest.approx(df_aux['Time_taken(min)'].mean())
+        assert kpis['rating_std'] == pytest.approx(df_aux['Delivery_person_Ratings'].std())
+    pd.testing.assert_frame_equal(stream.ratings_by_courier(filtered), _courier_ratings(df_aux),
+                                  check_dtype=False, check_categorical=False)
+    for result, expected in zip(stream.top_delivers(filtered),
+                                top_k(df_aux, 'City', 'Delivery_person_ID', 'Time_taken(min)', agg='max')):
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_categorical=False)
+
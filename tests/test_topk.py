@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cury.topk import first_positions, top_k
+
+
+def _sorted_top(df1, group, key, value, agg, k, ascending):
+    # Referência: agregação por (grupo, chave) e ordenação estável do grupo inteiro
+    df_aux = df1.groupby([group, key], observed=True)[value].agg(agg).sort_index().reset_index()
+    df_aux = df_aux.sort_values([group, value], ascending=[True, ascending], kind='stable', na_position='last')
+    return df_aux.groupby(group, observed=True, sort=False).head(k).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('agg', ['max', 'mean', 'count'])
+@pytest.mark.parametrize('k', [1, 10, 1000])
+def test_top_k_matches_sort(dataset, agg, k):
+    for value in ['Time_taken(min)', 'Delivery_person_Ratings']:
+        smallest, largest = top_k(dataset, 'City', 'Delivery_person_ID', value, agg=agg, k=k)
+        for result, ascending in [(smallest, True), (largest, False)]:
+            expected = _sorted_top(dataset, 'City', 'Delivery_person_ID', value, agg, k, ascending)
+            pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_first_positions_matches_stable_argsort():
+    rng = np.random.default_rng(7)
+    # Muitos empates e valores ausentes (inf), como nas chaves de ordenação
+    keys = rng.integers(0, 20, 500).astype(np.float64)
+    keys[rng.random(500) < 0.1] = np.inf
+    expected = np.argsort(keys, kind='stable')
+    for k in [1, 5, 37, 499, 500, 800]:
+        assert np.array_equal(first_positions(keys, k), expected[:k])
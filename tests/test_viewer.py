@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from cury.filters import build_filter_index, filter_view
+from cury.loader import load_dataset
+from cury.viewer import query_page
+
+
+@pytest.fixture
+def shared(csv_path):
+    df1 = load_dataset(csv_path)
+    return df1, build_filter_index(df1)
+
+
+def test_sort_every_column_of_shared_frame(shared):
+    df1, index = shared
+    traffic = list(df1['Road_traffic_density'].cat.categories)
+    view = filter_view(df1, index, df1['Order_Date'].max(), traffic)
+    # Todas as condições de trânsito: a seleção é um slice (views somente leitura)
+    assert isinstance(view['rows'], slice)
+    for col in df1.columns:
+        for ascending in [True, False]:
+            df_page, total, _, _ = query_page(df1, 1, 50, None, col, ascending, rows=view['rows'])
+            assert total == view['size']
+            assert len(df_page) == min(50, total)
+    # Nenhuma escrita chegou aos blocos compartilhados
+    assert not df1['Delivery_person_Ratings'].to_numpy().flags.writeable
+
+
+def _expected(df1, rows, col, ascending, page, page_size):
+    table = df1.iloc[rows]
+    table = table.sort_values(col, ascending=ascending, kind='stable', na_position='last')
+    start = (page - 1) * page_size
+    return table.index[start:start + page_size]
+
+
+@pytest.mark.parametrize('col', ['Time_taken(min)', 'Delivery_person_Ratings', 'City',
+                                 'Road_traffic_density', 'Order_Date', 'Delivery_person_ID'])
+@pytest.mark.parametrize('ascending', [True, False])
+@pytest.mark.parametrize('selection', ['all', 'slice', 'positions'])
+def test_query_page_matches_stable_sort(shared, col, ascending, selection):
+    df1, index = shared
+    assert df1.index.is_unique
+    traffic = list(df1['Road_traffic_density'].cat.categories)
+    date_limit = df1['Order_Date'].sort_values().iloc[len(df1) * 2 // 3]
+    rows = {
+        'all': None,
+        'slice': filter_view(df1, index, date_limit, traffic)['rows'],
+        'positions': filter_view(df1, index, date_limit, traffic[:2])['rows'],
+    }[selection]
+    assert selection != 'positions' or isinstance(rows, np.ndarray)
+    all_rows = slice(None) if rows is None else rows
+    for page in [1, 2, 7]:
+        df_page, _, _, _ = query_page(df1, page, 40, None, col, ascending, rows=rows)
+        assert list(df_page.index) == list(_expected(df1, all_rows, col, ascending, page, 40))
+
+
+def test_query_page_filter_and_columns(shared):
+    df1, _ = shared
+    df_page, total, n_pages, page = query_page(df1, 3, 25, ['ID', 'City'], 'ID', True,
+                                               filter_column='City', filter_text='metro')
+    table = df1[df1['City'].astype(str).str.contains('metro', case=False)]
+    assert total == len(table)
+    assert n_pages == -(-total // 25) and page == 3
+    assert list(df_page.columns) == ['ID', 'City']
+    assert list(df_page.index) == list(table.sort_values('ID', kind='stable').index[50:75])
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+import warnings
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from cury import views
+from cury.rollups import load_rollups, period_counts
+
+
+def test_order_share_by_period_leaves_rollup_untouched(csv_path):
+    periods = period_counts(load_rollups(csv_path), 'week', views.DATE_LIMIT, views.TRAFFIC_OPTIONS)
+    before = periods.copy()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', pd.errors.SettingWithCopyWarning)
+        fig = views.order_share_by_period(periods)
+    pd.testing.assert_frame_equal(periods, before)
+    expected = (periods['ID'] / periods['Delivery_person_ID']).to_numpy()
+    assert list(fig.data[0].y) == list(expected)
+
+
+# Seleções vazias: data limite antes do primeiro pedido e nenhum trânsito
+EMPTY_FILTERS = [(datetime(2022, 1, 1), views.TRAFFIC_OPTIONS), (views.DATE_LIMIT, [])]
+
+
+@pytest.mark.parametrize('date_limit, traffic', EMPTY_FILTERS)
+@pytest.mark.parametrize('name', list(views.VIEWS))
+def test_figures_with_empty_selection(csv_path, name, date_limit, traffic):
+    # Regressão: as colunas categóricas do cubo quebravam o plotly sem linhas
+    result = views.VIEWS[name](csv_path, date_limit, traffic)
+    assert all(len(table) == 0 for table in result['tables'].values())
+    for figure_id, build in result['figures'].items():
+        assert build() is not None, figure_id
+
+
+def test_views_and_api_do_not_import_plotly():
+    # Regressão: cury.views importava o plotly no topo, e com ele a API e a
+    # visão entregadores (que não tem gráficos)
+    modules = ['cury.views', 'cury.api', 'cury.viewer', 'cury.refresh', 'cury.assets']
+    code = 'import sys\n' + ''.join('import {}\n'.format(name) for name in modules) + "print('plotly' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout.strip() == 'False'